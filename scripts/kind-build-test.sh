@@ -24,6 +24,7 @@ ACK_RESOURCE_TAGS='services.k8s.aws/managed=true, services.k8s.aws/created=%UTCN
 DELETE_CLUSTER_ARGS=""
 K8S_VERSION=${K8S_VERSION:-"1.16"}
 PRESERVE=${PRESERVE:-"false"}
+RUN_TESTS=${RUN_TESTS:-"true"}
 LOCAL_MODULES=${LOCAL_MODULES:-"false"}
 START=$(date +%s)
 # VERSION is the source revision that executables and images are built from.
@@ -93,6 +94,11 @@ Environment variables:
                             Default: $ROOT_DIR/build/tmp-$CLUSTER_NAME
   K8S_VERSION               Kubernetes Version [1.14, 1.15, 1.16, 1.17, and 1.18]
                             Default: 1.16
+  RUN_TESTS                 Run the tests once the controller is installed
+                            (<true|false>). Set to false, along with PRESERVE,
+                            to provision several clusters to shard the Python
+                            tests across.
+                            Default: true
 "
 
 if [ $# -ne 1 ]; then
@@ -234,6 +240,11 @@ if [[ "$ENABLE_PROMETHEUS" == true ]]; then
     k8_wait_for_pod_status "prometheus-deployment" "Running" 60 || (echo 'FAIL: prometheus-deployment failed to Run' && exit 1)
 fi
 
+if [[ "$RUN_TESTS" != true ]]; then
+    echo "skipping tests, kubeconfig context: $(kubectl config current-context)"
+    exit 0
+fi
+
 if [[ "$TEST_HELM_CHARTS" == true ]]; then
   $TEST_RELEASE_DIR/test-helm.sh "$AWS_SERVICE" "$VERSION"
 fi
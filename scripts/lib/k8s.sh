@@ -5,9 +5,34 @@ CONTROLLER_TOOLS_VERSION="v0.4.0"
 THIS_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" >/dev/null 2>&1 && pwd )"
 ROOT_DIR="$THIS_DIR/../.."
 SCRIPTS_DIR="$ROOT_DIR/scripts"
+E2E_RUNNER_DIR="$ROOT_DIR/test/e2e"
 
 . $SCRIPTS_DIR/lib/aws.sh
 
+# e2e_runner invokes the Python e2e runner (test/e2e/common/runner.py), which
+# performs a whole check, including any polling, in a single process instead
+# of forking kubectl or aws for every poll. All arguments are passed through.
+#
+# Usage:
+#
+#   e2e_runner field-from-status key/my-key keyID --timeout 20
+#   e2e_runner aws-describe elasticache describe_replication_groups \
+#     --param ReplicationGroupId=my-rg --query "ReplicationGroups[0].Status"
+#
+# Starting Python costs more than a single kubectl call, so batch several
+# waits in one invocation:
+#
+#   e2e_runner batch <<EOF
+#   field-from-status replicationgroups/my-rg status --wait available --timeout 600
+#   aws-wait elasticache replication_group_available --param ReplicationGroupId=my-rg
+#   EOF
+#
+# kubectl remains the default. Set ACK_E2E_PYTHON_RUNNER to any value to have
+# k8s_resource_exists and get_field_from_status delegate to the runner.
+e2e_runner() {
+    PYTHONPATH="$E2E_RUNNER_DIR${PYTHONPATH:+:$PYTHONPATH}" python3 -m common.runner "$@"
+}
+
 # controller_gen_version_equals accepts a string version and returns 0 if the
 # installed version of controller-gen matches the supplied version, otherwise
 # returns 1
@@ -37,6 +62,10 @@ k8s_resource_exists() {
     if [ -n "$__namespace" ]; then
         __args="$__args-n $__namespace"
     fi
+    if [ -n "$ACK_E2E_PYTHON_RUNNER" ]; then
+        e2e_runner resource-exists "$__res_name" ${__namespace:+--namespace "$__namespace"} >/dev/null 2>&1
+        return
+    fi
     kubectl get $__args "$__res_name" >/dev/null 2>&1
 }
 
@@ -61,6 +90,12 @@ get_field_from_status() {
   local __timeout="${4:-20}"
   local __retry_interval=5
 
+  if [ -n "$ACK_E2E_PYTHON_RUNNER" ]; then
+    e2e_runner field-from-status "$__resource_name" "$__status_field" \
+      --namespace "$__namespace" --timeout "$__timeout" --retry-interval "$__retry_interval" || exit 1
+    return
+  fi
+
   local __args=""
   if [ -n "$__namespace" ]; then
       __args="$__args-n $__namespace"
@@ -34,6 +34,9 @@ Example: $(basename "$0") my-test
 Environment variables:
   K8S_VERSION               Kubernetes Version [1.14, 1.15, 1.16, 1.17, and 1.18]           
                             Default: 1.16
+  PROMETHEUS_HOST_PORT      Host port Prometheus is reachable on. Give each of
+                            several clusters provisioned side by side its own.
+                            Default: 9090
 "
 
 cluster_name="$1"
@@ -62,6 +65,12 @@ fi
 TMP_DIR=$ROOT_DIR/build/tmp-$cluster_name
 mkdir -p "${TMP_DIR}"
 
+PROMETHEUS_HOST_PORT=${PROMETHEUS_HOST_PORT:-"9090"}
+if [[ "$PROMETHEUS_HOST_PORT" != "9090" ]]; then
+    sed "s/hostPort: 9090/hostPort: $PROMETHEUS_HOST_PORT/" "$KIND_CONFIG_FILE" > "$TMP_DIR/kind-cluster.yaml"
+    KIND_CONFIG_FILE="$TMP_DIR/kind-cluster.yaml"
+fi
+
 debug_msg "kind: using Kubernetes $K8_VERSION"
 echo -n "creating kind cluster $cluster_name ... "
 for i in $(seq 0 5); do
@@ -0,0 +1,113 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Benchmark of the requests per second achieved through `common.k8s` as the
+number of threads sharing it grows, for several client settings.
+
+Requests are served by a `FakeApiServer` adding a fixed latency to every
+response, standing in for the round trip to a real API server:
+
+    PYTHONPATH=. python -m benchmarks.client_pool --threads 1 4 16 32
+"""
+
+import sys
+import json
+import logging
+import argparse
+import threading
+
+from time import perf_counter
+from typing import List, Optional, Tuple
+
+from common import k8s
+from benchmarks.fake_apiserver import FakeApiServer
+
+REFERENCE = k8s.CustomResourceReference(
+    "sagemaker.services.k8s.aws", "v1alpha1", "models", "bench-model",
+    namespace="default")
+
+# Client settings compared, the first being those of the kubernetes client
+SETTINGS = {
+    "shared, pool of 4": {"pool_maxsize": 4, "per_thread": False},
+    "shared, pool of 32": {"pool_maxsize": 32, "per_thread": False},
+    "per thread": {"pool_maxsize": 1, "per_thread": True},
+}
+
+
+class _PoolFullCounter(logging.Handler):
+    """Counts the connections urllib3 discards because its pool is full."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord):
+        if "Connection pool is full" in record.getMessage():
+            self.count += 1
+
+
+def _run(threads: int, seconds: float) -> Tuple[float, float]:
+    """Returns the requests per second and median latency (in ms) of the
+    given number of threads reading the same resource for `seconds`.
+    """
+    latencies: List[float] = []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def read():
+        thread_latencies = []
+        while not stop.is_set():
+            start = perf_counter()
+            k8s.get_resource_raw(REFERENCE)
+            thread_latencies.append(perf_counter() - start)
+        with lock:
+            latencies.extend(thread_latencies)
+
+    workers = [threading.Thread(target=read) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    stop.wait(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    latencies.sort()
+    return len(latencies) / seconds, latencies[len(latencies) // 2] * 1e3
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.client_pool")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--latency", type=float, default=0.005,
+                        help="seconds the fake API server waits before each response")
+    args = parser.parse_args(argv)
+
+    pool_full = _PoolFullCounter()
+    logging.getLogger("urllib3.connectionpool").addHandler(pool_full)
+    logging.getLogger("urllib3.connectionpool").propagate = False
+
+    body = json.dumps({"metadata": {"name": REFERENCE.name}, "status": {}}).encode()
+    with FakeApiServer(body, args.latency) as server:
+        for name, settings in SETTINGS.items():
+            print(name)
+            for threads in args.threads:
+                k8s.configure_k8s_api_client(configuration=server.configuration, **settings)
+                pool_full.count = 0
+                rps, median = _run(threads, args.seconds)
+                print(f"  {threads:>3} threads: {rps:8.0f} requests/s, "
+                      f"median {median:6.1f} ms, {pool_full.count} connections discarded")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""A stand-in for the Kubernetes API server, serving the same JSON object in
+response to every GET, from a separate process so that it does not compete
+with the benchmarked client for the GIL.
+"""
+
+import gzip
+import multiprocessing
+
+from time import sleep
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from kubernetes import client
+
+
+def _serve(body: bytes, latency: float, port: multiprocessing.Value):
+    compressed = gzip.compress(body)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Send the headers and body together, avoiding delayed ACK stalls
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if latency:
+                sleep(latency)
+            payload = body
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                payload = compressed
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer.request_queue_size = 128
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    port.value = server.server_address[1]
+    server.serve_forever()
+
+
+class FakeApiServer:
+    """Serves `body` to every GET after `latency` seconds, simulating the
+    round trip to a real API server.
+    """
+
+    def __init__(self, body: bytes, latency: float = 0):
+        self._port = multiprocessing.Value("i", 0)
+        self._process = multiprocessing.Process(
+            target=_serve, args=(body, latency, self._port), daemon=True)
+
+    def __enter__(self) -> "FakeApiServer":
+        self._process.start()
+        while not self._port.value:
+            sleep(0.01)
+        return self
+
+    def __exit__(self, *args):
+        self._process.terminate()
+        self._process.join()
+
+    @property
+    def configuration(self) -> client.Configuration:
+        """A client configuration pointing at the server."""
+        configuration = client.Configuration()
+        configuration.host = f"http://127.0.0.1:{self._port.value}"
+        return configuration
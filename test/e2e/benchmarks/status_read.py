@@ -0,0 +1,119 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Microbenchmark of reading a status field through `k8s.get_resource`
+against `k8s.get_resource_fields`.
+
+Both paths read a SageMaker Endpoint of a realistic size from a
+`FakeApiServer`:
+
+    PYTHONPATH=. python -m benchmarks.status_read --iterations 2000
+"""
+
+import sys
+import gzip
+import json
+import argparse
+
+from time import perf_counter, process_time
+from typing import Callable, List, Optional, Tuple
+
+from common import k8s
+from benchmarks.fake_apiserver import FakeApiServer
+
+REFERENCE = k8s.CustomResourceReference(
+    "sagemaker.services.k8s.aws", "v1alpha1", "endpoints", "bench-endpoint",
+    namespace="default")
+
+
+def _endpoint(field_count: int) -> dict:
+    """Builds an Endpoint padded with `field_count` managedFields entries,
+    which dominate the size of real objects.
+    """
+    managed_fields = [{
+        "apiVersion": "sagemaker.services.k8s.aws/v1alpha1",
+        "fieldsType": "FieldsV1",
+        "fieldsV1": {"f:spec": {f"f:field{i}": {}}, "f:status": {"f:conditions": {}}},
+        "manager": "controller",
+        "operation": "Update",
+        "time": "2021-01-01T00:00:00Z",
+    } for i in range(field_count)]
+    return {
+        "apiVersion": "sagemaker.services.k8s.aws/v1alpha1",
+        "kind": "Endpoint",
+        "metadata": {
+            "name": REFERENCE.name,
+            "namespace": REFERENCE.namespace,
+            "resourceVersion": "12345",
+            "uid": "00000000-0000-0000-0000-000000000000",
+            "finalizers": ["finalizers.sagemaker.services.k8s.aws/Endpoint"],
+            "managedFields": managed_fields,
+        },
+        "spec": {
+            "endpointName": REFERENCE.name,
+            "endpointConfigName": "bench-endpoint-config",
+            "tags": [{"key": f"key{i}", "value": f"value{i}"} for i in range(20)],
+        },
+        "status": {
+            "ackResourceMetadata": {
+                "arn": f"arn:aws:sagemaker:us-west-2:123456789012:endpoint/{REFERENCE.name}",
+                "ownerAccountID": "123456789012",
+            },
+            "conditions": [{"type": "ACK.ResourceSynced", "status": "True"}],
+            "endpointStatus": "InService",
+        },
+    }
+
+
+def _time(read: Callable[[], object], iterations: int) -> Tuple[List[float], List[float]]:
+    """Returns the sorted wall and client CPU times of each read."""
+    wall, cpu = [], []
+    for _ in range(iterations):
+        start, start_cpu = perf_counter(), process_time()
+        assert read() == "InService"
+        cpu.append(process_time() - start_cpu)
+        wall.append(perf_counter() - start)
+    return sorted(wall), sorted(cpu)
+
+
+def _percentile(timings: List[float], percentile: float) -> float:
+    return timings[min(int(len(timings) * percentile), len(timings) - 1)] * 1e6
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.status_read")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--managed-fields", type=int, default=50,
+                        help="managedFields entries padding the served object")
+    args = parser.parse_args(argv)
+
+    body = json.dumps(_endpoint(args.managed_fields)).encode()
+    paths = {
+        "get_resource": lambda: k8s.get_resource(REFERENCE)["status"]["endpointStatus"],
+        "get_resource_fields": lambda: k8s.get_resource_fields(REFERENCE, "status.endpointStatus")[0],
+    }
+
+    print(f"object size: {len(body)} bytes ({len(gzip.compress(body))} gzipped)")
+    with FakeApiServer(body) as server:
+        k8s.configure_k8s_api_client(configuration=server.configuration)
+        for name, read in paths.items():
+            # Warm up the connection pool before timing
+            _time(read, 10)
+            wall, cpu = _time(read, args.iterations)
+            print(f"{name:>20}: wall median {_percentile(wall, 0.5):8.1f} us, "
+                  f"p99 {_percentile(wall, 0.99):8.1f} us; "
+                  f"client cpu median {_percentile(cpu, 0.5):8.1f} us")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
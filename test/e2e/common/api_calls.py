@@ -0,0 +1,169 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Counts the Kubernetes and AWS API requests made by the harness.
+
+Every request made through the clients of `common.k8s`, and every call of the
+boto3 clients created from the default session, is counted against its
+caller: the test or fixture running at the time, as set with `attribute_to`.
+Requests made from other threads, such as those of the background reaper,
+are counted against `BACKGROUND`. That includes the workers of thread pools
+(e.g. those of `k8s.apply_custom_resources`), which do not inherit the caller
+of the thread submitting to them, unless the work is submitted to run in a
+copy of its context with `contextvars.copy_context().run`.
+
+Kubernetes requests are broken down by verb (get, list, watch, create,
+patch, update, delete or deletecollection) and resource (e.g. `endpoints`),
+AWS calls by operation (e.g. `describe_endpoint`) and service.
+"""
+
+import re
+import threading
+import contextlib
+import contextvars
+
+from collections import Counter
+from typing import Dict, Iterator, List, Tuple
+
+import boto3
+from botocore import xform_name
+
+BACKGROUND = "(background)"
+
+# (caller, api, verb, resource) of the requests counted
+_Call = Tuple[str, str, str, str]
+
+_caller: contextvars.ContextVar = contextvars.ContextVar("ack_e2e_api_caller", default=None)
+_counts: "Counter[_Call]" = Counter()
+_counts_lock = threading.Lock()
+
+# /api/v1/namespaces/ns/pods/name or /apis/group/version/namespaces/ns/plural/name,
+# optionally followed by a subresource
+_K8S_PATH = re.compile(
+    r"^(?:/api/[^/]+|/apis/[^/]+/[^/]+)(?:/namespaces/(?P<namespace>[^/]+))?"
+    r"(?:/(?P<resource>[^/]+)(?:/(?P<name>[^/]+)(?:/(?P<subresource>[^/]+))?)?)?$")
+
+
+@contextlib.contextmanager
+def attribute_to(caller: str) -> Iterator[None]:
+    """Counts the requests made by the current thread against the caller."""
+    token = _caller.set(caller)
+    try:
+        yield
+    finally:
+        _caller.reset(token)
+
+
+def record(api: str, verb: str, resource: str):
+    call = (_caller.get() or BACKGROUND, api, verb, resource)
+    with _counts_lock:
+        _counts[call] += 1
+
+
+def _k8s_verb_resource(method: str, url: str, query_params) -> Tuple[str, str]:
+    path = url.split("://", 1)[-1]
+    path = path[path.find("/"):].split("?", 1)[0]
+    match = _K8S_PATH.match(path)
+    if match is None:
+        return method.lower(), path
+    resource, name = match.group("resource"), match.group("name")
+    # The namespaces themselves, rather than the resources within one
+    if resource is None and match.group("namespace") is not None:
+        resource, name = "namespaces", match.group("namespace")
+    resource = resource or path
+    if match.group("subresource"):
+        resource = f"{resource}/{match.group('subresource')}"
+
+    watch = any(key == "watch" and str(value).lower() == "true" for key, value in query_params or [])
+    verb = {
+        "GET": "watch" if watch else ("get" if name else "list"),
+        "POST": "create",
+        "PATCH": "patch",
+        "PUT": "update",
+        "DELETE": "delete" if name else "deletecollection",
+    }.get(method.upper(), method.lower())
+    return verb, resource
+
+
+def record_k8s(method: str, url: str, query_params=None):
+    record("k8s", *_k8s_verb_resource(method, url, query_params))
+
+
+def _boto3_before_parameter_build(model, **kwargs):
+    record("aws", xform_name(model.name), model.service_model.service_name)
+
+
+def instrument_boto3():
+    """Counts every call of the boto3 clients created from the default
+    session from now on.
+    """
+    boto3._get_default_session().events.register(
+        "before-parameter-build", _boto3_before_parameter_build,
+        unique_id="ack-e2e-api-calls")
+
+
+def budget_counts(caller: str) -> Dict[str, int]:
+    """Get the number of requests made by the caller under each of the keys
+    budgets can limit: `k8s` and `aws` for all requests to either API,
+    `k8s_<verb>` (e.g. `k8s_get`), `aws_<service>` (e.g. `aws_sagemaker`) and
+    `aws_<operation>` (e.g. `aws_describe_endpoint`).
+    """
+    counts: "Counter[str]" = Counter()
+    with _counts_lock:
+        calls = [(call, count) for call, count in _counts.items() if call[0] == caller]
+    for (_, api, verb, resource), count in calls:
+        counts[api] += count
+        if api == "k8s":
+            counts[f"k8s_{verb}"] += count
+        else:
+            counts[f"aws_{resource}"] += count
+            counts[f"aws_{verb}"] += count
+    return dict(counts)
+
+
+def caller_counts(caller: str) -> Dict[str, int]:
+    """Get the number of requests made by the caller to each API, verb and
+    resource (e.g. `k8s get endpoints`).
+    """
+    with _counts_lock:
+        return {f"{api} {verb} {resource}": count
+                for (call_caller, api, verb, resource), count in _counts.items()
+                if call_caller == caller}
+
+
+def export_counts() -> List[list]:
+    """Serialises the counts, to send them from xdist workers to the master."""
+    with _counts_lock:
+        return [[*call, count] for call, count in _counts.items()]
+
+
+def import_counts(counts: List[list]):
+    with _counts_lock:
+        for *call, count in counts:
+            _counts[tuple(call)] += count
+
+
+def heaviest_callers(limit: int, calls_per_caller: int = 3) -> List[str]:
+    """Describe the callers that made the most requests, and the requests
+    each made most often.
+    """
+    by_caller: Dict[str, "Counter[str]"] = {}
+    with _counts_lock:
+        for (caller, api, verb, resource), count in _counts.items():
+            by_caller.setdefault(caller, Counter())[f"{api} {verb} {resource}"] += count
+
+    ranked = sorted(by_caller.items(), key=lambda item: -sum(item[1].values()))
+    lines = []
+    for caller, calls in ranked[:limit]:
+        top = ", ".join(f"{call}: {count}" for call, count in calls.most_common(calls_per_caller))
+        lines.append(f"{sum(calls.values()):6d}  {caller} ({top})")
+    return lines
@@ -0,0 +1,354 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Records and replays every interaction with the Kubernetes API server and
+with AWS.
+
+When recording, every request made through the kubernetes client and through
+boto3 clients created from the default session is written, with its response
+and latency, to a gzipped JSON lines cassette per process. When replaying, the
+requests are answered from the cassettes without any network access, waiting
+for each response as long as it originally took divided by the replay speed.
+
+Requests are matched on their method, path and parameters, in the order they
+were recorded. Values that differ between sessions, such as the namespace of
+each worker or the run ID labels, are replaced by placeholders in cassettes.
+Random resource names are made reproducible by seeding the random number
+generator from the cassette before each test, so that a test generates the
+same names whichever worker it runs on.
+
+Every boto3 client must be created from the default session after the
+cassette is installed for its calls to be intercepted.
+"""
+
+import os
+import gzip
+import json
+import random
+import logging
+import threading
+
+from glob import glob
+from time import perf_counter
+from datetime import datetime
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import boto3
+from kubernetes.client import rest
+
+from . import clock
+
+# Field of an interaction holding the chunks of a streamed response, such as
+# a watch, in the order they were read
+_WATCH_KEY = "chunks"
+
+
+class CassetteMiss(Exception):
+    """Raised when replaying a request that was never recorded."""
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return str(value)
+
+
+def _decode(value: dict) -> Any:
+    if set(value) == {"$datetime"}:
+        return datetime.fromisoformat(value["$datetime"])
+    return value
+
+
+class _CassetteResponse:
+    """Stands in for the urllib3, kubernetes REST and botocore HTTP
+    responses.
+    """
+
+    def __init__(self, status: int, reason: str, headers: Dict[str, str],
+                 data: bytes = b"", chunks: Optional[List[bytes]] = None):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.data = data
+        self.chunks = chunks
+
+    @property
+    def status_code(self) -> int:
+        return self.status
+
+    def getheaders(self) -> Dict[str, str]:
+        return self.headers
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.headers.get(name, default)
+
+    def read_chunked(self, amt=None, decode_content=None):
+        yield from self.chunks if self.chunks is not None else [self.data]
+
+    def stream(self, amt=None, decode_content=None):
+        return self.read_chunked()
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class _RecordingResponse:
+    """Wraps a streamed urllib3 response, recording its chunks as they are
+    read and writing the interaction once the response is closed.
+    """
+
+    def __init__(self, response, on_close: Callable[[List[bytes], bool], None]):
+        self._response = response
+        self._on_close = on_close
+        self._chunks: List[bytes] = []
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def _finish(self, chunks: List[bytes], streamed: bool):
+        if self._on_close is not None:
+            self._on_close(chunks, streamed)
+            self._on_close = None
+
+    @property
+    def data(self) -> bytes:
+        # Responses read whole may never be closed
+        data = self._response.data
+        self._finish([data], streamed=False)
+        return data
+
+    def read_chunked(self, amt=None, decode_content=None):
+        for chunk in self._response.read_chunked(amt, decode_content=decode_content):
+            self._chunks.append(chunk)
+            yield chunk
+
+    def close(self):
+        self._finish(self._chunks, streamed=True)
+        self._response.close()
+
+
+class Cassette:
+    """Records interactions to, or replays them from, a directory of
+    cassettes.
+    """
+
+    def __init__(self, directory: str, replay: bool, name: str, seed: str,
+                 speed: float = 0):
+        self.directory = directory
+        self.replay = replay
+        self.name = name
+        self.speed = speed
+        # Shared by every process of a session, and read back from the
+        # cassettes when replaying
+        self.seed = seed
+        self._started = perf_counter()
+        self._lock = threading.Lock()
+        self._recorded: List[dict] = []
+        self._interactions: Dict[str, Deque[dict]] = defaultdict(deque)
+        self._last: Dict[str, dict] = {}
+        self._scrubs: List[Tuple[str, str]] = []
+        self._original_request = None
+        self._handlers = []
+
+        if replay:
+            self._load()
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.jsonl.gz")
+
+    def _load(self):
+        paths = sorted(glob(os.path.join(self.directory, "*.jsonl.gz")))
+        if not paths:
+            raise FileNotFoundError(f"No cassettes found in {self.directory}")
+
+        interactions = []
+        for path in paths:
+            with gzip.open(path, "rt") as stream:
+                header = json.loads(next(stream))
+                self.seed = header["seed"]
+                interactions.extend(json.loads(line, object_hook=_decode) for line in stream)
+        for interaction in sorted(interactions, key=lambda i: i["started"]):
+            self._interactions[interaction["key"]].append(interaction)
+        logging.info(f"Loaded {len(interactions)} interactions from {len(paths)} cassettes")
+
+    def save(self):
+        if self.replay:
+            return
+        with self._lock:
+            recorded, self._recorded = self._recorded, []
+        with gzip.open(self._path(self.name), "wt") as stream:
+            stream.write(json.dumps({"seed": self.seed}) + "\n")
+            for interaction in recorded:
+                stream.write(json.dumps(interaction, default=_encode, separators=(",", ":")) + "\n")
+
+    def scrub(self, value: str, placeholder: str):
+        """Replaces the value, which differs between sessions, with the
+        placeholder in recorded interactions, and the placeholder with the
+        value in replayed ones.
+        """
+        with self._lock:
+            self._scrubs.append((value, placeholder))
+            self._scrubs.sort(key=lambda scrub: -len(scrub[0]))
+
+    def _to_placeholders(self, text: str) -> str:
+        for value, placeholder in self._scrubs:
+            text = text.replace(value, placeholder)
+        return text
+
+    def _from_placeholders(self, text: str) -> str:
+        for value, placeholder in self._scrubs:
+            text = text.replace(placeholder, value)
+        return text
+
+    def reseed(self, scope: str):
+        """Seeds the random number generator for the given scope, such as the
+        ID of the test about to run.
+        """
+        random.seed(f"{self.seed}:{scope}")
+
+    def _record(self, key: str, started: float, **interaction):
+        interaction = {"key": key, "started": started - self._started,
+                       "elapsed": perf_counter() - started, **interaction}
+        with self._lock:
+            self._recorded.append(interaction)
+
+    def _next(self, key: str) -> dict:
+        with self._lock:
+            queue = self._interactions.get(key)
+            if queue:
+                interaction = self._last[key] = queue.popleft()
+            elif key in self._last and key.startswith("GET "):
+                # Polls may repeat more often than when recording
+                interaction = self._last[key]
+            else:
+                raise CassetteMiss(f"No recorded interaction for {key}")
+
+        if self.speed:
+            clock.sleep(interaction["elapsed"])
+        return interaction
+
+    # Kubernetes
+
+    def _k8s_key(self, method: str, url: str, query_params) -> str:
+        path = url.split("://", 1)[-1]
+        path = path[path.find("/"):] if "/" in path else "/"
+        query = "&".join(f"{k}={v}" for k, v in sorted(
+            (str(k), str(v)) for k, v in (query_params or [])))
+        return self._to_placeholders(f"{method.upper()} {path}?{query}")
+
+    def _k8s_request(self, rest_client, method, url, query_params=None, headers=None,
+                     body=None, post_params=None, _preload_content=True,
+                     _request_timeout=None):
+        key = self._k8s_key(method, url, query_params)
+        if self.replay:
+            interaction = self._next(key)
+            # Like the kubernetes client, only decode preloaded bodies
+            data = self._from_placeholders(interaction["data"])
+            response = _CassetteResponse(
+                interaction["status"], interaction["reason"],
+                {"content-type": "application/json"},
+                data if _preload_content else data.encode("utf-8"),
+                [self._from_placeholders(c).encode("utf-8") for c in interaction[_WATCH_KEY]]
+                if interaction.get(_WATCH_KEY) is not None else None)
+            if not 200 <= response.status <= 299:
+                raise rest.ApiException(http_resp=response)
+            return response
+
+        started = perf_counter()
+        try:
+            response = self._original_request(
+                rest_client, method, url, query_params, headers, body, post_params,
+                _preload_content, _request_timeout)
+        except rest.ApiException as e:
+            body = e.body.decode("utf-8") if isinstance(e.body, bytes) else e.body
+            self._record(key, started, status=e.status, reason=e.reason,
+                         data=self._to_placeholders(body or ""))
+            raise
+
+        if _preload_content:
+            self._record(key, started, status=response.status, reason=response.reason,
+                         data=self._to_placeholders(response.data))
+            return response
+
+        def on_close(chunks: List[bytes], streamed: bool):
+            texts = [self._to_placeholders(c.decode("utf-8") if isinstance(c, bytes) else c)
+                     for c in chunks]
+            self._record(key, started, status=response.status, reason=response.reason,
+                         data="".join(texts), **({_WATCH_KEY: texts} if streamed else {}))
+        return _RecordingResponse(response, on_close)
+
+    # AWS
+
+    def _aws_key(self, model, params: dict) -> str:
+        return self._to_placeholders(
+            f"AWS {model.service_model.service_name}.{model.name} "
+            f"{json.dumps(params, sort_keys=True, default=_encode)}")
+
+    def _aws_before_parameter_build(self, params, context, **kwargs):
+        context["cassette_params"] = json.loads(json.dumps(params, default=_encode))
+        context["cassette_started"] = perf_counter()
+
+    def _aws_before_call(self, model, context, **kwargs):
+        if not self.replay:
+            return None
+
+        interaction = self._next(self._aws_key(model, context.get("cassette_params", {})))
+        parsed = json.loads(self._from_placeholders(json.dumps(interaction["parsed"], default=_encode)),
+                            object_hook=_decode)
+        return _CassetteResponse(interaction["status"], "", {}), parsed
+
+    def _aws_after_call(self, http_response, parsed, model, context, **kwargs):
+        if self.replay or "cassette_started" not in context:
+            return
+        self._record(self._aws_key(model, context.get("cassette_params", {})),
+                     context["cassette_started"], status=http_response.status_code,
+                     parsed=json.loads(self._to_placeholders(json.dumps(parsed, default=_encode)),
+                                       object_hook=_decode))
+
+    def install(self):
+        """Intercepts every Kubernetes and AWS request from now on."""
+        self._original_request = rest.RESTClientObject.request
+        cassette = self
+
+        def request(rest_client, *args, **kwargs):
+            return cassette._k8s_request(rest_client, *args, **kwargs)
+        rest.RESTClientObject.request = request
+
+        events = boto3._get_default_session().events
+        self._handlers = [
+            ("before-parameter-build", self._aws_before_parameter_build),
+            ("before-call", self._aws_before_call),
+            ("after-call", self._aws_after_call),
+        ]
+        for event, handler in self._handlers:
+            events.register(event, handler)
+
+        if self.replay:
+            clock.set_speed(self.speed)
+
+    def uninstall(self):
+        if self._original_request is not None:
+            rest.RESTClientObject.request = self._original_request
+            self._original_request = None
+        events = boto3._get_default_session().events
+        for event, handler in self._handlers:
+            events.unregister(event, handler)
+        self._handlers = []
+        clock.set_speed(1)
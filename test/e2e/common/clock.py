@@ -0,0 +1,63 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Sleeping used by the wait helpers and tests, which can be sped up when
+replaying a recorded session, and whose duration is accounted for so that
+profiles of the harness can leave it out.
+"""
+
+import time
+import threading
+
+from typing import Optional
+
+# Factor by which sleeps are shortened, None when they are skipped altogether
+_speed: Optional[float] = 1.0
+
+_thread_local = threading.local()
+
+
+def set_speed(speed: float):
+    """Shortens every subsequent sleep by the given factor, or skips sleeps
+    altogether when the factor is 0.
+    """
+    global _speed
+    _speed = speed or None
+
+
+def scale(seconds: float) -> float:
+    """Gets how long a wait of the given duration lasts at the current speed."""
+    if _speed is None:
+        return 0
+    return seconds / _speed
+
+
+def slept() -> float:
+    """Gets the total number of seconds the current thread has slept for,
+    including the sleep it may be in.
+    """
+    started = getattr(_thread_local, "started", None)
+    total = getattr(_thread_local, "slept", 0.0)
+    if started is not None:
+        total += time.perf_counter() - started
+    return total
+
+
+def sleep(seconds: float):
+    seconds = scale(seconds)
+    if seconds > 0:
+        _thread_local.started = time.perf_counter()
+        try:
+            time.sleep(seconds)
+        finally:
+            _thread_local.slept = slept()
+            _thread_local.started = None
@@ -0,0 +1,244 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Runs test selections in a long-lived, warm, harness process.
+
+The daemon imports the harness' dependencies, loads the kubeconfig, resolves
+the AWS identity and creates a namespace once, then runs every test selection
+submitted to it over a Unix socket with `pytest.main`, in its own process.
+Each run therefore only takes as long as the tests it selects.
+
+Test and conftest modules are imported afresh for every run, so edits to the
+tests are picked up. Every other module, including the harness itself, stays
+loaded: the daemon warns when one of them has changed since, and must be
+restarted for such changes to take effect.
+
+Messages are JSON objects, one per line. The client sends the pytest
+arguments of a run, and the daemon replies with the output of the run
+followed by its exit code.
+"""
+
+import io
+import os
+import sys
+import json
+import socket
+import logging
+import tempfile
+import contextlib
+
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO
+
+import pytest
+
+from . import k8s
+from .resources import _get_placeholder_values, random_suffix_name
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), f"ack-e2e-harness-{os.getuid()}.sock")
+
+root_test_path = Path(__file__).parent.parent
+
+
+def _send(connection: socket.socket, message: dict):
+    connection.sendall((json.dumps(message) + "\n").encode("utf-8"))
+
+
+class _OutputStream(io.TextIOBase):
+    """Sends everything written to it to the client of a run, discarding it
+    once the client has gone away.
+    """
+
+    encoding = "utf-8"
+
+    def __init__(self, connection: socket.socket, isatty: bool):
+        self._connection = connection
+        self._isatty = isatty
+        self._connected = True
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return self._isatty
+
+    def write(self, text: str) -> int:
+        if self._connected and text:
+            try:
+                _send(self._connection, {"output": text})
+            except OSError:
+                self._connected = False
+        return len(text)
+
+
+def _is_test_module(path: Path) -> bool:
+    return path.name == "conftest.py" or path.name.startswith("test_")
+
+
+class HarnessDaemon:
+    """Serves test runs over a Unix socket from a single warm process."""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH,
+                 namespace: Optional[str] = None):
+        self.socket_path = socket_path
+        self.namespace = namespace
+        self._owns_namespace = namespace is None
+        self._module_mtimes: Dict[str, float] = {}
+        self._server: Optional[socket.socket] = None
+
+    def warm(self):
+        """Does everything each new test process would otherwise repeat."""
+        k8s._get_k8s_api_client()
+        _get_placeholder_values()
+
+        if self._owns_namespace:
+            self.namespace = random_suffix_name("ack-e2e-daemon", 32)
+            k8s.create_k8s_namespace(self.namespace)
+            logging.info(f"Created test namespace {self.namespace}")
+
+        # Remember when each harness module was last changed
+        self._forget_test_modules()
+
+    def _harness_modules(self):
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, "__file__", None)
+            if path is None:
+                continue
+            path = Path(path).resolve()
+            if root_test_path.resolve() in path.parents:
+                yield name, path
+
+    def _forget_test_modules(self):
+        """Removes test and conftest modules, so that the next run imports
+        them again, and warns about other changed modules of the harness.
+        """
+        for name, path in self._harness_modules():
+            if _is_test_module(path):
+                del sys.modules[name]
+                continue
+            try:
+                mtime = path.stat().st_mtime
+            except OSError:
+                continue
+            if self._module_mtimes.setdefault(name, mtime) != mtime:
+                logging.warning(f"{path} has changed, restart the daemon to use the changes")
+                self._module_mtimes[name] = mtime
+
+    def run(self, args: List[str], cwd: str, output: TextIO) -> int:
+        """Runs pytest with the given arguments, as if from the given working
+        directory, writing its output to `output`.
+        """
+        self._forget_test_modules()
+        if self.namespace is not None and not any(
+                arg.startswith("--k8s-namespace") for arg in args):
+            args = [*args, "--k8s-namespace", self.namespace]
+
+        previous_cwd = os.getcwd()
+        os.chdir(cwd)
+        try:
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                return int(pytest.main(args))
+        finally:
+            os.chdir(previous_cwd)
+
+    def _handle(self, connection: socket.socket) -> bool:
+        """Serves a single request.
+
+        Returns:
+            bool: False if the daemon was asked to stop.
+        """
+        with connection, connection.makefile("r", encoding="utf-8") as requests:
+            line = requests.readline()
+            if not line:
+                return True
+            request = json.loads(line)
+
+            if request.get("command") == "stop":
+                _send(connection, {"exit": 0})
+                return False
+
+            output = _OutputStream(connection, request.get("isatty", False))
+            try:
+                exit_code = self.run(request["args"], request["cwd"], output)
+            except Exception as e:
+                logging.exception("Test run failed")
+                output.write(f"Test run failed: {e}\n")
+                exit_code = pytest.ExitCode.INTERNAL_ERROR
+            with contextlib.suppress(OSError):
+                _send(connection, {"exit": int(exit_code)})
+        return True
+
+    def serve_forever(self):
+        """Serves runs, one at a time, until asked to stop."""
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.socket_path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        self._server.listen()
+        logging.info(f"Listening on {self.socket_path}")
+
+        try:
+            while True:
+                connection, _ = self._server.accept()
+                if not self._handle(connection):
+                    return
+        finally:
+            self.close()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
+
+        if self._owns_namespace and self.namespace is not None:
+            k8s.drain_reaper()
+            k8s.delete_k8s_namespace(self.namespace)
+            if k8s.wait_k8s_namespace_deleted(self.namespace):
+                logging.info(f"Deleted test namespace {self.namespace}")
+            self.namespace = None
+
+
+def _request(message: dict, socket_path: str, output: TextIO) -> int:
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        raise ConnectionError(f"No harness daemon is listening on {socket_path}")
+
+    with connection, connection.makefile("r", encoding="utf-8") as replies:
+        _send(connection, message)
+        for line in replies:
+            reply = json.loads(line)
+            if "output" in reply:
+                output.write(reply["output"])
+                output.flush()
+            elif "exit" in reply:
+                return reply["exit"]
+    raise ConnectionError("The harness daemon closed the connection before the run ended")
+
+
+def submit(args: List[str], socket_path: str = DEFAULT_SOCKET_PATH,
+           output: TextIO = sys.stdout) -> int:
+    """Runs pytest with the given arguments in the daemon, from the current
+    working directory, copying its output to `output`.
+
+    Returns:
+        int: The exit code of pytest.
+    """
+    return _request({"args": args, "cwd": os.getcwd(), "isatty": output.isatty()},
+                    socket_path, output)
+
+
+def stop(socket_path: str = DEFAULT_SOCKET_PATH) -> int:
+    return _request({"command": "stop"}, socket_path, sys.stdout)
@@ -0,0 +1,188 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Measures how long the controller takes to push spec changes to AWS.
+
+A `DriftDetector` maps fields of a custom resource's spec to the matching
+fields of the AWS resource's describe response (e.g. an Endpoint's
+`spec.endpointConfigName` to `EndpointConfigName`). After the custom resource
+is updated, it polls both sides until every AWS field has the desired value,
+and reports when each field converged, relative to the update.
+"""
+
+import logging
+
+from time import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from . import k8s, tracing
+from .clock import sleep
+
+
+@dataclass
+class FieldMapping:
+    """Maps the dotted path of a custom resource field to that of the AWS
+    field it is pushed to, where integer keys index lists (e.g.
+    `ProductionVariants.0.VariantName`).
+
+    `normalize`, when given, is applied to both values before comparing them.
+    """
+    k8s_path: str
+    aws_path: str
+    normalize: Optional[Callable[[Any], Any]] = None
+
+
+@dataclass
+class FieldConvergence:
+    """When a field converged, in seconds since the update. `k8s_seconds` is
+    None until the custom resource has the desired value, and `aws_seconds`
+    until the AWS resource has it too.
+    """
+    k8s_path: str
+    aws_path: str
+    desired: Any
+    aws_value: Any = None
+    k8s_seconds: Optional[float] = None
+    aws_seconds: Optional[float] = None
+
+    @property
+    def converged(self) -> bool:
+        return self.aws_seconds is not None
+
+
+@dataclass
+class ConvergenceReport:
+    fields: List[FieldConvergence] = field(default_factory=list)
+    polls: int = 0
+
+    @property
+    def converged(self) -> bool:
+        return all(convergence.converged for convergence in self.fields)
+
+    @property
+    def seconds(self) -> Optional[float]:
+        """Time until every field converged, None if one never did."""
+        if not self.converged:
+            return None
+        return max((convergence.aws_seconds for convergence in self.fields), default=0.0)
+
+    def as_dict(self) -> dict:
+        return {"converged": self.converged, "seconds": self.seconds, "polls": self.polls,
+                "fields": [asdict(convergence) for convergence in self.fields]}
+
+
+def _lookup(value: Any, path: str) -> Any:
+    for key in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(key)
+        elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        else:
+            return None
+    return value
+
+
+class DriftDetector:
+    """Compares fields of a custom resource with those of its AWS resource,
+    as returned by the `describe` callable.
+    """
+
+    def __init__(self, reference: k8s.CustomResourceReference,
+                 describe: Callable[[], dict],
+                 mappings: Iterable[Union[FieldMapping, Tuple[str, str]]]):
+        self.reference = reference
+        self.describe = describe
+        self.mappings = [mapping if isinstance(mapping, FieldMapping) else FieldMapping(*mapping)
+                         for mapping in mappings]
+
+    @staticmethod
+    def _equal(mapping: FieldMapping, desired: Any, actual: Any) -> bool:
+        if mapping.normalize is not None:
+            return mapping.normalize(desired) == mapping.normalize(actual)
+        return desired == actual
+
+    def drift(self) -> Dict[str, Tuple[Any, Any]]:
+        """Get the (custom resource, AWS) values of every field that differs."""
+        k8s_values = k8s.get_resource_fields(
+            self.reference, *(mapping.k8s_path for mapping in self.mappings))
+        described = self.describe()
+        drifted = {}
+        for mapping, k8s_value in zip(self.mappings, k8s_values):
+            aws_value = _lookup(described, mapping.aws_path)
+            if not self._equal(mapping, k8s_value, aws_value):
+                drifted[mapping.k8s_path] = (k8s_value, aws_value)
+        return drifted
+
+    @tracing.traced
+    def wait_converged(self, started: Optional[float] = None,
+                       desired: Optional[Dict[str, Any]] = None,
+                       wait_periods: int = 180, period_length: int = 5) -> ConvergenceReport:
+        """Poll both sides, every period, until every field of the AWS resource
+        has its desired value.
+
+        Args:
+            started: When the custom resource was updated, as given by
+                `time.time()`. Defaults to now.
+            desired: The desired value of each custom resource field, by path.
+                Defaults to the current value of the custom resource's fields.
+
+        Returns:
+            ConvergenceReport: When each field converged, to within a period.
+        """
+        started = time() if started is None else started
+        k8s_paths = [mapping.k8s_path for mapping in self.mappings]
+        if desired is None:
+            desired = dict(zip(k8s_paths, k8s.get_resource_fields(self.reference, *k8s_paths)))
+        report = ConvergenceReport([FieldConvergence(mapping.k8s_path, mapping.aws_path,
+                                                     desired.get(mapping.k8s_path))
+                                    for mapping in self.mappings])
+
+        for poll in range(1, wait_periods + 2):
+            report.polls = poll
+            # Only the fields yet to converge on the custom resource are read
+            pending = [(mapping, convergence)
+                       for mapping, convergence in zip(self.mappings, report.fields)
+                       if convergence.k8s_seconds is None]
+            if pending:
+                k8s_values = k8s.get_resource_fields(
+                    self.reference, *(mapping.k8s_path for mapping, _ in pending))
+                observed = time() - started
+                for (mapping, convergence), k8s_value in zip(pending, k8s_values):
+                    if self._equal(mapping, convergence.desired, k8s_value):
+                        convergence.k8s_seconds = observed
+
+            described = self.describe()
+            observed = time() - started
+            for mapping, convergence in zip(self.mappings, report.fields):
+                if convergence.converged:
+                    continue
+                convergence.aws_value = _lookup(described, mapping.aws_path)
+                if convergence.k8s_seconds is not None and \
+                        self._equal(mapping, convergence.desired, convergence.aws_value):
+                    convergence.aws_seconds = observed
+
+            if report.converged:
+                break
+            if poll <= wait_periods:
+                sleep(period_length)
+
+        span = tracing.current_span()
+        span.set_attribute("ack.polls", report.polls)
+        span.set_attribute("ack.converged", report.converged)
+        span.set_attribute("ack.convergence_seconds", report.seconds)
+        if not report.converged:
+            logging.error(f"Resource {self.reference} did not converge: " + ", ".join(
+                f"{convergence.aws_path}={convergence.aws_value!r} "
+                f"(desired {convergence.desired!r})"
+                for convergence in report.fields if not convergence.converged))
+        return report
@@ -14,16 +14,44 @@
 CustomResource APIs.
 """
 
+import os
+import copy
+import json
+import socket
 import logging
-
-from time import sleep
-from typing import Dict, Optional, Union
-from dataclasses import dataclass
-from kubernetes import config, client
+import threading
+
+from time import time
+from uuid import uuid4
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from dataclasses import dataclass, replace
+from urllib3.connection import HTTPConnection
+from kubernetes import config, client, watch
 from kubernetes.client.api_client import ApiClient
 from kubernetes.client.rest import ApiException
 
+from . import api_calls, schema, status, tracing
+from .clock import sleep
+
 _k8s_api_client = None
+_k8s_api_client_lock = threading.Lock()
+_k8s_thread_local = threading.local()
+_json_decoder = json.JSONDecoder()
+
+# Labels stamped on every custom resource created by the tests, identifying
+# the test run and the PyTest worker that created it. The run ID is shared by
+# every worker of a run through the environment.
+RUN_ID_LABEL = "e2e.services.k8s.aws/run-id"
+WORKER_ID_LABEL = "e2e.services.k8s.aws/worker-id"
+RUN_ID = os.environ.get("ACK_E2E_RUN_ID") or uuid4().hex[:12]
+WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "master")
+
+# Manager owning the fields set by server-side applies of the harness
+FIELD_MANAGER = "ack-e2e"
+
+# Every (group, version, plural, namespace) this process created resources of
+_created_kinds: Set[Tuple[str, str, str, Optional[str]]] = set()
 
 
 @dataclass
@@ -54,46 +82,347 @@ class CustomResourceReference:
         return f"{self.plural}.{self.version}.{self.group}/{self._printable_namespace}:{self.name}"
 
 
+def _reference_attributes(reference: CustomResourceReference) -> Dict[str, Any]:
+    return {
+        "k8s.resource.group": reference.group,
+        "k8s.resource.version": reference.version,
+        "k8s.resource.plural": reference.plural,
+        "k8s.resource.name": reference.name,
+        "k8s.namespace.name": reference._printable_namespace,
+    }
+
+
+tracing.register_attributes(CustomResourceReference, _reference_attributes)
+
+
+@dataclass
+class K8sClientSettings:
+    """Tunes the clients returned by `_get_k8s_api_client`.
+
+    `request_timeout` is the default (connect, read) timeout, in seconds, of
+    every request other than watches. With `per_thread`, each thread gets a
+    client of its own rather than sharing one. When `configuration` is given
+    it is used instead of loading the kubeconfig.
+    """
+
+    pool_maxsize: int = int(os.environ.get("ACK_E2E_K8S_POOL_MAXSIZE", 32))
+    request_timeout: Optional[Tuple[float, float]] = (10, 120)
+    per_thread: bool = False
+    context: Optional[str] = None
+    configuration: Optional[client.Configuration] = None
+
+
+_k8s_client_settings = K8sClientSettings()
+# Incremented whenever the settings change, invalidating existing clients
+_k8s_client_generation = 0
+
+
+class _K8sApiClient(ApiClient):
+    """Applies a default timeout to every request that is not a watch, and
+    counts every request.
+    """
+
+    def __init__(self, configuration: client.Configuration,
+                 request_timeout: Optional[Tuple[float, float]]):
+        super().__init__(configuration)
+        self.request_timeout = request_timeout
+
+        # Probe idle pooled connections, so that the API server or a load
+        # balancer silently dropping them is detected
+        self.rest_client.pool_manager.connection_pool_kw["socket_options"] = \
+            HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+    def request(self, method, url, query_params=None, headers=None, post_params=None,
+                body=None, _preload_content=True, _request_timeout=None):
+        if _request_timeout is None and not any(key == "watch" for key, _ in query_params or []):
+            _request_timeout = self.request_timeout
+        api_calls.record_k8s(method, url, query_params)
+        return super().request(method, url, query_params, headers, post_params, body,
+                               _preload_content, _request_timeout)
+
+
+def _new_k8s_api_client(settings: K8sClientSettings) -> ApiClient:
+    configuration = settings.configuration
+    if configuration is None:
+        configuration = client.Configuration()
+        config.load_kube_config(context=settings.context, client_configuration=configuration)
+    else:
+        # Copy so that the given configuration is never mutated
+        configuration = copy.deepcopy(configuration)
+    configuration.connection_pool_maxsize = settings.pool_maxsize
+    return _K8sApiClient(configuration, settings.request_timeout)
+
+
+def configure_k8s_api_client(**settings):
+    """Change the settings (see `K8sClientSettings`) of the clients returned
+    by `_get_k8s_api_client`, replacing any client already created.
+    """
+    global _k8s_api_client, _k8s_client_settings, _k8s_client_generation
+    with _k8s_api_client_lock:
+        _k8s_client_settings = replace(_k8s_client_settings, **settings)
+        _k8s_client_generation += 1
+        _k8s_api_client = None
+
+
+def get_k8s_context() -> Optional[str]:
+    """Get the kubeconfig context the clients use, None being the current
+    context of the kubeconfig.
+    """
+    return _k8s_client_settings.context
+
+
+def list_k8s_contexts() -> List[str]:
+    """List the names of the contexts of the kubeconfig (which `KUBECONFIG`
+    can merge from several files).
+    """
+    contexts, _ = config.list_kube_config_contexts()
+    return [context["name"] for context in contexts]
+
+
 def _get_k8s_api_client() -> ApiClient:
     global _k8s_api_client
+    if _k8s_client_settings.per_thread:
+        if getattr(_k8s_thread_local, "generation", None) != _k8s_client_generation:
+            _k8s_thread_local.api_client = _new_k8s_api_client(_k8s_client_settings)
+            _k8s_thread_local.generation = _k8s_client_generation
+        return _k8s_thread_local.api_client
+
     if _k8s_api_client is None:
-        _k8s_api_client = config.new_client_from_config()
+        with _k8s_api_client_lock:
+            if _k8s_api_client is None:
+                _k8s_api_client = _new_k8s_api_client(_k8s_client_settings)
     return _k8s_api_client
 
 
+@tracing.traced(kind=tracing.SPAN_KIND_CLIENT)
 def create_k8s_namespace(namespace_name: str):
     _api_client = _get_k8s_api_client()
     return client.CoreV1Api(_api_client).create_namespace(
-        client.V1Namespace(name=namespace_name))
+        client.V1Namespace(metadata=client.V1ObjectMeta(name=namespace_name)))
 
 
+@tracing.traced(kind=tracing.SPAN_KIND_CLIENT)
 def delete_k8s_namespace(namespace_name: str):
     _api_client = _get_k8s_api_client()
     return client.CoreV1Api(_api_client).delete_namespace(namespace_name)
 
 
+@tracing.traced
+def wait_k8s_namespace_deleted(namespace_name: str, timeout_seconds: int = 900) -> bool:
+    """Watch a namespace until the server removes it, which only happens once
+    every object inside it has had its finalizers cleared by the controllers.
+
+    Returns:
+        bool: True if the namespace was removed before the timeout.
+    """
+    _api_client = _get_k8s_api_client()
+    _api = client.CoreV1Api(_api_client)
+    field_selector = f"metadata.name={namespace_name}"
+
+    namespaces = _api.list_namespace(field_selector=field_selector)
+    if not namespaces.items:
+        return True
+
+    _watch = watch.Watch()
+    for event in _watch.stream(_api.list_namespace,
+                               field_selector=field_selector,
+                               resource_version=namespaces.metadata.resource_version,
+                               timeout_seconds=timeout_seconds):
+        if event["type"] == "DELETED":
+            _watch.stop()
+            return True
+
+    logging.error(
+        f"Wait for namespace {namespace_name} to be removed by server timed out")
+    return False
+
+
+def run_label_selector(worker_only: bool = True) -> str:
+    """Get the label selector matching the resources created by this run or,
+    by default, only those created by this worker of the run.
+    """
+    if worker_only:
+        return f"{RUN_ID_LABEL}={RUN_ID},{WORKER_ID_LABEL}={WORKER_ID}"
+    return f"{RUN_ID_LABEL}={RUN_ID}"
+
+
+def _validate(reference: CustomResourceReference, custom_resource: dict, partial: bool = False):
+    """Check the custom resource, or merge patch if `partial`, against the
+    schema of its kind before it is sent.
+
+    Raises:
+        SchemaValidationError: If it violates the schema.
+    """
+    if not schema.enabled():
+        return
+    validator = schema.get_validator(
+        _get_k8s_api_client(), reference.group, reference.version, reference.plural)
+    if validator is not None:
+        validator.validate(custom_resource, partial)
+
+
+def _with_run_labels(reference: CustomResourceReference, custom_resource: dict) -> dict:
+    """Label a copy of the custom resource with the run and worker creating
+    it, and remember its kind for the end of the run.
+    """
+    metadata = custom_resource.get("metadata") or {}
+    labels = {**(metadata.get("labels") or {}), RUN_ID_LABEL: RUN_ID, WORKER_ID_LABEL: WORKER_ID}
+    _created_kinds.add((reference.group, reference.version, reference.plural, reference.namespace))
+    return {**custom_resource, "metadata": {**metadata, "labels": labels}}
+
+
+@tracing.traced(kind=tracing.SPAN_KIND_CLIENT)
 def create_custom_resource(
         reference: CustomResourceReference, custom_resource: dict):
     _api_client = _get_k8s_api_client()
     _api = client.CustomObjectsApi(_api_client)
 
+    _validate(reference, custom_resource)
+    custom_resource = _with_run_labels(reference, custom_resource)
+
     if reference.namespace is None:
         return _api.create_cluster_custom_object(
             reference.group, reference.version, reference.plural, custom_resource)
     return _api.create_namespaced_custom_object(
         reference.group, reference.version, reference.namespace, reference.plural, custom_resource)
 
+@tracing.traced(kind=tracing.SPAN_KIND_CLIENT)
 def patch_custom_resource(
     reference: CustomResourceReference, custom_resource: dict):
     _api_client = _get_k8s_api_client()
     _api = client.CustomObjectsApi(_api_client)
 
+    _validate(reference, custom_resource, partial=True)
     if reference.namespace is None:
         return _api.patch_cluster_custom_object(
             reference.group, reference.version, reference.plural, reference.name, custom_resource)
     return _api.patch_namespaced_custom_object(
         reference.group, reference.version, reference.namespace, reference.plural, reference.name, custom_resource)
 
+@tracing.traced(kind=tracing.SPAN_KIND_CLIENT)
+def apply_custom_resource(
+        reference: CustomResourceReference, custom_resource: dict,
+        field_manager: str = FIELD_MANAGER, force: bool = False) -> dict:
+    """Create or update the custom resource with server-side apply.
+
+    The fields set in the custom resource become owned by the field manager,
+    and applying the same object again does not change the resource. Setting a
+    field owned by another manager, such as the controller, fails with a 409
+    Conflict, unless `force` is True, in which case the field is taken over.
+
+    Returns:
+        dict: The applied resource.
+    """
+    _api_client = _get_k8s_api_client()
+    _validate(reference, custom_resource)
+    custom_resource = _with_run_labels(reference, custom_resource)
+    metadata = custom_resource["metadata"]
+    if reference.namespace is not None:
+        metadata.setdefault("namespace", reference.namespace)
+    metadata.setdefault("name", reference.name)
+
+    query_params = [('fieldManager', field_manager)]
+    if force:
+        query_params.append(('force', 'true'))
+    # The generated client has no apply methods. As JSON is also YAML, the
+    # body is sent as such, the only encoding the client sends verbatim.
+    return _api_client.call_api(
+        _get_resource_path(reference), 'PATCH',
+        query_params=query_params,
+        header_params={'Accept': 'application/json',
+                       'Content-Type': 'application/apply-patch+yaml'},
+        body=json.dumps(custom_resource),
+        response_type='object',
+        auth_settings=['BearerToken'],
+        _return_http_data_only=True)
+
+
+@tracing.traced
+def apply_custom_resources(
+        resources: List[Tuple[CustomResourceReference, dict]],
+        field_manager: str = FIELD_MANAGER, force: bool = False,
+        max_workers: int = 8) -> List[Union[dict, Exception]]:
+    """Apply many custom resources at once, with up to `max_workers` applies
+    in flight.
+
+    Returns:
+        list: For each (reference, custom resource) pair, in order, the
+            applied resource or the exception its apply failed with.
+    """
+    def apply(resource: Tuple[CustomResourceReference, dict]) -> Union[dict, Exception]:
+        try:
+            return apply_custom_resource(*resource, field_manager=field_manager, force=force)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max(min(max_workers, len(resources)), 1),
+                            thread_name_prefix="apply") as executor:
+        return list(executor.map(apply, resources))
+
+
+def compute_merge_patch(observed: Any, desired: Any) -> Any:
+    """Compute the smallest JSON merge patch (RFC 7386) having the same effect
+    on the observed object as patching it with the whole desired object.
+
+    Fields of the desired object equal to the observed ones are left out, as
+    are fields only present in the observed object. Fields set to None in the
+    desired object are kept, if present in the observed object, to remove
+    them. Lists are compared, and replaced, as a whole.
+
+    Returns:
+        The merge patch, an empty dict if applying the desired object would not
+            change the observed one.
+    """
+    if not isinstance(desired, dict):
+        return desired
+    if not isinstance(observed, dict):
+        observed = {}
+
+    patch = {}
+    for key, value in desired.items():
+        if value is None:
+            if key in observed:
+                patch[key] = None
+        elif key not in observed:
+            patch[key] = compute_merge_patch({}, value)
+        elif isinstance(value, dict) and isinstance(observed[key], dict):
+            nested_patch = compute_merge_patch(observed[key], value)
+            if nested_patch:
+                patch[key] = nested_patch
+        elif value != observed[key]:
+            patch[key] = value
+    return patch
+
+
+@tracing.traced(kind=tracing.SPAN_KIND_CLIENT)
+def patch_custom_resource_minimal(
+        reference: CustomResourceReference, desired: dict,
+        observed: Optional[dict] = None, precondition: bool = False) -> dict:
+    """Patch the custom resource with only the fields of the desired object
+    that differ from the observed resource (by default, the current one).
+
+    With `precondition`, the patch only applies if the resource has not
+    changed since it was observed, failing with a 409 Conflict otherwise.
+
+    Returns:
+        dict: The patched resource, or the observed one if nothing differed.
+    """
+    if observed is None:
+        observed = get_resource(reference)
+
+    patch = compute_merge_patch(observed, desired)
+    if tracing.enabled():
+        tracing.current_span().set_attribute("ack.patch_bytes", len(json.dumps(patch)))
+    if not patch:
+        return observed
+
+    if precondition:
+        metadata = patch.setdefault("metadata", {})
+        metadata["resourceVersion"] = observed["metadata"]["resourceVersion"]
+    return patch_custom_resource(reference, patch)
+
+
+@tracing.traced
 def delete_custom_resource(
     reference: CustomResourceReference, wait_periods: int = 1, period_length: int = 5):
     """Delete custom resource from cluster and wait for it to be removed by the server
@@ -107,15 +436,20 @@ def delete_custom_resource(
     _api_client = _get_k8s_api_client()
     _api = client.CustomObjectsApi(_api_client)
 
-    _response = None
     if reference.namespace is None:
         _response = _api.delete_cluster_custom_object(
             reference.group, reference.version, reference.plural, reference.name)
-    _response = _api.delete_namespaced_custom_object(
-        reference.group, reference.version, reference.namespace, reference.plural, reference.name)
+    else:
+        _response = _api.delete_namespaced_custom_object(
+            reference.group, reference.version, reference.namespace, reference.plural, reference.name)
+
+    # Resources without finalizers are removed immediately
+    if not get_resource_exists(reference):
+        return _response, True
 
-    for _ in range(wait_periods):
+    for poll in range(1, wait_periods + 1):
         sleep(period_length)
+        tracing.current_span().set_attribute("ack.polls", poll)
         if not get_resource_exists(reference):
             return _response, True
 
@@ -124,6 +458,186 @@ def delete_custom_resource(
     return _response, False
 
 
+def _get_collection_path(group: str, version: str, plural: str, namespace: Optional[str]) -> str:
+    if namespace is None:
+        return f"/apis/{group}/{version}/{plural}"
+    return f"/apis/{group}/{version}/namespaces/{namespace}/{plural}"
+
+
+@tracing.traced(kind=tracing.SPAN_KIND_CLIENT)
+def delete_custom_resource_collection(group: str, version: str, plural: str,
+                                      namespace: Optional[str], label_selector: str):
+    """Delete every custom resource of a kind matching the label selector with
+    a single call.
+    """
+    _api_client = _get_k8s_api_client()
+    # The generated delete_collection methods do not accept a label selector
+    return _api_client.call_api(
+        _get_collection_path(group, version, plural, namespace), 'DELETE',
+        query_params=[('labelSelector', label_selector)],
+        header_params={'Accept': 'application/json', 'Content-Type': 'application/json'},
+        body=client.V1DeleteOptions(propagation_policy='Background'),
+        response_type='object',
+        auth_settings=['BearerToken'],
+        _return_http_data_only=True)
+
+
+@tracing.traced
+def wait_custom_resource_collection_deleted(group: str, version: str, plural: str,
+                                            namespace: Optional[str], label_selector: str,
+                                            timeout_seconds: int = 900) -> bool:
+    """Watch the custom resources of a kind matching the label selector until
+    the server has removed all of them.
+
+    Returns:
+        bool: True if every resource was removed before the timeout.
+    """
+    _api_client = _get_k8s_api_client()
+    _api = client.CustomObjectsApi(_api_client)
+    if namespace is None:
+        list_func, args = _api.list_cluster_custom_object, (group, version, plural)
+    else:
+        list_func, args = _api.list_namespaced_custom_object, (group, version, namespace, plural)
+
+    resources = list_func(*args, label_selector=label_selector)
+    remaining = {item["metadata"]["name"] for item in resources.get("items", [])}
+    if not remaining:
+        return True
+
+    _watch = watch.Watch()
+    for event in _watch.stream(list_func, *args,
+                               label_selector=label_selector,
+                               resource_version=resources["metadata"]["resourceVersion"],
+                               timeout_seconds=timeout_seconds):
+        if event["type"] == "DELETED":
+            remaining.discard(event["object"]["metadata"]["name"])
+            if not remaining:
+                _watch.stop()
+                return True
+
+    logging.error(
+        f"Wait for {plural} to be removed by server timed out, remaining: {', '.join(sorted(remaining))}")
+    return False
+
+
+@tracing.traced
+def delete_run_resources(namespace: Optional[str] = None, timeout_seconds: int = 900) -> bool:
+    """Delete every custom resource created by this worker of the test run,
+    optionally only those in the given namespace, and wait for their removal.
+
+    Every kind is deleted with one call before waiting on any of them, so the
+    whole teardown takes as long as the slowest finalizer.
+
+    Returns:
+        bool: True if every resource was removed before the timeout.
+    """
+    label_selector = run_label_selector()
+    kinds = sorted((kind for kind in _created_kinds if namespace is None or kind[3] == namespace),
+                   key=str)
+    for group, version, plural, kind_namespace in kinds:
+        delete_custom_resource_collection(group, version, plural, kind_namespace, label_selector)
+
+    deadline = time() + timeout_seconds
+    removed = True
+    for group, version, plural, kind_namespace in kinds:
+        remaining_seconds = max(int(deadline - time()), 1)
+        removed &= wait_custom_resource_collection_deleted(
+            group, version, plural, kind_namespace, label_selector, remaining_seconds)
+    return removed
+
+
+class Reaper:
+    """Deletes custom resources in the background, so that tests do not block
+    on deletions.
+
+    References handed to `reap` are deleted by a bounded pool of threads, each
+    deletion being retried on failure. `drain` waits for every deletion to
+    finish and returns the references that could not be deleted.
+    """
+
+    def __init__(self, max_workers: int = 4, retries: int = 3, retry_interval: int = 10,
+                 wait_periods: int = 30, period_length: int = 10):
+        self.retries = retries
+        self.retry_interval = retry_interval
+        self.wait_periods = wait_periods
+        self.period_length = period_length
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="reaper")
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[CustomResourceReference, Future]] = []
+
+    def reap(self, *references: CustomResourceReference):
+        with self._lock:
+            for reference in references:
+                self._pending.append((reference, self._executor.submit(self._delete, reference)))
+
+    @tracing.traced
+    def _delete(self, reference: CustomResourceReference) -> bool:
+        for attempt in range(1, self.retries + 1):
+            tracing.current_span().set_attribute("ack.attempts", attempt)
+            try:
+                _, deleted = delete_custom_resource(
+                    reference, self.wait_periods, self.period_length)
+                if deleted:
+                    return True
+            except ApiException as e:
+                # Already deleted, e.g. by the test itself
+                if e.status == 404:
+                    return True
+                logging.warning(f"Attempt {attempt} to delete {reference} failed: {e.reason}")
+            if attempt < self.retries:
+                sleep(self.retry_interval)
+        return False
+
+    def drain(self, timeout_seconds: Optional[float] = None) -> List[CustomResourceReference]:
+        """Wait for every pending deletion to finish, up to the timeout.
+
+        Returns:
+            list: The references that were not deleted before the timeout.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        wait([future for _, future in pending], timeout=timeout_seconds)
+
+        leaked = []
+        for reference, future in pending:
+            if not future.done() or future.exception() is not None or not future.result():
+                leaked.append(reference)
+        return leaked
+
+
+_reaper: Optional[Reaper] = None
+_reaper_lock = threading.Lock()
+
+
+def reap(*references: CustomResourceReference):
+    """Delete the resources from the given references in the background,
+    using the session-wide reaper.
+    """
+    global _reaper
+    with _reaper_lock:
+        if _reaper is None:
+            _reaper = Reaper()
+    _reaper.reap(*references)
+
+
+@tracing.traced
+def drain_reaper(timeout_seconds: Optional[float] = None) -> List[CustomResourceReference]:
+    """Wait for the session-wide reaper to delete every resource handed to it,
+    logging any resource that leaked.
+
+    Returns:
+        list: The references that were not deleted before the timeout.
+    """
+    if _reaper is None:
+        return []
+
+    leaked = _reaper.drain(timeout_seconds)
+    for reference in leaked:
+        logging.error(f"Leaked resource {reference}, which could not be deleted")
+    return leaked
+
+
+@tracing.traced(kind=tracing.SPAN_KIND_CLIENT)
 def get_resource(reference: CustomResourceReference):
     """Get the resource from a given reference.
 
@@ -142,6 +656,98 @@ def get_resource(reference: CustomResourceReference):
         reference.group, reference.version, reference.namespace, reference.plural, reference.name)
 
 
+def _get_resource_path(reference: CustomResourceReference) -> str:
+    collection_path = _get_collection_path(
+        reference.group, reference.version, reference.plural, reference.namespace)
+    return f"{collection_path}/{reference.name}"
+
+
+@tracing.traced(kind=tracing.SPAN_KIND_CLIENT)
+def get_resource_raw(reference: CustomResourceReference) -> bytes:
+    """Get the undecoded JSON body of the resource from a given reference,
+    accepting a gzip encoded response.
+
+    Raises:
+        ApiException: If the resource doesnt exist in server.
+    """
+    _api_client = _get_k8s_api_client()
+    response = _api_client.call_api(
+        _get_resource_path(reference), 'GET',
+        header_params={'Accept': 'application/json', 'Accept-Encoding': 'gzip'},
+        auth_settings=['BearerToken'],
+        _return_http_data_only=True,
+        _preload_content=False)
+    return response.data
+
+
+def _decode_status(raw: str) -> Optional[dict]:
+    """Decode only the top-level status object of a serialized resource.
+
+    The API server sorts the keys of custom resources, so the status is always
+    the last member of the object and can be found by searching backwards
+    from its end, without decoding the (much larger) metadata and spec.
+
+    Returns:
+        None or dict: None if no top-level status was found, otherwise the
+            decoded status.
+    """
+    end = raw.rstrip().rfind('}')
+    index = len(raw)
+    while True:
+        index = raw.rfind('"status":', 0, index)
+        if index < 0:
+            return None
+
+        value_start = index + len('"status":')
+        while raw[value_start] in ' \t\r\n':
+            value_start += 1
+        try:
+            value, value_end = _json_decoder.raw_decode(raw, value_start)
+        except ValueError:
+            continue
+        # Any nested status is followed by the braces of its enclosing objects
+        if isinstance(value, dict) and not raw[value_end:end].strip():
+            return value
+
+
+@tracing.traced
+def get_resource_fields(reference: CustomResourceReference, *paths: str) -> Tuple[Any, ...]:
+    """Get the values at the given dotted paths (e.g. `status.endpointStatus`)
+    of the resource from a given reference.
+
+    Cheaper than `get_resource` when polling for a few fields: the response is
+    not decoded at all unless it contains the last key of one of the paths,
+    and only its status is decoded when every path is below `status`.
+
+    Returns:
+        tuple: The value at each path, or None where the path doesn't exist.
+
+    Raises:
+        ApiException: If the resource doesnt exist in server.
+    """
+    raw = get_resource_raw(reference).decode('utf-8')
+    keys = [path.split('.') for path in paths]
+    if not any(f'"{path_keys[-1]}"' in raw for path_keys in keys):
+        return (None,) * len(paths)
+
+    resource = None
+    if all(path_keys[0] == 'status' for path_keys in keys):
+        decoded_status = _decode_status(raw)
+        if decoded_status is not None:
+            resource = {'status': decoded_status}
+    if resource is None:
+        resource = json.loads(raw)
+
+    values = []
+    for path_keys in keys:
+        value = resource
+        for key in path_keys:
+            value = value.get(key) if isinstance(value, dict) else None
+        values.append(value)
+    return tuple(values)
+
+
+@tracing.traced
 def get_resource_exists(reference: CustomResourceReference) -> bool:
     try:
         return get_resource(reference) is not None
@@ -149,14 +755,16 @@ def get_resource_exists(reference: CustomResourceReference) -> bool:
         return False
 
 
+@tracing.traced
 def wait_resource_consumed_by_controller(
         reference: CustomResourceReference, wait_periods: int = 3, period_length: int = 10):
     if not get_resource_exists(reference):
         logging.error(f"Resource {reference} does not exist")
         return None
 
-    for _ in range(wait_periods):
+    for poll in range(1, wait_periods + 1):
         resource = get_resource(reference)
+        tracing.current_span().set_attribute("ack.polls", poll)
 
         if 'status' in resource:
             return resource
@@ -168,21 +776,13 @@ def wait_resource_consumed_by_controller(
     return None
 
 def _get_terminal_condition(resource: object) -> Union[None, bool]:
-    """Get the .status.ACK.Terminal boolean from a given resource.
+    """Get the status of the ACK.Terminal condition from a given resource.
 
     Returns:
-        None or bool: None if the status field doesn't exist, otherwise the
-            field value cast to a boolean (default False).
+        None or bool: None if the condition doesn't exist, otherwise whether
+            its status is "True".
     """
-    if 'status' not in resource or 'conditions' not in resource['status']:
-        return None
-
-    conditions: Dict = resource['status']['conditions']
-    if 'ACK' not in conditions or 'Terminal' not in conditions['ACK']:
-        return None
-
-    terminal: Dict = conditions['ACK']['Terminal']
-    return bool(terminal.get('status', False))
+    return status.view(resource).terminal
 
 def get_resource_arn(resource: object) -> Union[None, str]:
     """Get the .status.ackResourceMetadata.arn value from a given resource.
@@ -191,57 +791,207 @@ def get_resource_arn(resource: object) -> Union[None, str]:
         None or string: None if the status field doesn't exist, otherwise the
             field value.
     """
-    if 'ackResourceMetadata' in resource['status'] and \
-        'arn' in resource['status']['ackResourceMetadata']:
-        return resource['status']['ackResourceMetadata']['arn']
-    return None
+    return status.view(resource).arn
 
 def _get_resource_synced(resource: object) -> Union[None, bool]:
-    """Get the .status.ACK.ResourceSynced boolean from a given resource.
+    """Get the status of the ACK.ResourceSynced condition from a given resource.
 
     Returns:
-        None or bool: None if the status field doesn't exist, otherwise the
-            field value cast to a boolean (default False).
+        None or bool: None if the condition doesn't exist, otherwise whether
+            its status is "True".
     """
-    if 'status' not in resource or 'conditions' not in resource['status']:
-        return None
+    return status.view(resource).synced
 
-    conditions: Dict = resource['status']['conditions']
-    if 'ACK' not in conditions or 'ResourceSynced' not in conditions['ACK']:
-        return None
-    resource_synced: Dict = conditions['ACK']['ResourceSynced']
-    return bool(resource_synced.get('status', False))
+@dataclass
+class WaitOutcome:
+    """The result of `wait_for`, true only if the awaited condition held.
+
+    `reason` is "satisfied" when the awaited condition held, "aborted" when an
+    abort condition held first, "missing" when the resource didn't exist, or
+    "timeout". `condition` and `message` are those of the condition that
+    ended the wait, and `resource` the last observation of the resource.
+    """
+    reason: str
+    condition: Optional[str] = None
+    message: Optional[str] = None
+    resource: Optional[dict] = None
+    polls: int = 0
+
+    @property
+    def satisfied(self) -> bool:
+        return self.reason == "satisfied"
 
+    def __bool__(self) -> bool:
+        return self.satisfied
+
+
+@tracing.traced
+def wait_for(reference: CustomResourceReference, until: status.Predicate,
+             abort_on: Optional[status.Predicate] = None,
+             wait_periods: int = 2, period_length: int = 60) -> WaitOutcome:
+    """Wait for the resource to satisfy `until`, observing it immediately then
+    after each period, and give up as soon as it satisfies `abort_on`
+    (e.g. `status.terminal | status.status_in({"Failed"})`) instead.
+
+    Returns:
+        WaitOutcome: Why the wait ended, and the condition that ended it.
+    """
+    span = tracing.current_span()
+    outcome = WaitOutcome("timeout", until.name)
+    for poll in range(1, wait_periods + 2):
+        outcome.polls = poll
+        span.set_attribute("ack.polls", poll)
+        try:
+            outcome.resource = get_resource(reference)
+        except ApiException as e:
+            if e.status != 404:
+                raise
+            outcome.reason, outcome.condition, outcome.resource = "missing", None, None
+            logging.error(f"Resource {reference} does not exist")
+            break
+
+        match = abort_on(outcome.resource) if abort_on is not None else None
+        if match is not None:
+            outcome.reason = "aborted"
+        else:
+            match = until(outcome.resource)
+            if match is not None:
+                outcome.reason = "satisfied"
+        if match is not None:
+            outcome.condition, outcome.message = match
+            break
+
+        if poll <= wait_periods:
+            logging.debug(f"Waiting for resource {reference} to satisfy {until.name}")
+            sleep(period_length)
+
+    span.set_attribute("ack.wait_reason", outcome.reason)
+    span.set_attribute("ack.wait_condition", outcome.condition)
+    if outcome.reason == "aborted":
+        detail = f": {outcome.message}" if outcome.message else ""
+        logging.error(f"Stopped waiting for resource {reference} to satisfy {until.name}, "
+                      f"as it satisfies {outcome.condition}{detail}")
+    elif outcome.reason == "timeout":
+        logging.error(f"Wait for resource {reference} to satisfy {until.name} timed out")
+    return outcome
+
+
+@tracing.traced
 def wait_resource_synced(reference: CustomResourceReference,
                          wait_periods: int = 2, period_length: int = 60):
-    if not get_resource_exists(reference):
-        logging.error(f"Resource {reference} does not exist")
-        return False
+    """Wait for the resource to be synced, failing as soon as it is terminal.
 
+    Returns:
+        bool: True if the resource was synced before the timeout.
+    """
     if wait_resource_consumed_by_controller(reference) is None:
         return False
 
-    for _ in range(wait_periods):
-        logging.debug(f"Waiting for resource {reference} to be synced")
+    outcome = wait_for(reference, until=status.synced,
+                       abort_on=status.terminal | ~status.condition_exists(status.ACK_RESOURCE_SYNCED),
+                       wait_periods=wait_periods, period_length=period_length)
+    tracing.current_span().set_attribute("ack.synced", outcome.satisfied)
+    if outcome:
+        logging.info(f"Resource {reference} is synced, continuing...")
+    return outcome.satisfied
+
+
+@tracing.traced(kind=tracing.SPAN_KIND_CLIENT)
+def _list_resources(group: str, version: str, plural: str, namespace: Optional[str],
+                    field_selector: Optional[str] = None, label_selector: Optional[str] = None,
+                    page_size: int = 500) -> List[dict]:
+    """List every custom resource of a kind, following continue tokens until
+    all pages have been read.
+    """
+    _api_client = _get_k8s_api_client()
+    _api = client.CustomObjectsApi(_api_client)
 
-        resource = get_resource(reference)
+    kwargs = {"limit": page_size}
+    if field_selector is not None:
+        kwargs["field_selector"] = field_selector
+    if label_selector is not None:
+        kwargs["label_selector"] = label_selector
+
+    items = []
+    while True:
+        if namespace is None:
+            page = _api.list_cluster_custom_object(group, version, plural, **kwargs)
+        else:
+            page = _api.list_namespaced_custom_object(group, version, namespace, plural, **kwargs)
+        items.extend(page.get("items", []))
+
+        continue_token = page.get("metadata", {}).get("continue")
+        if not continue_token:
+            return items
+        kwargs["_continue"] = continue_token
+
+
+@tracing.traced
+def get_resources(references: List[CustomResourceReference],
+                  label_selector: Optional[str] = None,
+                  page_size: int = 500) -> List[Optional[dict]]:
+    """Get the resources from the given references with one (paginated) list
+    call per group, version, plural and namespace, rather than one call per
+    reference.
+
+    A label selector matching all of the references, when there is one,
+    reduces the number of objects listed alongside them.
 
-        sync_status = _get_resource_synced(resource)
-        # Ensure the status existed
-        if sync_status is None:
-            logging.error(f"Expected .ACK.ResourceSynced to exist in {reference}")
-            return False
+    Returns:
+        list: For each reference, in order, None if the resource doesnt exist
+            in server, otherwise the custom object.
+    """
+    groups: Dict[Tuple[str, str, str, Optional[str]], List[int]] = {}
+    for index, reference in enumerate(references):
+        key = (reference.group, reference.version, reference.plural, reference.namespace)
+        groups.setdefault(key, []).append(index)
+
+    resources: List[Optional[dict]] = [None] * len(references)
+    for (group, version, plural, namespace), indices in groups.items():
+        # Custom resources can only be selected by field on their name
+        field_selector = None
+        if len(indices) == 1:
+            field_selector = f"metadata.name={references[indices[0]].name}"
+
+        by_name = {item["metadata"]["name"]: item for item in _list_resources(
+            group, version, plural, namespace, field_selector, label_selector, page_size)}
+        for index in indices:
+            resources[index] = by_name.get(references[index].name)
+    return resources
+
+
+@tracing.traced
+def wait_all_synced(references: List[CustomResourceReference],
+                    wait_periods: int = 2, period_length: int = 60,
+                    label_selector: Optional[str] = None) -> bool:
+    """Wait for every resource from the given references to be synced, checking
+    all of them at once every period with `get_resources`.
 
-        if sync_status:
-            logging.info(f"Resource {reference} is synced, continuing...")
+    Returns:
+        bool: True if every resource was synced before the timeout.
+    """
+    pending = list(references)
+    for period in range(wait_periods + 1):
+        resources = get_resources(pending, label_selector)
+        pending = [reference for reference, resource in zip(pending, resources)
+                   if resource is None or not _get_resource_synced(resource)]
+        span = tracing.current_span()
+        span.set_attribute("ack.polls", period + 1)
+        span.set_attribute("ack.pending", len(pending))
+        if not pending:
+            logging.info(f"All {len(references)} resources are synced, continuing...")
             return True
 
-        sleep(period_length)
+        logging.debug(f"Waiting for {len(pending)} of {len(references)} resources to be synced")
+        if period < wait_periods:
+            sleep(period_length)
 
-    logging.error(f"Wait for resource {reference} to be synced timed out")
+    logging.error(f"Wait for resources to be synced timed out, not synced: "
+                  f"{', '.join(str(reference) for reference in pending)}")
     return False
 
 
+@tracing.traced
 def is_resource_in_terminal_condition(
         reference: CustomResourceReference, expected_substring: str):
     if not get_resource_exists(reference):
@@ -252,7 +1002,7 @@ def is_resource_in_terminal_condition(
     terminal_status = _get_terminal_condition(resource)
     # Ensure the status existed
     if terminal_status is None:
-        logging.error(f"Expected .ACK.Terminal to exist in {reference}")
+        logging.error(f"Expected ACK.Terminal condition to exist in {reference}")
         return False
 
     if not terminal_status:
@@ -260,7 +1010,8 @@ def is_resource_in_terminal_condition(
             f"Expected terminal condition for resource {reference} to be true")
         return False
 
-    terminal_message = terminal.get('message', None)
+    terminal_message = status.view(resource).condition_message(status.ACK_TERMINAL)
+    tracing.current_span().set_attribute("ack.terminal_message", terminal_message)
     if terminal_message != expected_substring:
         logging.error(f"Resource {reference} has terminal condition set True, but with a different message than expected."
                       f" Expected '{expected_substring}', found '{terminal_message}'")
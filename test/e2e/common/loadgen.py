@@ -0,0 +1,389 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Open-loop load generator churning custom resources at a target rate.
+
+Operations (create, patch or delete, in a configurable mix) are scheduled at
+a fixed target rate whether or not earlier ones have completed, and run by a
+pool of workers. When the API server or the controller falls behind, the
+operations queue up instead of slowing the schedule down, so the report shows
+the backlog growing rather than a lower, seemingly healthy, throughput.
+
+Latencies are measured from when each operation was scheduled, so they include
+the time it spent queued. A watch on the generated resources also measures
+how long the controller takes to report each created resource as synced, and
+how many created resources it has yet to sync:
+
+    python -m common.loadgen sagemaker xgboost_model models --name-key MODEL_NAME \\
+        --rate 5 --duration 600 --mix create=0.5,patch=0.3,delete=0.2
+"""
+
+import sys
+import json
+import random
+import argparse
+import logging
+import threading
+
+from queue import Queue
+from time import perf_counter
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from kubernetes import client, watch
+
+from . import k8s, metrics, status
+from .clock import sleep
+from .resources import (add_template_arguments, load_resource_file, random_suffix_name,
+                        template_replacements)
+
+OPERATIONS = ("create", "patch", "delete")
+
+# Annotation changed by the default patch, so that every patch is an update
+PATCH_ANNOTATION = "e2e.services.k8s.aws/loadgen-patch"
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parses an operation mix such as `create=0.5,patch=0.3,delete=0.2`."""
+    weights = {}
+    for entry in mix.split(","):
+        operation, _, weight = entry.partition("=")
+        operation = operation.strip()
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation {operation}, expected one of {OPERATIONS}")
+        weights[operation] = float(weight or 1)
+    if sum(weights.values()) <= 0:
+        raise ValueError(f"Operation mix {mix} has no positive weight")
+    return weights
+
+
+@dataclass
+class _Operation:
+    kind: str
+    scheduled: float
+
+
+@dataclass
+class LoadInterval:
+    """Stores what happened during one reporting interval."""
+
+    elapsed_seconds: float
+    scheduled: int
+    completed: int
+    errors: int
+    # Operations scheduled but not yet completed at the end of the interval
+    backlog: int
+    # Created resources the controller has not yet reported as synced
+    unsynced: int
+    latency_p99_seconds: Optional[float]
+    sync_p50_seconds: Optional[float]
+
+
+@dataclass
+class LoadReport:
+    target_rate: float
+    duration_seconds: float
+    achieved_rate: float
+    scheduled: int
+    completed: int
+    errors: Dict[str, int] = field(default_factory=dict)
+    latency_seconds: Dict[str, Dict[str, Optional[float]]] = field(default_factory=dict)
+    sync_latency_seconds: Dict[str, Optional[float]] = field(default_factory=dict)
+    final_backlog: int = 0
+    final_unsynced: int = 0
+    timeline: List[LoadInterval] = field(default_factory=list)
+
+
+class LoadGenerator:
+    """Churns resources of one kind, rendered from a resource template, at a
+    target rate.
+    """
+
+    def __init__(self, service: str, resource_template: str, plural: str, name_key: str,
+                 namespace: str, group: str, version: str, replacements: Dict[str, Any],
+                 rate: float, mix: Dict[str, float], concurrency: int = 16,
+                 patch: Optional[dict] = None, poisson: bool = False):
+        self.service = service
+        self.resource_template = resource_template
+        self.plural = plural
+        self.name_key = name_key
+        self.namespace = namespace
+        self.group = group
+        self.version = version
+        self.replacements = replacements
+        self.rate = rate
+        self.operations, self.weights = zip(*mix.items())
+        self.concurrency = concurrency
+        self.patch = patch
+        self.poisson = poisson
+
+        self._queue: "Queue[Optional[_Operation]]" = Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._live: List[str] = []
+        self._patches = 0
+        # Time each created resource was created at, until it is synced
+        self._created_at: Dict[str, float] = {}
+        self._sync_latencies: List[Tuple[float, float]] = []
+        self._latencies: Dict[str, List[Tuple[float, float]]] = {op: [] for op in OPERATIONS}
+        self._errors: Dict[str, int] = {op: 0 for op in OPERATIONS}
+        self._scheduled = 0
+        self._completed = 0
+        self._start = 0.0
+
+    def _reference(self, name: str) -> k8s.CustomResourceReference:
+        return k8s.CustomResourceReference(
+            self.group, self.version, self.plural, name, namespace=self.namespace)
+
+    def _take_live(self, remove: bool) -> Optional[str]:
+        """Picks a random live resource, removing it from the live ones if it
+        is about to be deleted.
+        """
+        with self._lock:
+            if not self._live:
+                return None
+            index = random.randrange(len(self._live))
+            name = self._live[index]
+            if remove:
+                # Swap with the last resource to remove it in constant time
+                self._live[index] = self._live[-1]
+                self._live.pop()
+            return name
+
+    def _create(self):
+        name = random_suffix_name(f"load-{self.resource_template.replace('_', '-')}", 32)
+        body = load_resource_file(
+            self.service, self.resource_template,
+            additional_replacements={**self.replacements, self.name_key: name})
+        # Registered first, as the watch may see the resource synced before
+        # the creation call returns
+        with self._lock:
+            self._created_at[name] = perf_counter()
+        try:
+            k8s.create_custom_resource(self._reference(name), body)
+        except Exception:
+            with self._lock:
+                self._created_at.pop(name, None)
+            raise
+        with self._lock:
+            self._live.append(name)
+
+    def _patch(self, name: str):
+        with self._lock:
+            self._patches += 1
+            generation = self._patches
+        body = self.patch or {"metadata": {"annotations": {PATCH_ANNOTATION: str(generation)}}}
+        k8s.patch_custom_resource(self._reference(name), body)
+
+    def _delete(self, name: str):
+        with self._lock:
+            self._created_at.pop(name, None)
+        # Only issue the deletion, without waiting for the resource's removal
+        client.CustomObjectsApi(k8s._get_k8s_api_client()).delete_namespaced_custom_object(
+            self.group, self.version, self.namespace, self.plural, name)
+
+    def _execute(self, operation: _Operation):
+        kind = operation.kind
+        try:
+            # Resources can only be patched or deleted once some exist
+            name = self._take_live(remove=kind == "delete") if kind != "create" else None
+            if name is None:
+                kind = "create"
+                self._create()
+            elif kind == "patch":
+                self._patch(name)
+            else:
+                self._delete(name)
+        except Exception as e:
+            logging.debug(f"{kind} failed: {e}")
+            with self._lock:
+                self._errors[kind] += 1
+                self._completed += 1
+            return
+
+        now = perf_counter()
+        with self._lock:
+            self._latencies[kind].append((now, now - operation.scheduled))
+            self._completed += 1
+
+    def _work(self):
+        while True:
+            operation = self._queue.get()
+            # Operations still queued once the run ends are dropped
+            if operation is None or self._stop.is_set():
+                return
+            self._execute(operation)
+
+    def _watch_synced(self):
+        """Records when the controller first reports each created resource as
+        synced.
+        """
+        _api = client.CustomObjectsApi(k8s._get_k8s_api_client())
+        label_selector = k8s.run_label_selector()
+        while not self._stop.is_set():
+            _watch = watch.Watch()
+            try:
+                for event in _watch.stream(
+                        _api.list_namespaced_custom_object, self.group, self.version,
+                        self.namespace, self.plural, label_selector=label_selector,
+                        timeout_seconds=30):
+                    name = event["object"]["metadata"]["name"]
+                    if event["type"] in ("ADDED", "MODIFIED") and status.view(event["object"]).synced:
+                        now = perf_counter()
+                        with self._lock:
+                            created_at = self._created_at.pop(name, None)
+                            if created_at is not None:
+                                self._sync_latencies.append((now, now - created_at))
+                    if self._stop.is_set():
+                        _watch.stop()
+            except Exception as e:
+                logging.warning(f"Watch on {self.plural} failed, restarting: {e}")
+                self._stop.wait(1)
+
+    def _schedule(self, duration_seconds: float):
+        """Enqueues operations at the target rate until the duration elapses,
+        however many are still waiting to be run.
+        """
+        next_at = self._start
+        end = self._start + duration_seconds
+        while True:
+            next_at += random.expovariate(self.rate) if self.poisson else 1 / self.rate
+            if next_at >= end:
+                return
+            delay = next_at - perf_counter()
+            if delay > 0:
+                sleep(delay)
+            kind = random.choices(self.operations, self.weights)[0]
+            self._queue.put(_Operation(kind, next_at))
+            with self._lock:
+                self._scheduled += 1
+
+    def _interval(self, elapsed: float, since: float, previous: Tuple[int, int, int]
+                  ) -> Tuple[LoadInterval, Tuple[int, int, int]]:
+        with self._lock:
+            errors = sum(self._errors.values())
+            counts = (self._scheduled, self._completed, errors)
+            latencies = [latency for kind in OPERATIONS
+                         for at, latency in self._latencies[kind] if at >= since]
+            syncs = [latency for at, latency in self._sync_latencies if at >= since]
+            unsynced = len(self._created_at)
+        interval = LoadInterval(
+            elapsed_seconds=elapsed,
+            scheduled=counts[0] - previous[0],
+            completed=counts[1] - previous[1],
+            errors=counts[2] - previous[2],
+            backlog=counts[0] - counts[1],
+            unsynced=unsynced,
+            latency_p99_seconds=metrics.percentiles(latencies)["p99"],
+            sync_p50_seconds=metrics.percentiles(syncs)["p50"],
+        )
+        return interval, counts
+
+    def run(self, duration_seconds: float, report_interval: float = 10,
+            drain_seconds: float = 60) -> LoadReport:
+        """Generates load for the given duration, then waits up to
+        `drain_seconds` for the operations still queued to complete.
+        """
+        workers = [threading.Thread(target=self._work, name=f"loadgen-{i}", daemon=True)
+                   for i in range(self.concurrency)]
+        watcher = threading.Thread(target=self._watch_synced, name="loadgen-watch", daemon=True)
+        for thread in workers + [watcher]:
+            thread.start()
+
+        self._start = perf_counter()
+        scheduler = threading.Thread(target=self._schedule, args=(duration_seconds,),
+                                     name="loadgen-schedule", daemon=True)
+        scheduler.start()
+
+        report = LoadReport(target_rate=self.rate, duration_seconds=duration_seconds,
+                            achieved_rate=0, scheduled=0, completed=0)
+        counts = (0, 0, 0)
+        interval_start = self._start
+        deadline = self._start + duration_seconds + drain_seconds
+        while perf_counter() < deadline:
+            sleep(min(report_interval, max(deadline - perf_counter(), 0)))
+            interval, counts = self._interval(perf_counter() - self._start, interval_start, counts)
+            interval_start = perf_counter()
+            report.timeline.append(interval)
+            logging.info(f"Load interval: {asdict(interval)}")
+            if not scheduler.is_alive() and interval.backlog == 0:
+                break
+
+        self._stop.set()
+        for _ in workers:
+            self._queue.put(None)
+
+        elapsed = perf_counter() - self._start
+        with self._lock:
+            report.scheduled = self._scheduled
+            report.completed = self._completed
+            report.achieved_rate = self._completed / elapsed
+            report.errors = dict(self._errors)
+            report.latency_seconds = {
+                kind: metrics.percentiles([latency for _, latency in latencies])
+                for kind, latencies in self._latencies.items()}
+            report.sync_latency_seconds = metrics.percentiles(
+                [latency for _, latency in self._sync_latencies])
+            report.final_backlog = self._scheduled - self._completed
+            report.final_unsynced = len(self._created_at)
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m common.loadgen")
+    add_template_arguments(parser)
+    parser.add_argument("--rate", type=float, required=True,
+                        help="operations scheduled per second")
+    parser.add_argument("--duration", type=float, default=300,
+                        help="seconds to schedule operations for")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("create=0.5,patch=0.3,delete=0.2"),
+                        help="weight of each operation, e.g. create=0.5,patch=0.3,delete=0.2")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="operations run at the same time")
+    parser.add_argument("--poisson", action="store_true",
+                        help="schedule operations at exponentially distributed intervals "
+                             "rather than evenly")
+    parser.add_argument("--patch", type=json.loads, default=None,
+                        help="JSON merge patch applied by patch operations (default: "
+                             "change an annotation)")
+    parser.add_argument("--report-interval", type=float, default=10)
+    parser.add_argument("--drain", type=float, default=60,
+                        help="seconds to wait for queued operations once scheduling stops")
+    parser.add_argument("--output", help="file to write the JSON report to")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    replacements = template_replacements(args)
+
+    namespace = random_suffix_name("ack-loadgen", 24)
+    k8s.create_k8s_namespace(namespace)
+    try:
+        generator = LoadGenerator(
+            args.service, args.resource, args.plural, args.name_key, namespace,
+            args.group or f"{args.service}.services.k8s.aws", args.version, replacements,
+            args.rate, args.mix, args.concurrency, args.patch, args.poisson)
+        report = generator.run(args.duration, args.report_interval, args.drain)
+    finally:
+        k8s.delete_k8s_namespace(namespace)
+        k8s.wait_k8s_namespace_deleted(namespace)
+
+    output = json.dumps(asdict(report), indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as stream:
+            stream.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Collects resource usage metrics of the controller under test.
+
+Metrics are read either from the Prometheus instance deployed by
+`kind-setup/prometheus/prometheus-setup.yaml` or directly from a Prometheus
+text exposition endpoint, such as the controller's own `/metrics` endpoint or a
+fake one serving canned metrics.
+"""
+
+import json
+import math
+import logging
+import threading
+import urllib.parse
+import urllib.request
+
+from time import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Counter and gauge metrics exposed by every controller-runtime based
+# controller, keyed by the name they are reported under
+CONTROLLER_METRICS = {
+    "cpu_seconds": "process_cpu_seconds_total",
+    "memory_bytes": "process_resident_memory_bytes",
+    "workqueue_depth": "workqueue_depth",
+    "reconcile_total": "controller_runtime_reconcile_total",
+    "reconcile_errors": "controller_runtime_reconcile_errors_total",
+    "reconcile_seconds_sum": "controller_runtime_reconcile_time_seconds_sum",
+    "reconcile_seconds_count": "controller_runtime_reconcile_time_seconds_count",
+    "api_requests": "rest_client_requests_total",
+}
+
+RECONCILE_HISTOGRAM = "controller_runtime_reconcile_time_seconds_bucket"
+
+DEFAULT_PROMETHEUS_SELECTOR = 'namespace="ack-system",service=~"ack-.*"'
+
+
+@dataclass
+class MetricsSnapshot:
+    """Stores the value of each controller metric at a point in time.
+
+    Series are summed across labels, except for the reconcile duration
+    histogram which is kept per bucket upper bound (`le`).
+    """
+
+    timestamp: float
+    values: Dict[str, float] = field(default_factory=dict)
+    reconcile_buckets: Dict[float, float] = field(default_factory=dict)
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Get the count, median, 90th and 99th percentiles and maximum of the
+    values, using the nearest rank: the smallest value no less than the given
+    fraction of the values.
+    """
+    if not values:
+        return {"count": 0, "p50": None, "p90": None, "p99": None, "max": None}
+    values = sorted(values)
+
+    def at(quantile: float) -> float:
+        return values[max(math.ceil(quantile * len(values)) - 1, 0)]
+    return {"count": len(values), "p50": at(0.5), "p90": at(0.9), "p99": at(0.99),
+            "max": values[-1]}
+
+
+def _histogram_quantile(quantile: float, buckets: Dict[float, float]) -> Optional[float]:
+    """Estimates a quantile from cumulative histogram buckets using the same
+    linear interpolation as PromQL's `histogram_quantile`.
+    """
+    if not buckets:
+        return None
+    bounds = sorted(buckets)
+    total = buckets[bounds[-1]]
+    if total <= 0:
+        return None
+
+    rank = quantile * total
+    lower_bound, lower_count = 0.0, 0.0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if bound == float("inf"):
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+
+def parse_exposition(text: str) -> List[Tuple[str, Dict[str, str], float]]:
+    """Parses the Prometheus text exposition format into a list of
+    (metric name, labels, value) samples.
+    """
+    samples = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        labels = {}
+        if "{" in line:
+            name, _, rest = line.partition("{")
+            label_str, _, value_str = rest.rpartition("}")
+            for pair in _split_labels(label_str):
+                key, _, value = pair.partition("=")
+                labels[key.strip()] = value.strip().strip('"')
+        else:
+            name, _, value_str = line.partition(" ")
+
+        # Drop the optional trailing timestamp
+        value_str = value_str.strip().split(" ")[0]
+        try:
+            samples.append((name.strip(), labels, float(value_str)))
+        except ValueError:
+            logging.debug(f"Skipping unparseable metrics line: {line}")
+    return samples
+
+
+def _split_labels(label_str: str) -> List[str]:
+    pairs, current, quoted = [], "", False
+    for char in label_str:
+        if char == '"' and not current.endswith("\\"):
+            quoted = not quoted
+        if char == "," and not quoted:
+            pairs.append(current)
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        pairs.append(current)
+    return pairs
+
+
+class ExpositionSource:
+    """Reads metrics directly from a Prometheus text exposition endpoint."""
+
+    def __init__(self, url: str, timeout: int = 10):
+        self.url = url
+        self.timeout = timeout
+
+    def snapshot(self) -> MetricsSnapshot:
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+            samples = parse_exposition(response.read().decode("utf-8"))
+
+        metric_names = {v: k for k, v in CONTROLLER_METRICS.items()}
+        snapshot = MetricsSnapshot(time())
+        for name, labels, value in samples:
+            if name in metric_names:
+                key = metric_names[name]
+                snapshot.values[key] = snapshot.values.get(key, 0.0) + value
+            elif name == RECONCILE_HISTOGRAM:
+                bound = float(labels.get("le", "+Inf"))
+                snapshot.reconcile_buckets[bound] = \
+                    snapshot.reconcile_buckets.get(bound, 0.0) + value
+        return snapshot
+
+
+class PrometheusSource:
+    """Reads metrics through the Prometheus HTTP query API, restricted to the
+    series matching a label selector.
+    """
+
+    def __init__(self, url: str, selector: str = DEFAULT_PROMETHEUS_SELECTOR,
+                 timeout: int = 10):
+        self.url = url.rstrip("/")
+        self.selector = selector
+        self.timeout = timeout
+
+    def _query(self, query: str) -> List[dict]:
+        url = f"{self.url}/api/v1/query?" + urllib.parse.urlencode({"query": query})
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            body = json.load(response)
+        if body.get("status") != "success":
+            raise RuntimeError(f"Prometheus query '{query}' failed: {body.get('error')}")
+        return body["data"]["result"]
+
+    def snapshot(self) -> MetricsSnapshot:
+        snapshot = MetricsSnapshot(time())
+        for key, metric in CONTROLLER_METRICS.items():
+            for result in self._query(f"sum({metric}{{{self.selector}}})"):
+                snapshot.values[key] = float(result["value"][1])
+
+        for result in self._query(f"sum by (le) ({RECONCILE_HISTOGRAM}{{{self.selector}}})"):
+            bound = float(result["metric"].get("le", "+Inf"))
+            snapshot.reconcile_buckets[bound] = float(result["value"][1])
+        return snapshot
+
+
+def compute_deltas(start: MetricsSnapshot, end: MetricsSnapshot,
+                   samples: Optional[List[MetricsSnapshot]] = None) -> Dict[str, float]:
+    """Summarises the controller's resource usage between two snapshots.
+
+    Counters are reported as the increase over the window, gauges as their
+    change and, when intermediate samples are given, their peak.
+    """
+    def value(snapshot: MetricsSnapshot, key: str) -> float:
+        return snapshot.values.get(key, 0.0)
+
+    window = [start] + (samples or []) + [end]
+    deltas = {
+        "duration_seconds": end.timestamp - start.timestamp,
+        "cpu_seconds": value(end, "cpu_seconds") - value(start, "cpu_seconds"),
+        "memory_bytes": value(end, "memory_bytes") - value(start, "memory_bytes"),
+        "memory_peak_bytes": max(value(s, "memory_bytes") for s in window),
+        "workqueue_depth_peak": max(value(s, "workqueue_depth") for s in window),
+        "reconcile_total": value(end, "reconcile_total") - value(start, "reconcile_total"),
+        "reconcile_errors": value(end, "reconcile_errors") - value(start, "reconcile_errors"),
+        "api_requests": value(end, "api_requests") - value(start, "api_requests"),
+    }
+
+    reconcile_count = value(end, "reconcile_seconds_count") - value(start, "reconcile_seconds_count")
+    if reconcile_count > 0:
+        reconcile_sum = value(end, "reconcile_seconds_sum") - value(start, "reconcile_seconds_sum")
+        deltas["reconcile_seconds_mean"] = reconcile_sum / reconcile_count
+
+    bucket_deltas = {bound: count - start.reconcile_buckets.get(bound, 0.0)
+                     for bound, count in end.reconcile_buckets.items()}
+    p99 = _histogram_quantile(0.99, bucket_deltas)
+    if p99 is not None:
+        deltas["reconcile_seconds_p99"] = p99
+    return deltas
+
+
+class ControllerMetricsCollector:
+    """Snapshots the controller's metrics on demand and, optionally, at a
+    fixed interval in a background thread.
+
+    Samples are only kept while a window opened with `open_window` may need
+    them, so that the collector's memory does not grow with the session.
+    """
+
+    def __init__(self, source, interval: Optional[float] = None):
+        self.source = source
+        self.interval = interval
+        # Samples taken since the start of the oldest open window
+        self.samples: List[MetricsSnapshot] = []
+        self._window_starts: List[float] = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def snapshot(self) -> MetricsSnapshot:
+        snapshot = self.source.snapshot()
+        with self._lock:
+            if self._window_starts:
+                self.samples.append(snapshot)
+        return snapshot
+
+    def open_window(self) -> MetricsSnapshot:
+        """Snapshot the metrics at the start of a window, keeping every sample
+        taken until the window is closed.
+        """
+        snapshot = self.source.snapshot()
+        with self._lock:
+            self._window_starts.append(snapshot.timestamp)
+            self.samples.append(snapshot)
+        return snapshot
+
+    def close_window(self, start: MetricsSnapshot) -> Tuple[MetricsSnapshot, List[MetricsSnapshot]]:
+        """Snapshot the metrics at the end of the window opened by `start`.
+
+        Returns:
+            tuple: The final snapshot, and the samples taken in between.
+        """
+        try:
+            end = self.source.snapshot()
+        finally:
+            with self._lock:
+                self._window_starts.remove(start.timestamp)
+                samples = [s for s in self.samples if s.timestamp > start.timestamp]
+                # Drop the samples no other open window needs
+                oldest = min(self._window_starts, default=float("inf"))
+                self.samples = [s for s in self.samples if s.timestamp >= oldest]
+        return end, [s for s in samples if s.timestamp < end.timestamp]
+
+    def _sample_periodically(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.snapshot()
+            except Exception:
+                logging.exception("Unable to sample controller metrics")
+
+    def start(self):
+        if self.interval and self._thread is None:
+            self._thread = threading.Thread(
+                target=self._sample_periodically, name="controller-metrics", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
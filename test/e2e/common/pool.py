@@ -0,0 +1,143 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Session-scoped pool of prerequisite resources shared between test modules.
+
+Prerequisites that several test modules need (e.g. a Model for the
+EndpointConfig and Endpoint tests) are declared once with `pooled_fixture`,
+making them session-scoped so that they are created at most once per worker.
+At collection, every test module using a pooled fixture is grouped with the
+other modules using it, and the grouped modules are scheduled onto the same
+xdist worker so that they lease the same instance of the prerequisite rather
+than each worker creating its own.
+
+The master schedules tests knowing only their node IDs, so each worker writes
+the pool group of every node ID it collected to a directory shared with the
+master, which `PoolGroupScheduling` reads. Node IDs are left unchanged.
+"""
+
+import os
+import json
+import tempfile
+
+from typing import Callable, Dict, List, Optional, Set
+
+import pytest
+from xdist.scheduler import LoadFileScheduling
+
+# Names of all fixtures declared with `pooled_fixture`
+POOLED_FIXTURES: Set[str] = set()
+
+
+def pooled_fixture(func: Callable) -> Callable:
+    """Declares a session-scoped fixture holding a shared prerequisite.
+
+    Test modules using the fixture are scheduled onto the same worker.
+    """
+    POOLED_FIXTURES.add(func.__name__)
+    return pytest.fixture(scope="session")(func)
+
+
+def _module_of(item: pytest.Item) -> str:
+    return item.nodeid.split("::", 1)[0]
+
+
+def assign_pool_groups(items: List[pytest.Item]) -> Dict[str, str]:
+    """Groups together every test module sharing a pooled fixture, directly or
+    through another module. Items are reordered so that each group runs
+    contiguously.
+
+    Returns:
+        dict: The name of the pool group of each grouped item, by node ID.
+    """
+    # Union-find over modules, joined by the pooled fixtures they use
+    parent: Dict[str, str] = {}
+
+    def find(node: str) -> str:
+        while parent.setdefault(node, node) != node:
+            node = parent[node]
+        return node
+
+    pooled_by_module: Dict[str, Set[str]] = {}
+    for item in items:
+        used = POOLED_FIXTURES.intersection(getattr(item, "fixturenames", ()))
+        if used:
+            pooled_by_module.setdefault(_module_of(item), set()).update(used)
+
+    for module, fixtures in pooled_by_module.items():
+        for fixture in fixtures:
+            parent[find(module)] = find(f"fixture:{fixture}")
+
+    groups: Dict[str, Set[str]] = {}
+    for module, fixtures in pooled_by_module.items():
+        groups.setdefault(find(module), set()).update(fixtures)
+    group_names = {root: "+".join(sorted(fixtures)) for root, fixtures in groups.items()}
+
+    pool_groups = {item.nodeid: group_names[find(_module_of(item))]
+                   for item in items if _module_of(item) in pooled_by_module}
+
+    first_index: Dict[str, int] = {}
+    for index, item in enumerate(items):
+        first_index.setdefault(_scope_of(item.nodeid, pool_groups), index)
+    items.sort(key=lambda item: first_index[_scope_of(item.nodeid, pool_groups)])
+    return pool_groups
+
+
+def _scope_of(nodeid: str, pool_groups: Dict[str, str]) -> str:
+    group = pool_groups.get(nodeid)
+    if group is not None:
+        return f"pool:{group}"
+    return nodeid.split("::", 1)[0]
+
+
+def pool_groups_directory(config) -> str:
+    """Get the directory, created on first use, through which the workers
+    of a session hand their pool groups to the master.
+    """
+    directory = getattr(config, "_ack_pool_groups_dir", None)
+    if directory is None:
+        directory = config._ack_pool_groups_dir = tempfile.mkdtemp(prefix="ack-e2e-pool-")
+    return directory
+
+
+def write_pool_groups(directory: str, worker_id: str, pool_groups: Dict[str, str]):
+    path = os.path.join(directory, f"{worker_id}.json")
+    with open(f"{path}.tmp", "w") as stream:
+        json.dump(pool_groups, stream)
+    os.replace(f"{path}.tmp", path)
+
+
+def read_pool_groups(directory: str) -> Dict[str, str]:
+    """Merge the pool groups written by every worker."""
+    pool_groups: Dict[str, str] = {}
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name)) as stream:
+                pool_groups.update(json.load(stream))
+    return pool_groups
+
+
+class PoolGroupScheduling(LoadFileScheduling):
+    """Schedules tests by module, like `--dist loadfile`, except that modules
+    in the same pool group are sent to the same worker as a single unit.
+    """
+
+    def __init__(self, config, log=None):
+        super().__init__(config, log)
+        self._directory = pool_groups_directory(config)
+        self._pool_groups: Optional[Dict[str, str]] = None
+
+    def _split_scope(self, nodeid: str) -> str:
+        # Scopes are only split once every worker has finished collecting
+        if self._pool_groups is None:
+            self._pool_groups = read_pool_groups(self._directory)
+        return _scope_of(nodeid, self._pool_groups)
@@ -0,0 +1,220 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Pre-warms long-lead resources at the start of the test session.
+
+Resources that take minutes to provision, such as SageMaker training and
+processing jobs, are declared with `prewarmed` under the name of the fixture
+that owns them. When the session is started with `--prewarm`, the controlling
+process (the xdist master, or the only process when not distributing) creates
+in the background, in a namespace of its own, every declared resource whose
+fixture is used by a collected test. The fixture then claims the in-flight
+resource rather than creating it, so that provisioning overlaps with the tests
+that run before it. Fixtures fall back to creating their own resource whenever
+nothing was pre-warmed for them.
+
+The xdist master does not collect tests, so the workers hand it the names of
+the resources their tests use, and it hands them back the references of the
+pre-warmed resources, through files in a directory they share.
+"""
+
+import os
+import json
+import logging
+import tempfile
+
+from time import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from . import k8s
+from .clock import sleep
+
+# Builds the reference and body of a resource to create in the given namespace
+ResourceDeclaration = Callable[[str], Tuple[k8s.CustomResourceReference, dict]]
+
+# Every resource declared with `prewarmed`, keyed by name
+PREWARM_DECLARATIONS: Dict[str, ResourceDeclaration] = {}
+
+# References to the resources pre-warmed for this session, and the pending
+# creation of each when it was submitted from this process
+_prewarmed: Dict[str, k8s.CustomResourceReference] = {}
+_pending: Dict[str, Future] = {}
+
+# Directory from which a worker imports the references handed over by the
+# master, on the first claim, and in which workers claim them
+_handoff_directory: Optional[str] = None
+_handoff_imported = False
+
+_REFERENCES_FILE = "prewarmed.json"
+
+
+def prewarmed(name: str) -> Callable[[ResourceDeclaration], ResourceDeclaration]:
+    """Declares a long-lead resource to create at the start of the session,
+    when a collected test uses the fixture with the given name.
+
+    The declaration must be loaded before the session starts, so it belongs in
+    a service's `conftest.py` rather than in a test module.
+    """
+    def register(declaration: ResourceDeclaration) -> ResourceDeclaration:
+        PREWARM_DECLARATIONS[name] = declaration
+        return declaration
+    return register
+
+
+class Prewarmer:
+    """Creates every declared resource in a background thread pool."""
+
+    def __init__(self, namespace: str, max_workers: int = 4):
+        self.namespace = namespace
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="prewarm")
+        self._started = False
+
+    def start(self, names: Iterable[str]):
+        """Start creating the declared resources with the given names."""
+        names = sorted(set(names).intersection(PREWARM_DECLARATIONS))
+        if not names:
+            return
+        k8s.create_k8s_namespace(self.namespace)
+        self._started = True
+        for name in names:
+            reference, body = PREWARM_DECLARATIONS[name](self.namespace)
+            _prewarmed[name] = reference
+            _pending[name] = self._executor.submit(k8s.create_custom_resource, reference, body)
+            logging.info(f"Pre-warming {name} as {reference}")
+
+    def stop(self):
+        self._executor.shutdown(wait=True)
+        if not self._started:
+            return
+        k8s.delete_k8s_namespace(self.namespace)
+        if k8s.wait_k8s_namespace_deleted(self.namespace):
+            logging.info(f"Deleted pre-warm namespace {self.namespace}")
+
+
+def used_declarations(items: Iterable) -> Set[str]:
+    """Get the names of the declared resources whose fixture the items use."""
+    names: Set[str] = set()
+    for item in items:
+        names.update(PREWARM_DECLARATIONS.keys() & set(getattr(item, "fixturenames", ())))
+    return names
+
+
+def export_references() -> Dict[str, dict]:
+    """Serialises the pre-warmed references to hand them to xdist workers."""
+    return {name: asdict(reference) for name, reference in _prewarmed.items()}
+
+
+def import_references(references: Dict[str, dict]):
+    _prewarmed.update(
+        {name: k8s.CustomResourceReference(**fields) for name, fields in references.items()})
+
+
+def handoff_directory(config) -> str:
+    """Get the directory, created on first use, through which the master and
+    the workers of a session exchange the resources to pre-warm.
+    """
+    directory = getattr(config, "_ack_prewarm_dir", None)
+    if directory is None:
+        directory = config._ack_prewarm_dir = tempfile.mkdtemp(prefix="ack-e2e-prewarm-")
+    return directory
+
+
+def _write_json(path: str, value):
+    with open(f"{path}.tmp", "w") as stream:
+        json.dump(value, stream)
+    os.replace(f"{path}.tmp", path)
+
+
+def write_used(directory: str, worker_id: str, names: Iterable[str]):
+    _write_json(os.path.join(directory, f"used-{worker_id}.json"), sorted(names))
+
+
+def read_used(directory: str) -> Set[str]:
+    """Get the names of the resources used by the tests of every worker that
+    has finished collecting.
+    """
+    names: Set[str] = set()
+    for name in os.listdir(directory):
+        if name.startswith("used-") and name.endswith(".json"):
+            with open(os.path.join(directory, name)) as stream:
+                names.update(json.load(stream))
+    return names
+
+
+def write_references(directory: str):
+    _write_json(os.path.join(directory, _REFERENCES_FILE), export_references())
+
+
+def receive_references(directory: str):
+    """Import the references the master writes to the directory, on the
+    first claim.
+    """
+    global _handoff_directory, _handoff_imported
+    _handoff_directory = directory
+    _handoff_imported = False
+
+
+def _import_handoff():
+    global _handoff_imported
+    if _handoff_directory is None or _handoff_imported:
+        return
+    _handoff_imported = True
+    path = os.path.join(_handoff_directory, _REFERENCES_FILE)
+    # Missing when the master pre-warmed nothing
+    if os.path.exists(path):
+        with open(path) as stream:
+            import_references(json.load(stream))
+
+
+def claim(name: str, timeout: int = 60, period_length: int = 2) -> Optional[k8s.CustomResourceReference]:
+    """Claims the pre-warmed resource with the given name.
+
+    Each resource can only be claimed once. The workers of a session share
+    the references handed over by the master, so they claim each one by
+    creating a file for it in the handoff directory, which only one can do.
+
+    Returns:
+        None or CustomResourceReference: None if the resource was not
+            pre-warmed or could not be created, otherwise its reference.
+    """
+    _import_handoff()
+    reference = _prewarmed.pop(name, None)
+    if reference is None:
+        return None
+
+    pending = _pending.pop(name, None)
+    if pending is not None:
+        try:
+            pending.result(timeout)
+        except Exception:
+            logging.exception(f"Unable to pre-warm {name}")
+            return None
+        return reference
+
+    # Created by another process, which may not have finished yet
+    if _handoff_directory is not None:
+        try:
+            os.close(os.open(os.path.join(_handoff_directory, f"claimed-{name}"),
+                             os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            logging.info(f"Pre-warmed {name} was already claimed by another worker")
+            return None
+
+    deadline = time() + timeout
+    while not k8s.get_resource_exists(reference):
+        if time() >= deadline:
+            logging.error(f"Pre-warmed resource {reference} was never created")
+            return None
+        sleep(period_length)
+    return reference
@@ -0,0 +1,176 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Profiles the time the harness itself spends running each test and its
+fixtures, such as loading resource files, deserializing API responses or
+logging them.
+
+Two profilers are available:
+
+* `sample` periodically captures the stack of the thread running the test.
+  Its overhead is low enough to leave the timings of the test unchanged. Each
+  test's stacks are written in the folded format read by flame graph tools
+  (`flamegraph.pl`, speedscope, ...), and merged into one file per process.
+* `cprofile` traces every function call with `cProfile`. Each test's profile
+  is written in the `pstats` format, and merged into one file per process.
+
+Time spent in `common.clock.sleep`, which every wait helper sleeps through
+between polls, is left out of both.
+"""
+
+import os
+import re
+import sys
+import pstats
+import cProfile
+import threading
+
+from time import perf_counter
+from collections import Counter
+from typing import Dict, Optional
+
+from . import clock
+
+PROFILERS = ("sample", "cprofile")
+
+# Frame of the sleep excluded from sampled stacks
+_SLEEP_CODE = clock.sleep.__code__
+
+# Longest prefix of sys.path is stripped from file names in stacks
+_PATH_PREFIXES = sorted((os.path.join(os.path.abspath(p), "") for p in sys.path if p),
+                        key=len, reverse=True)
+
+
+def _profile_name(nodeid: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", nodeid).strip("_")
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+            break
+    # Semicolons separate the frames of folded stacks
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ",")
+
+
+class StackSampler:
+    """Counts the stacks of a thread sampled every `interval` seconds."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        codes = []
+        while frame is not None:
+            if frame.f_code is _SLEEP_CODE:
+                return
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        if not codes:
+            return
+
+        labels = []
+        for code in reversed(codes):
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = _frame_label(code)
+            labels.append(label)
+        self.stacks[";".join(labels)] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="harness-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def _write_folded(path: str, stacks: Counter):
+    with open(path, "w") as stream:
+        for stack, count in sorted(stacks.items()):
+            stream.write(f"{stack} {count}\n")
+
+
+class HarnessProfiler:
+    """Profiles each test of a process, writing a profile per test and one
+    merging them all to the output directory.
+    """
+
+    def __init__(self, directory: str, profiler: str, name: str):
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler {profiler}, expected one of {PROFILERS}")
+        self.directory = directory
+        self.profiler = profiler
+        self.name = name
+        self._nodeid: Optional[str] = None
+        self._sampler: Optional[StackSampler] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._merged_stacks: Counter = Counter()
+        self._merged_stats: Optional[pstats.Stats] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        extension = "folded" if self.profiler == "sample" else "prof"
+        return os.path.join(self.directory, f"{name}.{extension}")
+
+    def start(self, nodeid: str):
+        """Starts profiling the test with the given node ID, in the thread
+        that will run it and its fixtures.
+        """
+        self._nodeid = nodeid
+        if self.profiler == "sample":
+            self._sampler = StackSampler(threading.get_ident())
+            self._sampler.start()
+        else:
+            # Stop the clock of the profile while the thread sleeps
+            self._profile = cProfile.Profile(lambda: perf_counter() - clock.slept())
+            self._profile.enable()
+
+    def stop(self):
+        """Stops profiling the current test and writes its profile."""
+        path = self._path(_profile_name(self._nodeid))
+        if self.profiler == "sample":
+            self._sampler.stop()
+            _write_folded(path, self._sampler.stacks)
+            self._merged_stacks.update(self._sampler.stacks)
+            self._sampler = None
+        else:
+            self._profile.disable()
+            self._profile.dump_stats(path)
+            if self._merged_stats is None:
+                self._merged_stats = pstats.Stats(path)
+            else:
+                self._merged_stats.add(path)
+            self._profile = None
+
+    def save(self):
+        """Writes the profile merging every test profiled so far."""
+        if self.profiler == "sample":
+            _write_folded(self._path(self.name), self._merged_stacks)
+        elif self._merged_stats is not None:
+            self._merged_stats.dump_stats(self._path(self.name))
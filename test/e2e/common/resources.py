@@ -20,15 +20,16 @@ import string
 import random
 import yaml
 import logging
+import argparse
 from pathlib import Path
+from importlib import import_module
 from typing import Any, Dict
 
 from .aws import get_aws_account_id, get_aws_region
 
-PLACEHOLDER_VALUES = {
-    "AWS_ACCOUNT_ID": get_aws_account_id(),
-    "AWS_REGION": get_aws_region(),
-}
+# Filled on first use, so that importing this module makes no AWS call before
+# a recorded session can be set up to replay it
+PLACEHOLDER_VALUES: Dict[str, Any] = {}
 
 root_test_path = Path(__file__).parent.parent
 
@@ -39,12 +40,21 @@ def load_resource_file(service: str, resource_name: str,
     with open(path / f"{resource_name}.yaml", "r") as stream:
         resource_contents = stream.read()
         injected_contents = _replace_placeholder_values(
-            resource_contents, PLACEHOLDER_VALUES)
+            resource_contents, _get_placeholder_values())
         injected_contents = _replace_placeholder_values(
             injected_contents, additional_replacements)
         return yaml.safe_load(injected_contents)
 
 
+def _get_placeholder_values() -> Dict[str, Any]:
+    if not PLACEHOLDER_VALUES:
+        PLACEHOLDER_VALUES.update({
+            "AWS_ACCOUNT_ID": get_aws_account_id(),
+            "AWS_REGION": get_aws_region(),
+        })
+    return PLACEHOLDER_VALUES
+
+
 def _replace_placeholder_values(
         in_str: str, replacement_dictionary: Dict[str, Any] = PLACEHOLDER_VALUES) -> str:
     for placeholder, replacement in replacement_dictionary.items():
@@ -52,6 +62,43 @@ def _replace_placeholder_values(
     return in_str
 
 
+def service_replacements(service: str) -> Dict[str, Any]:
+    """Loads the service's template replacement values, if its bootstrap
+    configuration is available.
+    """
+    try:
+        return import_module(f"{service}.replacement_values").REPLACEMENT_VALUES.copy()
+    except (ImportError, FileNotFoundError):
+        logging.warning(f"No replacement values available for {service}, "
+                        "relying on --replacement values only")
+        return {}
+
+
+def add_template_arguments(parser: argparse.ArgumentParser):
+    """Adds the arguments selecting a service's resource template, and the
+    values to fill it with, to the parser of a tool creating resources in bulk.
+    """
+    parser.add_argument("service", help="service directory containing the resource template")
+    parser.add_argument("resource", help="name of the resource template, e.g. xgboost_model")
+    parser.add_argument("plural", help="plural of the custom resource, e.g. models")
+    parser.add_argument("--name-key", required=True,
+                        help="template placeholder holding the resource name, e.g. MODEL_NAME")
+    parser.add_argument("--group", default=None,
+                        help="CRD group (default: <service>.services.k8s.aws)")
+    parser.add_argument("--version", default="v1alpha1")
+    parser.add_argument("--replacement", action="append", default=[],
+                        help="KEY=VALUE template replacement")
+
+
+def template_replacements(args: argparse.Namespace) -> Dict[str, Any]:
+    """Get the service's replacement values, overridden by those passed as
+    arguments added by `add_template_arguments`.
+    """
+    replacements = service_replacements(args.service)
+    replacements.update(replacement.split("=", 1) for replacement in args.replacement)
+    return replacements
+
+
 def random_suffix_name(resource_name: str, max_length: int,
                        delimiter: str = "-") -> str:
     rand_length = max_length - len(resource_name) - len(delimiter)
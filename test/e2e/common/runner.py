@@ -0,0 +1,337 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Command line runner exposing the assertions used by the bash e2e suites.
+
+The bash helpers in `scripts/lib` start a new `kubectl` or `aws` process for
+every poll of every check. This runner performs the whole check, including any
+polling, inside a single Python process using the clients in `common.k8s` and
+boto3, and is invoked from bash through the `e2e_runner` shim in
+`scripts/lib/k8s.sh`:
+
+    python -m common.runner field-from-status key/my-key keyID --timeout 20
+    python -m common.runner resource-exists queues/my-queue
+    python -m common.runner aws-describe elasticache describe_replication_groups \\
+        --param ReplicationGroupId=my-rg --query "ReplicationGroups[0].Status"
+    python -m common.runner aws-wait elasticache replication_group_available \\
+        --param ReplicationGroupId=my-rg
+
+Each invocation still pays for starting Python, so the types of custom
+resources are resolved from a discovery result cached on disk for every run
+in the same kubeconfig context, and several waits can share one invocation
+with `batch`, which runs the commands it reads from stdin one after another:
+
+    python -m common.runner batch <<EOF
+    field-from-status replicationgroups/my-rg status --wait available --timeout 600
+    aws-wait elasticache replication_group_available --param ReplicationGroupId=my-rg
+    EOF
+"""
+
+import os
+import sys
+import json
+import shlex
+import argparse
+import logging
+import tempfile
+
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import boto3
+import jmespath
+from kubernetes import client, config
+from kubernetes.client.rest import ApiException
+
+from . import k8s
+from .clock import sleep
+
+
+def _format_value(value: Any) -> str:
+    """Formats a value the same way as `jq -r`: strings are printed raw and
+    everything else is printed as JSON.
+    """
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _parse_params(params: List[str]) -> Dict[str, Any]:
+    """Parses `Key=Value` pairs into boto3 keyword arguments. Values that are
+    valid JSON (numbers, booleans, lists) are decoded, others are kept as
+    strings.
+    """
+    parsed = {}
+    for param in params or []:
+        key, _, value = param.partition("=")
+        try:
+            parsed[key] = json.loads(value)
+        except ValueError:
+            parsed[key] = value
+    return parsed
+
+
+# Seconds for which the cached discovery result is used before being refreshed
+DISCOVERY_CACHE_TTL = 600
+
+# (group, storage version, plural, namespaced) of a custom resource type
+_ResourceType = Tuple[str, str, str, bool]
+
+# Discovery result used by this process, by the names of each type
+_resource_types: Optional[Dict[str, _ResourceType]] = None
+
+
+def _discovery_cache_path() -> str:
+    try:
+        _, context = config.list_kube_config_contexts()
+        context_name = context["name"]
+    except Exception:
+        context_name = "in-cluster"
+    directory = os.environ.get("ACK_E2E_RUNNER_CACHE_DIR", tempfile.gettempdir())
+    return os.path.join(directory, f"ack-e2e-runner-{context_name}.json")
+
+
+def _discover_resource_types() -> Dict[str, _ResourceType]:
+    """Lists every CustomResourceDefinition, and maps each of the names its
+    type can be referred to by to the type.
+    """
+    _api_client = k8s._get_k8s_api_client()
+    crds = client.ApiextensionsV1Api(_api_client).list_custom_resource_definition()
+    resource_types = {}
+    for crd in crds.items:
+        names = crd.spec.names
+        version = next(v.name for v in crd.spec.versions if v.storage)
+        resource_type = (crd.spec.group, version, names.plural, crd.spec.scope == "Namespaced")
+        aliases = {names.plural, names.singular, names.kind.lower()}
+        aliases.update(names.short_names or [])
+        aliases.update({f"{alias}.{crd.spec.group}" for alias in list(aliases)})
+        resource_types.update({alias: resource_type for alias in aliases})
+    return resource_types
+
+
+def _load_discovery_cache(path: str) -> Optional[Dict[str, _ResourceType]]:
+    try:
+        if time() - os.path.getmtime(path) > DISCOVERY_CACHE_TTL:
+            return None
+        with open(path) as stream:
+            return {alias: tuple(resource_type)
+                    for alias, resource_type in json.load(stream).items()}
+    except (OSError, ValueError):
+        return None
+
+
+def _save_discovery_cache(path: str, resource_types: Dict[str, _ResourceType]):
+    try:
+        with open(f"{path}.{os.getpid()}", "w") as stream:
+            json.dump(resource_types, stream)
+        os.replace(f"{path}.{os.getpid()}", path)
+    except OSError as e:
+        logging.warning(f"Unable to cache the custom resource types in {path}: {e}")
+
+
+def _resolve_type(resource_type: str) -> Optional[_ResourceType]:
+    """Resolves a type from the cached discovery result, discovering the types
+    again if it is missing or stale, or if the type is not in it.
+    """
+    global _resource_types
+    path = _discovery_cache_path()
+    if _resource_types is None:
+        _resource_types = _load_discovery_cache(path)
+    if _resource_types is not None and resource_type in _resource_types:
+        return _resource_types[resource_type]
+
+    _resource_types = _discover_resource_types()
+    _save_discovery_cache(path, _resource_types)
+    return _resource_types.get(resource_type)
+
+
+def resolve_reference(resource: str, namespace: Optional[str] = None) -> k8s.CustomResourceReference:
+    """Resolves a kubectl-style `<type>/<name>` argument into a reference.
+
+    The type may be the plural, singular, kind or a short name of any
+    CustomResourceDefinition installed in the cluster, optionally qualified
+    with its group (e.g. `replicationgroups.elasticache.services.k8s.aws`).
+    """
+    resource_type, _, name = resource.partition("/")
+    if not name:
+        raise ValueError(f"Expected resource in the form <type>/<name>, got '{resource}'")
+
+    resolved = _resolve_type(resource_type.lower())
+    if resolved is None:
+        raise ValueError(f"No custom resource definition found for '{resource_type.lower()}'")
+
+    group, version, plural, namespaced = resolved
+    if namespaced:
+        return k8s.CustomResourceReference(
+            group, version, plural, name, namespace=namespace or "default")
+    return k8s.CustomResourceReference(group, version, plural, name)
+
+
+def get_field_from_status(reference: k8s.CustomResourceReference, field: str,
+                          timeout: int = 20, retry_interval: int = 5,
+                          expected: Optional[str] = None) -> Any:
+    """Polls the resource until the (dotted) status field is populated, or
+    until it has the expected value (as formatted by `jq -r`) if given.
+
+    Returns:
+        None or object: None if the field was not populated, or did not have
+            the expected value, before the timeout, otherwise the field value.
+    """
+    while True:
+        try:
+            value = k8s.get_resource(reference).get("status", {})
+        except ApiException:
+            value = None
+        for key in field.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+
+        if value is not None and expected is not None and _format_value(value) != expected:
+            value = None
+        if value is not None or timeout <= 0:
+            return value
+
+        sleep(retry_interval)
+        timeout -= retry_interval
+
+
+def aws_describe(service: str, operation: str, params: Dict[str, Any],
+                 query: Optional[str] = None) -> Any:
+    """Calls a single AWS API operation and optionally applies a JMESPath
+    query to the response.
+    """
+    response = getattr(boto3.client(service), operation)(**params)
+    response.pop("ResponseMetadata", None)
+    if query:
+        return jmespath.search(query, response)
+    return response
+
+
+def aws_wait(service: str, waiter_name: str, params: Dict[str, Any],
+             delay: int = 15, max_attempts: int = 40):
+    """Blocks on a boto3 waiter, polling in-process rather than forking the
+    AWS CLI for every attempt.
+    """
+    waiter = boto3.client(service).get_waiter(waiter_name)
+    waiter.wait(WaiterConfig={"Delay": delay, "MaxAttempts": max_attempts}, **params)
+
+
+def _field_from_status_command(args) -> int:
+    reference = resolve_reference(args.resource, args.namespace)
+    value = get_field_from_status(reference, args.field, args.timeout, args.retry_interval,
+                                  args.wait)
+    if value is None:
+        if args.wait is not None:
+            print(f"FAIL: {args.resource} resource's status field {args.field} "
+                  f"is not {args.wait}")
+        else:
+            print(f"FAIL: {args.resource} resource's status does not have {args.field} field")
+        return 1
+    print(_format_value(value))
+    return 0
+
+
+def _resource_exists_command(args) -> int:
+    reference = resolve_reference(args.resource, args.namespace)
+    return 0 if k8s.get_resource_exists(reference) else 1
+
+
+def _aws_describe_command(args) -> int:
+    print(_format_value(aws_describe(
+        args.service, args.operation, _parse_params(args.param), args.query)))
+    return 0
+
+
+def _aws_wait_command(args) -> int:
+    try:
+        aws_wait(args.service, args.waiter, _parse_params(args.param),
+                 args.delay, args.max_attempts)
+    except Exception as e:
+        print(f"FAIL: waiting for {args.service} {args.waiter}: {e}")
+        return 1
+    return 0
+
+
+def _batch_command(args) -> int:
+    parser = _build_parser()
+    for line in sys.stdin:
+        argv = shlex.split(line, comments=True)
+        if not argv:
+            continue
+        try:
+            command_args = parser.parse_args(argv)
+        except SystemExit as e:
+            return e.code or 1
+        if command_args.command == "batch":
+            print("FAIL: batch commands cannot be nested")
+            return 1
+        returncode = command_args.func(command_args)
+        sys.stdout.flush()
+        if returncode != 0:
+            return returncode
+    return 0
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m common.runner")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    field = subparsers.add_parser(
+        "field-from-status", help="print a field from the status of a resource")
+    field.add_argument("resource", help="resource in the form <type>/<name>")
+    field.add_argument("field", help="dotted path below .status")
+    field.add_argument("--namespace", default="default")
+    field.add_argument("--timeout", type=int, default=20,
+                       help="seconds to wait for the field to be populated")
+    field.add_argument("--retry-interval", type=int, default=5)
+    field.add_argument("--wait", metavar="VALUE", default=None,
+                       help="wait until the field has this value rather than any value")
+    field.set_defaults(func=_field_from_status_command)
+
+    exists = subparsers.add_parser(
+        "resource-exists", help="exit 0 if the resource exists, 1 otherwise")
+    exists.add_argument("resource", help="resource in the form <type>/<name>")
+    exists.add_argument("--namespace", default=None)
+    exists.set_defaults(func=_resource_exists_command)
+
+    describe = subparsers.add_parser(
+        "aws-describe", help="print the response of an AWS API operation")
+    describe.add_argument("service", help="boto3 service name, e.g. elasticache")
+    describe.add_argument("operation", help="boto3 operation, e.g. describe_replication_groups")
+    describe.add_argument("--param", action="append", help="Key=Value operation parameter")
+    describe.add_argument("--query", help="JMESPath expression applied to the response")
+    describe.set_defaults(func=_aws_describe_command)
+
+    wait = subparsers.add_parser(
+        "aws-wait", help="block until a boto3 waiter succeeds")
+    wait.add_argument("service", help="boto3 service name, e.g. elasticache")
+    wait.add_argument("waiter", help="boto3 waiter, e.g. replication_group_available")
+    wait.add_argument("--param", action="append", help="Key=Value operation parameter")
+    wait.add_argument("--delay", type=int, default=15)
+    wait.add_argument("--max-attempts", type=int, default=40)
+    wait.set_defaults(func=_aws_wait_command)
+
+    batch = subparsers.add_parser(
+        "batch", help="run the commands read from stdin, one per line, in this "
+                      "process, stopping at the first that fails")
+    batch.set_defaults(func=_batch_command)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.WARNING)
+    args = _build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Client-side validation of custom resources against the OpenAPI schema of
+their CustomResourceDefinition.
+
+The API server silently prunes the fields a structural schema does not
+declare, so a misspelled field in a resource template only shows up when the
+controller never syncs the resource. Validating each body before it is sent
+reports such mistakes, and every other violation of the schema, immediately.
+
+The schema of each kind is fetched from the cluster once per process and
+compiled into a tree of closures, one per schema node, so validating a body
+only walks the body.
+"""
+
+import re
+import json
+import logging
+import threading
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from kubernetes.client.api_client import ApiClient
+
+# Checks the value at the given path, appending every violation to the errors
+_Check = Callable[[Any, str, List[str], bool], None]
+
+# Fields every object may set, whether or not its schema declares them
+_OBJECT_FIELDS = ("apiVersion", "kind", "metadata")
+
+_enabled = True
+# Compiled validator of each (group, version, plural), None when the kind has
+# no schema to validate against
+_validators: Dict[Tuple[str, str, str], Optional["Validator"]] = {}
+_validators_lock = threading.Lock()
+
+
+class SchemaValidationError(ValueError):
+    """A custom resource does not conform to the schema of its kind."""
+
+    def __init__(self, kind: str, errors: List[str]):
+        self.kind = kind
+        self.errors = errors
+        super().__init__(f"Invalid {kind}: " + "; ".join(errors))
+
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "boolean": lambda value: isinstance(value, bool),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+}
+
+
+def _compile(schema: dict, embedded: bool = False) -> _Check:
+    """Compile a node of an OpenAPI v3 structural schema."""
+    checks: List[_Check] = []
+    nullable = schema.get("nullable", False)
+
+    schema_type = schema.get("type")
+    if schema.get("x-kubernetes-int-or-string"):
+        def check_int_or_string(value, path, errors, partial):
+            if not (_TYPE_CHECKS["integer"](value) or isinstance(value, str)):
+                errors.append(f"{path}: expected an integer or a string, got {type(value).__name__}")
+        checks.append(check_int_or_string)
+    elif schema_type in _TYPE_CHECKS:
+        is_type = _TYPE_CHECKS[schema_type]
+
+        def check_type(value, path, errors, partial):
+            if not is_type(value):
+                errors.append(f"{path}: expected {schema_type}, got {type(value).__name__}")
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+
+        def check_enum(value, path, errors, partial):
+            if value not in allowed:
+                errors.append(f"{path}: {value!r} is not one of {allowed}")
+        checks.append(check_enum)
+
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+
+        def check_pattern(value, path, errors, partial):
+            if isinstance(value, str) and not pattern.search(value):
+                errors.append(f"{path}: {value!r} does not match {pattern.pattern!r}")
+        checks.append(check_pattern)
+
+    checks.extend(_compile_bounds(schema))
+    if schema_type == "object" or "properties" in schema:
+        checks.append(_compile_object(schema, embedded))
+    if "items" in schema:
+        item_check = _compile(schema["items"], schema["items"].get("x-kubernetes-embedded-resource", False))
+
+        def check_items(value, path, errors, partial):
+            # A merge patch replaces lists whole, so their items are complete
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    item_check(item, f"{path}[{index}]", errors, False)
+        checks.append(check_items)
+
+    def check(value, path, errors, partial):
+        # A null deletes the field from the resource in a merge patch
+        if value is None and (nullable or partial):
+            return
+        for check_one in checks:
+            check_one(value, path, errors, partial)
+    return check
+
+
+def _compile_bounds(schema: dict) -> List[_Check]:
+    checks = []
+    bounds = [
+        ("minimum", lambda value, bound: value < bound or
+            (schema.get("exclusiveMinimum") and value == bound), "less than"),
+        ("maximum", lambda value, bound: value > bound or
+            (schema.get("exclusiveMaximum") and value == bound), "greater than"),
+    ]
+    for keyword, violates, comparison in bounds:
+        if keyword in schema:
+            def check_bound(value, path, errors, partial,
+                            bound=schema[keyword], violates=violates, comparison=comparison):
+                if _TYPE_CHECKS["number"](value) and violates(value, bound):
+                    errors.append(f"{path}: {value} is {comparison} the allowed {bound}")
+            checks.append(check_bound)
+
+    lengths = [("minLength", str, -1), ("maxLength", str, 1),
+               ("minItems", list, -1), ("maxItems", list, 1)]
+    for keyword, value_type, sign in lengths:
+        if keyword in schema:
+            def check_length(value, path, errors, partial,
+                             limit=schema[keyword], value_type=value_type, sign=sign):
+                if isinstance(value, value_type) and (len(value) - limit) * sign > 0:
+                    size = "at most" if sign > 0 else "at least"
+                    errors.append(f"{path}: must have {size} {limit} "
+                                  f"{'characters' if value_type is str else 'items'}")
+            checks.append(check_length)
+    return checks
+
+
+def _compile_object(schema: dict, embedded: bool) -> _Check:
+    properties = {name: _compile(property_schema,
+                                 property_schema.get("x-kubernetes-embedded-resource", False))
+                  for name, property_schema in schema.get("properties", {}).items()}
+    required = schema.get("required", [])
+
+    additional = schema.get("additionalProperties")
+    additional_check: Optional[_Check] = None
+    if isinstance(additional, dict):
+        additional_check = _compile(additional)
+    allows_unknown = (schema.get("x-kubernetes-preserve-unknown-fields", False)
+                      or additional is True)
+
+    def check_object(value, path, errors, partial):
+        if not isinstance(value, dict):
+            return
+        if not partial:
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}.{name}: required field is missing")
+        for name, field_value in value.items():
+            # The API server validates the metadata of embedded objects itself
+            if embedded and name in _OBJECT_FIELDS:
+                continue
+            field_path = f"{path}.{name}"
+            field_check = properties.get(name)
+            if field_check is not None:
+                field_check(field_value, field_path, errors, partial)
+            elif additional_check is not None:
+                additional_check(field_value, field_path, errors, partial)
+            elif not allows_unknown:
+                errors.append(f"{field_path}: unknown field")
+    return check_object
+
+
+class Validator:
+    """Validates custom resources against the compiled schema of a kind."""
+
+    def __init__(self, kind: str, schema: dict):
+        self.kind = kind
+        self._check = _compile(schema, embedded=True)
+
+    def errors(self, body: Any, partial: bool = False) -> List[str]:
+        """Get every violation of the schema by the body, or by the merge
+        patch if `partial`, in which case required fields may be missing and
+        any field may be null.
+        """
+        errors: List[str] = []
+        self._check(body, self.kind, errors, partial)
+        return errors
+
+    def validate(self, body: Any, partial: bool = False):
+        """Raises:
+            SchemaValidationError: If the body violates the schema.
+        """
+        errors = self.errors(body, partial)
+        if errors:
+            raise SchemaValidationError(self.kind, errors)
+
+
+def _fetch_schema(api_client: ApiClient, group: str, version: str,
+                  plural: str) -> Tuple[str, Optional[dict]]:
+    response = api_client.call_api(
+        f"/apis/apiextensions.k8s.io/v1/customresourcedefinitions/{plural}.{group}", 'GET',
+        header_params={'Accept': 'application/json'},
+        auth_settings=['BearerToken'],
+        _return_http_data_only=True,
+        _preload_content=False)
+    definition = json.loads(response.data)
+    kind = definition["spec"]["names"]["kind"]
+    for definition_version in definition["spec"]["versions"]:
+        if definition_version["name"] == version:
+            return kind, (definition_version.get("schema") or {}).get("openAPIV3Schema")
+    return kind, None
+
+
+def get_validator(api_client: ApiClient, group: str, version: str,
+                  plural: str) -> Optional[Validator]:
+    """Get the validator of a kind, fetching and compiling its schema the first
+    time it is needed.
+
+    Returns:
+        None or Validator: None if the kind has no schema, or if it could not
+            be fetched, in which case its resources are not validated. A
+            schema that could not be fetched is fetched again on the next call.
+    """
+    key = (group, version, plural)
+    if key in _validators:
+        return _validators[key]
+
+    with _validators_lock:
+        if key not in _validators:
+            try:
+                kind, schema = _fetch_schema(api_client, group, version, plural)
+            except Exception as e:
+                logging.warning(f"Not validating {plural}.{group}/{version}: "
+                                f"could not get its schema ({e})")
+                return None
+            _validators[key] = Validator(kind, schema) if schema is not None else None
+    return _validators[key]
+
+
+def configure(enabled: bool):
+    """Enable or disable the validation of the custom resources sent by
+    `common.k8s`.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def enabled() -> bool:
+    return _enabled
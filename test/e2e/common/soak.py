@@ -0,0 +1,193 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Soak mode measuring the steady-state overhead of idle resources.
+
+Creates a number of resources from a service's resource template, waits for
+all of them to be synced, then holds them while periodically sampling the
+controller's metrics. The report gives the controller's CPU, memory and API
+request rate while idle, both in total and per resource, relative to a
+baseline measured before the resources were created.
+
+The soak only talks to the Kubernetes API, so it can be run against a kind
+cluster whose controller has been pointed at a local AWS stand-in (for example
+with the controller's `--aws-endpoint-url` flag). Values normally taken from
+the service's bootstrap configuration can be given with `--replacement`:
+
+    python -m common.soak sagemaker xgboost_model models --name-key MODEL_NAME \\
+        --count 500 --hold 3600 --metrics-url http://localhost:9090
+"""
+
+import sys
+import json
+import argparse
+import logging
+
+from time import time
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+from . import k8s, metrics
+from .clock import sleep
+from .resources import (add_template_arguments, load_resource_file, random_suffix_name,
+                        template_replacements)
+
+
+@dataclass
+class SoakWindow:
+    """Stores the controller's average resource usage over a time window."""
+
+    duration_seconds: float
+    cpu_cores: float
+    memory_bytes: float
+    api_requests_per_second: float
+    reconciles_per_second: float
+
+
+@dataclass
+class SoakReport:
+    resource_count: int
+    baseline: SoakWindow
+    idle: SoakWindow
+    # Usage attributable to each idle resource, relative to the baseline
+    per_resource: Dict[str, float] = field(default_factory=dict)
+    timeline: List[Dict[str, float]] = field(default_factory=list)
+
+
+def _window(start: metrics.MetricsSnapshot, end: metrics.MetricsSnapshot,
+            samples: List[metrics.MetricsSnapshot]) -> SoakWindow:
+    deltas = metrics.compute_deltas(start, end, samples)
+    duration = max(deltas["duration_seconds"], 1e-9)
+    memory = [s.values.get("memory_bytes", 0.0) for s in [start] + samples + [end]]
+    return SoakWindow(
+        duration_seconds=deltas["duration_seconds"],
+        cpu_cores=deltas["cpu_seconds"] / duration,
+        memory_bytes=sum(memory) / len(memory),
+        api_requests_per_second=deltas["api_requests"] / duration,
+        reconciles_per_second=deltas["reconcile_total"] / duration,
+    )
+
+
+def _observe(collector: metrics.ControllerMetricsCollector, seconds: float,
+             interval: float) -> List[metrics.MetricsSnapshot]:
+    """Samples the collector every interval for the given number of seconds,
+    returning every sample including the first and the last.
+    """
+    samples = [collector.snapshot()]
+    deadline = samples[0].timestamp + seconds
+    while time() < deadline:
+        sleep(min(interval, max(deadline - time(), 0)))
+        samples.append(collector.snapshot())
+        logging.info(f"Controller usage sample: {samples[-1].values}")
+    return samples
+
+
+def create_synced_resources(service: str, resource_template: str, plural: str,
+                            name_key: str, count: int, namespace: str,
+                            replacements: Dict[str, Any], group: str,
+                            version: str) -> List[k8s.CustomResourceReference]:
+    references = []
+    for _ in range(count):
+        name = random_suffix_name(f"soak-{resource_template.replace('_', '-')}", 32)
+        body = load_resource_file(
+            service, resource_template,
+            additional_replacements={**replacements, name_key: name})
+        reference = k8s.CustomResourceReference(group, version, plural, name, namespace=namespace)
+        k8s.create_custom_resource(reference, body)
+        references.append(reference)
+
+    if not k8s.wait_all_synced(references, wait_periods=max(count // 10, 2), period_length=30):
+        raise RuntimeError(f"Not all {count} {plural} were synced")
+    logging.info(f"Created {count} synced {plural}")
+    return references
+
+
+def run_soak(collector: metrics.ControllerMetricsCollector, service: str,
+             resource_template: str, plural: str, name_key: str, count: int,
+             hold_seconds: float, group: str, version: str,
+             replacements: Optional[Dict[str, Any]] = None, baseline_seconds: float = 300,
+             sample_interval: float = 30) -> SoakReport:
+    replacements = dict(replacements or {})
+    namespace = random_suffix_name("ack-soak", 24)
+    k8s.create_k8s_namespace(namespace)
+    try:
+        baseline_samples = _observe(collector, baseline_seconds, sample_interval)
+        baseline = _window(baseline_samples[0], baseline_samples[-1], baseline_samples[1:-1])
+
+        create_synced_resources(service, resource_template, plural, name_key,
+                                count, namespace, replacements, group, version)
+
+        idle_samples = _observe(collector, hold_seconds, sample_interval)
+        idle = _window(idle_samples[0], idle_samples[-1], idle_samples[1:-1])
+    finally:
+        k8s.delete_k8s_namespace(namespace)
+        k8s.wait_k8s_namespace_deleted(namespace)
+
+    report = SoakReport(count, baseline, idle)
+    report.per_resource = {
+        "cpu_cores": (idle.cpu_cores - baseline.cpu_cores) / count,
+        "memory_bytes": (idle.memory_bytes - baseline.memory_bytes) / count,
+        "api_requests_per_second": (idle.api_requests_per_second - baseline.api_requests_per_second) / count,
+        "reconciles_per_second": (idle.reconciles_per_second - baseline.reconciles_per_second) / count,
+    }
+    for previous, sample in zip(idle_samples, idle_samples[1:]):
+        window = _window(previous, sample, [])
+        report.timeline.append({"timestamp": sample.timestamp, **asdict(window)})
+    return report
+
+
+def _positive_int(value: str) -> int:
+    count = int(value)
+    if count <= 0:
+        raise argparse.ArgumentTypeError(f"must be positive, got {count}")
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m common.soak")
+    add_template_arguments(parser)
+    parser.add_argument("--count", type=_positive_int, default=100)
+    parser.add_argument("--hold", type=float, default=3600,
+                        help="seconds to hold the synced resources")
+    parser.add_argument("--baseline", type=float, default=300,
+                        help="seconds to measure the controller before creating resources")
+    parser.add_argument("--sample-interval", type=float, default=30)
+    parser.add_argument("--metrics-url", required=True)
+    parser.add_argument("--metrics-source", default="prometheus", choices=("prometheus", "exposition"))
+    parser.add_argument("--metrics-selector", default=metrics.DEFAULT_PROMETHEUS_SELECTOR)
+    parser.add_argument("--output", help="file to write the JSON report to")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.metrics_source == "exposition":
+        source = metrics.ExpositionSource(args.metrics_url)
+    else:
+        source = metrics.PrometheusSource(args.metrics_url, args.metrics_selector)
+
+    replacements = template_replacements(args)
+    report = run_soak(
+        metrics.ControllerMetricsCollector(source), args.service, args.resource,
+        args.plural, args.name_key, args.count, args.hold,
+        args.group or f"{args.service}.services.k8s.aws", args.version,
+        replacements, args.baseline, args.sample_interval)
+
+    output = json.dumps(asdict(report), indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as stream:
+            stream.write(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Compiled accessors for the status of ACK custom resources.
+
+ACK controllers write `.status.conditions` as a list of conditions, each with
+a `type` (e.g. `ACK.ResourceSynced`), a `status` of "True", "False" or
+"Unknown" and an optional `message`. `StatusView` indexes these conditions by
+type and reads every commonly checked status field in a single pass over the
+object. Views are cached per object version, so evaluating several predicates
+against the same object, or against the same watch event many times, only
+walks it once.
+
+Predicates such as `synced`, `terminal` or `status_in({"Failed"})` can be
+combined (e.g. `terminal | status_in({"Failed"})`) into the conditions
+`common.k8s.wait_for` waits for, or aborts on.
+"""
+
+import threading
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+ACK_RESOURCE_SYNCED = "ACK.ResourceSynced"
+ACK_TERMINAL = "ACK.Terminal"
+ACK_ADOPTED = "ACK.Adopted"
+
+# Number of object versions for which views are kept
+VIEW_CACHE_SIZE = 8192
+
+
+class StatusPath:
+    """A dotted path (e.g. `status.ackResourceMetadata.arn`) split once into
+    its keys, then applied to any number of objects.
+    """
+
+    __slots__ = ("path", "keys")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.keys: Tuple[str, ...] = tuple(path.split("."))
+
+    def __call__(self, resource: Any, default: Any = None) -> Any:
+        value = resource
+        for key in self.keys:
+            if not isinstance(value, dict):
+                return default
+            value = value.get(key, default)
+        return value
+
+    def __repr__(self):
+        return f"StatusPath({self.path!r})"
+
+
+ARN = StatusPath("status.ackResourceMetadata.arn")
+CONDITIONS = StatusPath("status.conditions")
+
+
+class StatusView:
+    """A read-only view of the status of one version of a resource."""
+
+    __slots__ = ("has_status", "arn", "conditions")
+
+    def __init__(self, resource: dict):
+        status = resource.get("status")
+        self.has_status = isinstance(status, dict)
+        self.arn: Optional[str] = ARN(resource)
+        self.conditions: Dict[str, dict] = {}
+        for condition in CONDITIONS(resource) or ():
+            if isinstance(condition, dict) and "type" in condition:
+                self.conditions[condition["type"]] = condition
+
+    def condition(self, condition_type: str) -> Optional[dict]:
+        return self.conditions.get(condition_type)
+
+    def condition_status(self, condition_type: str) -> Optional[bool]:
+        """Get the status of a condition as a boolean.
+
+        Returns:
+            None or bool: None if the condition doesn't exist, otherwise
+                whether its status is "True".
+        """
+        condition = self.conditions.get(condition_type)
+        if condition is None:
+            return None
+        return condition.get("status") == "True"
+
+    def condition_message(self, condition_type: str) -> Optional[str]:
+        condition = self.conditions.get(condition_type)
+        if condition is None:
+            return None
+        return condition.get("message")
+
+    @property
+    def synced(self) -> Optional[bool]:
+        return self.condition_status(ACK_RESOURCE_SYNCED)
+
+    @property
+    def terminal(self) -> Optional[bool]:
+        return self.condition_status(ACK_TERMINAL)
+
+
+_views: "OrderedDict[Tuple[str, str], StatusView]" = OrderedDict()
+_views_lock = threading.Lock()
+
+
+def view(resource: dict) -> StatusView:
+    """Get the status view of a resource, reusing the view built for the same
+    object version (uid and resourceVersion) when there is one.
+    """
+    metadata = resource.get("metadata") or {}
+    key = (metadata.get("uid"), metadata.get("resourceVersion"))
+    if None in key:
+        return StatusView(resource)
+
+    # The reaper, pre-warm and watch threads read views concurrently
+    with _views_lock:
+        cached = _views.get(key)
+        if cached is not None:
+            _views.move_to_end(key)
+            return cached
+
+        cached = _views[key] = StatusView(resource)
+        if len(_views) > VIEW_CACHE_SIZE:
+            _views.popitem(last=False)
+        return cached
+
+
+class PredicateMatch(NamedTuple):
+    """The condition that made a predicate hold, and its message if any."""
+    condition: str
+    message: Optional[str] = None
+
+
+class Predicate:
+    """A named condition on a resource, composable with `|`, `&` and `~`.
+
+    Evaluating a predicate gives the `PredicateMatch` of the (innermost)
+    condition that made it hold, or None.
+    """
+
+    __slots__ = ("name", "_evaluate")
+
+    def __init__(self, name: str, evaluate: Callable[[dict], Optional[PredicateMatch]]):
+        self.name = name
+        self._evaluate = evaluate
+
+    def __call__(self, resource: dict) -> Optional[PredicateMatch]:
+        return self._evaluate(resource)
+
+    def __or__(self, other: "Predicate") -> "Predicate":
+        return Predicate(f"({self.name} | {other.name})",
+                         lambda resource: self(resource) or other(resource))
+
+    def __and__(self, other: "Predicate") -> "Predicate":
+        def evaluate(resource):
+            first = self(resource)
+            if first is None:
+                return None
+            second = other(resource)
+            if second is None:
+                return None
+            messages = [match.message for match in (first, second) if match.message]
+            return PredicateMatch(f"{first.condition} & {second.condition}",
+                                  "; ".join(messages) or None)
+        return Predicate(f"({self.name} & {other.name})", evaluate)
+
+    def __invert__(self) -> "Predicate":
+        name = f"~{self.name}"
+        return Predicate(name, lambda resource:
+                         PredicateMatch(name) if self(resource) is None else None)
+
+    def __repr__(self):
+        return f"Predicate({self.name})"
+
+
+def condition(condition_type: str, value: bool = True, name: Optional[str] = None) -> Predicate:
+    """Holds while the resource has a condition of the given type, whose
+    status is "True" or, if not `value`, anything else.
+    """
+    name = name or f"{condition_type}={value}"
+
+    def evaluate(resource):
+        resource_view = view(resource)
+        if resource_view.condition_status(condition_type) is value:
+            return PredicateMatch(name, resource_view.condition_message(condition_type))
+        return None
+    return Predicate(name, evaluate)
+
+
+def condition_exists(condition_type: str) -> Predicate:
+    """Holds while the resource has a condition of the given type."""
+    name = f"{condition_type} exists"
+    return Predicate(name, lambda resource:
+                     PredicateMatch(name) if view(resource).condition(condition_type) else None)
+
+
+def field_in(path: str, values: Iterable[Any]) -> Predicate:
+    """Holds while the field at the dotted path has one of the given values."""
+    status_path = StatusPath(path)
+    values = frozenset(values)
+
+    def evaluate(resource):
+        value = status_path(resource)
+        try:
+            matched = value in values
+        except TypeError:
+            # An unhashable value, such as an object or a list, matches none
+            matched = False
+        if matched:
+            return PredicateMatch(f"{path}={value}")
+        return None
+    return Predicate(f"{path} in {sorted(values)}", evaluate)
+
+
+def status_in(values: Iterable[Any], path: Optional[str] = None) -> Predicate:
+    """Holds while the status field at the dotted path or, by default, any
+    top-level status field named like `*Status` (e.g. `endpointStatus` or
+    `trainingJobStatus`), has one of the given values.
+    """
+    if path is not None:
+        return field_in(path, values)
+    values = frozenset(values)
+
+    def evaluate(resource):
+        resource_status = resource.get("status")
+        if not isinstance(resource_status, dict):
+            return None
+        for key, value in resource_status.items():
+            if key.endswith("Status") and isinstance(value, str) and value in values:
+                return PredicateMatch(f"status.{key}={value}")
+        return None
+    return Predicate(f"status in {sorted(values)}", evaluate)
+
+
+consumed = Predicate("consumed", lambda resource:
+                     PredicateMatch("consumed") if view(resource).has_status else None)
+synced = condition(ACK_RESOURCE_SYNCED, name="synced")
+terminal = condition(ACK_TERMINAL, name="terminal")
@@ -0,0 +1,157 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Sweeps AWS resources leaked by previous test runs.
+
+Every AWS resource created by the tests is named with `random_suffix_name`,
+so it starts with one of a small number of known prefixes. Each service
+declares the kinds of AWS resources its tests create, as `SweepKind`s listing
+the existing resources with their creation time, deleting them by name, and
+giving the prefixes the tests name resources of that kind with. `sweep` lists
+every kind concurrently and deletes every resource matching one of its kind's
+prefixes and older than a minimum age through a bounded worker pool, except
+for the resources in use by the service's current bootstrap.
+"""
+
+import logging
+
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import AbstractSet, Callable, Iterable, List, Optional, Set, Tuple
+
+
+@dataclass
+class SweepKind:
+    """A kind of AWS resource the tests create.
+
+    `list_resources` yields the name and creation time of every existing
+    resource of the kind, and `delete_resource` deletes one by name. Only the
+    resources whose name starts with one of `prefixes` are ever swept.
+    """
+
+    name: str
+    list_resources: Callable[[], Iterable[Tuple[str, datetime]]]
+    delete_resource: Callable[[str], None]
+    prefixes: List[str] = field(default_factory=list)
+
+
+@dataclass
+class SweptResource:
+    kind: str
+    name: str
+    created: datetime
+    deleted: bool = False
+    error: str = ""
+
+
+@dataclass
+class SweepReport:
+    dry_run: bool
+    resources: List[SweptResource] = field(default_factory=list)
+    list_errors: List[str] = field(default_factory=list)
+
+    @property
+    def failed(self) -> List[SweptResource]:
+        return [r for r in self.resources if r.error]
+
+    def summary(self) -> str:
+        lines = []
+        for r in sorted(self.resources, key=lambda r: (r.kind, r.name)):
+            if self.dry_run:
+                outcome = "would delete"
+            elif r.error:
+                outcome = f"FAILED ({r.error})"
+            else:
+                outcome = "deleted"
+            lines.append(f"{r.kind:<24} {r.name:<64} {r.created:%Y-%m-%d %H:%M} {outcome}")
+        lines.extend(f"ERROR listing {error}" for error in self.list_errors)
+        lines.append(f"{len(self.resources)} leaked resources found, "
+                     f"{len(self.failed)} could not be deleted")
+        return "\n".join(lines)
+
+
+def bootstrapped_names(bootstrap: dict) -> Set[str]:
+    """Get the names of the resources in use by a service's bootstrap, which
+    are never swept. ARNs also give the name at their end (e.g. the role name
+    of a role ARN).
+    """
+    names = set()
+    for value in bootstrap.values():
+        if isinstance(value, str):
+            names.add(value)
+            if value.startswith("arn:"):
+                names.add(value.rsplit("/", 1)[-1].rsplit(":", 1)[-1])
+    return names
+
+
+def _matches(kind: SweepKind, name: str, created: datetime, cutoff: datetime,
+             prefixes: Optional[List[str]], protected: AbstractSet[str]) -> bool:
+    if created > cutoff or name in protected:
+        return False
+    if not any(name.startswith(prefix) for prefix in kind.prefixes):
+        return False
+    return prefixes is None or any(name.startswith(prefix) for prefix in prefixes)
+
+
+def _list_matching(kind: SweepKind, cutoff: datetime, prefixes: Optional[List[str]],
+                   protected: AbstractSet[str]) -> List[SweptResource]:
+    matching = []
+    for name, created in kind.list_resources():
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        if _matches(kind, name, created, cutoff, prefixes, protected):
+            matching.append(SweptResource(kind.name, name, created))
+    return matching
+
+
+def _delete(kind: SweepKind, resource: SweptResource) -> SweptResource:
+    try:
+        kind.delete_resource(resource.name)
+        resource.deleted = True
+        logging.info(f"Deleted {resource.kind} {resource.name}")
+    except Exception as e:
+        resource.error = str(e)
+        logging.error(f"Unable to delete {resource.kind} {resource.name}: {e}")
+    return resource
+
+
+def sweep(kinds: List[SweepKind], min_age: timedelta, dry_run: bool = True,
+          max_workers: int = 8, prefixes: Optional[List[str]] = None,
+          protected: AbstractSet[str] = frozenset()) -> SweepReport:
+    """Deletes every resource of the given kinds whose name starts with one of
+    its kind's prefixes and that was created at least `min_age` ago, unless
+    its name is protected. Only reports them unless `dry_run` is False.
+
+    `prefixes`, when given, further restricts the resources swept to those
+    whose name also starts with one of them.
+    """
+    report = SweepReport(dry_run)
+    cutoff = datetime.now(timezone.utc) - min_age
+    kinds_by_name = {kind.name: kind for kind in kinds}
+
+    with ThreadPoolExecutor(max_workers, thread_name_prefix="sweeper") as executor:
+        listings = {kind.name: executor.submit(_list_matching, kind, cutoff, prefixes, protected)
+                    for kind in kinds}
+        for kind_name, listing in listings.items():
+            try:
+                report.resources.extend(listing.result())
+            except Exception as e:
+                report.list_errors.append(f"{kind_name}: {e}")
+                logging.error(f"Unable to list {kind_name}: {e}")
+
+        if not dry_run:
+            deletions = [executor.submit(_delete, kinds_by_name[r.kind], r)
+                         for r in report.resources]
+            for deletion in deletions:
+                deletion.result()
+    return report
@@ -0,0 +1,90 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Unit tests for the counting of API requests by caller.
+"""
+
+import threading
+import contextvars
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from common import api_calls
+
+HOST = "https://127.0.0.1:6443"
+ENDPOINTS = "/apis/sagemaker.services.k8s.aws/v1alpha1"
+
+
+@pytest.mark.parametrize("method, path, query_params, expected", [
+    ("GET", "/api/v1/namespaces", None, ("list", "namespaces")),
+    ("GET", "/api/v1/namespaces/ns", None, ("get", "namespaces")),
+    ("DELETE", "/api/v1/namespaces/ns", None, ("delete", "namespaces")),
+    ("GET", "/api/v1/namespaces/ns/pods", None, ("list", "pods")),
+    ("GET", "/api/v1/namespaces/ns/pods/pod/log", None, ("get", "pods/log")),
+    ("GET", f"{ENDPOINTS}/namespaces/ns/endpoints/e", None, ("get", "endpoints")),
+    ("PATCH", f"{ENDPOINTS}/namespaces/ns/endpoints/e/status", None, ("patch", "endpoints/status")),
+    ("PUT", f"{ENDPOINTS}/namespaces/ns/endpoints/e", None, ("update", "endpoints")),
+    ("POST", f"{ENDPOINTS}/namespaces/ns/endpoints", None, ("create", "endpoints")),
+    ("GET", f"{ENDPOINTS}/namespaces/ns/endpoints", [("watch", True)], ("watch", "endpoints")),
+    ("GET", f"{ENDPOINTS}/endpoints?watch=true", [("watch", "true")], ("watch", "endpoints")),
+    ("GET", f"{ENDPOINTS}/endpoints", [("watch", False)], ("list", "endpoints")),
+    ("DELETE", f"{ENDPOINTS}/namespaces/ns/endpoints", None, ("deletecollection", "endpoints")),
+    ("GET", "/version", None, ("get", "/version")),
+])
+def test_k8s_verb_resource(method, path, query_params, expected):
+    assert api_calls._k8s_verb_resource(method, f"{HOST}{path}", query_params) == expected
+
+
+@pytest.fixture(autouse=True)
+def counts(monkeypatch):
+    # Keep the requests recorded here out of the session's report
+    monkeypatch.setattr(api_calls, "_counts", Counter())
+
+
+def test_requests_are_counted_against_their_caller():
+    caller = "fixture endpoint"
+    with api_calls.attribute_to(caller):
+        api_calls.record_k8s("GET", f"{HOST}{ENDPOINTS}/namespaces/ns/endpoints/e")
+        api_calls.record_k8s("GET", f"{HOST}{ENDPOINTS}/namespaces/ns/endpoints/e")
+        api_calls.record("aws", "describe_endpoint", "sagemaker")
+
+    assert api_calls.caller_counts(caller) == {
+        "k8s get endpoints": 2,
+        "aws describe_endpoint sagemaker": 1,
+    }
+    assert api_calls.budget_counts(caller) == {
+        "k8s": 2, "k8s_get": 2, "aws": 1, "aws_sagemaker": 1, "aws_describe_endpoint": 1,
+    }
+    assert api_calls.caller_counts(api_calls.BACKGROUND) == {}
+
+
+def test_requests_of_other_threads_are_counted_against_the_background():
+    caller = "fixture endpoint"
+    with api_calls.attribute_to(caller):
+        thread = threading.Thread(target=api_calls.record, args=("aws", "list_tags", "sagemaker"))
+        thread.start()
+        thread.join()
+        # Thread pools do not carry the caller over to their workers either
+        with ThreadPoolExecutor(2) as executor:
+            executor.submit(api_calls.record, "k8s", "get", "endpoints").result()
+            # unless the work runs in a copy of the submitting thread's context
+            executor.submit(contextvars.copy_context().run,
+                            api_calls.record, "k8s", "patch", "endpoints").result()
+
+    assert api_calls.caller_counts(api_calls.BACKGROUND) == {
+        "aws list_tags sagemaker": 1,
+        "k8s get endpoints": 1,
+    }
+    assert api_calls.caller_counts(caller) == {"k8s patch endpoints": 1}
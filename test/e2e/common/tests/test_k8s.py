@@ -0,0 +1,93 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Unit tests for the helpers of `common.k8s` that make no request.
+"""
+
+import json
+
+from common.k8s import _decode_status, compute_merge_patch
+
+OBSERVED = {
+    "metadata": {"name": "endpoint", "labels": {"app": "e2e", "tier": "model"}},
+    "spec": {
+        "endpointConfigName": "config-1",
+        "tags": [{"key": "a", "value": "1"}, {"key": "b", "value": "2"}],
+    },
+    "status": {"endpointStatus": "InService"},
+}
+
+
+def test_merge_patch_of_unchanged_object_is_empty():
+    assert compute_merge_patch(OBSERVED, OBSERVED) == {}
+
+
+def test_merge_patch_leaves_out_unchanged_and_observed_only_fields():
+    desired = {"spec": {"endpointConfigName": "config-2",
+                        "tags": OBSERVED["spec"]["tags"]}}
+
+    assert compute_merge_patch(OBSERVED, desired) == {"spec": {"endpointConfigName": "config-2"}}
+
+
+def test_merge_patch_keeps_nested_nulls_of_observed_fields_only():
+    desired = {"metadata": {"labels": {"tier": None, "missing": None}},
+               "spec": {"missing": None}}
+
+    assert compute_merge_patch(OBSERVED, desired) == {"metadata": {"labels": {"tier": None}}}
+
+
+def test_merge_patch_replaces_changed_lists_whole():
+    tags = [{"key": "a", "value": "1"}, {"key": "b", "value": "3"}]
+
+    assert compute_merge_patch(OBSERVED, {"spec": {"tags": tags}}) == {"spec": {"tags": tags}}
+    assert compute_merge_patch(OBSERVED, {"spec": {"tags": []}}) == {"spec": {"tags": []}}
+
+
+def test_merge_patch_of_new_nested_object_drops_its_nulls():
+    desired = {"spec": {"kmsKey": {"id": "key", "alias": None}}}
+
+    assert compute_merge_patch(OBSERVED, desired) == {"spec": {"kmsKey": {"id": "key"}}}
+
+
+def test_merge_patch_replaces_object_with_scalar_and_back():
+    assert compute_merge_patch(OBSERVED, {"status": "gone"}) == {"status": "gone"}
+    assert compute_merge_patch({"status": "gone"}, {"status": {"a": 1}}) == {"status": {"a": 1}}
+
+
+def _serialize(resource, **kwargs):
+    # As the API server does, with the keys sorted
+    return json.dumps(resource, sort_keys=True, **kwargs)
+
+
+def test_decode_status_of_compact_and_indented_resources():
+    assert _decode_status(_serialize(OBSERVED)) == OBSERVED["status"]
+    assert _decode_status(_serialize(OBSERVED, indent=2) + "\n") == OBSERVED["status"]
+
+
+def test_decode_status_skips_nested_status_fields():
+    resource = {"spec": {"status": {"nested": True}}, "status": {"endpointStatus": "Failed"}}
+    without_status = {"spec": {"status": {"nested": True}}}
+
+    assert _decode_status(_serialize(resource)) == {"endpointStatus": "Failed"}
+    assert _decode_status(_serialize(without_status)) is None
+
+
+def test_decode_status_skips_status_keys_inside_strings():
+    resource = {"spec": {"description": 'has "status": {} in it'},
+                "status": {"endpointStatus": "Creating"}}
+
+    assert _decode_status(_serialize(resource)) == {"endpointStatus": "Creating"}
+
+
+def test_decode_status_of_resource_without_status():
+    assert _decode_status(_serialize({"metadata": {"name": "endpoint"}})) is None
+    assert _decode_status(_serialize({"status": "not an object"})) is None
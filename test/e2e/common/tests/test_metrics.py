@@ -0,0 +1,126 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Unit tests for the parsing and summarising of controller metrics.
+"""
+
+import pytest
+
+from common.metrics import (ControllerMetricsCollector, MetricsSnapshot, _histogram_quantile,
+                            compute_deltas, parse_exposition, percentiles)
+
+INF = float("inf")
+
+EXPOSITION = """\
+# HELP process_cpu_seconds_total Total user and system CPU time spent in seconds.
+# TYPE process_cpu_seconds_total counter
+process_cpu_seconds_total 12.5
+
+controller_runtime_reconcile_total{controller="endpoint",result="success"} 7 1700000000000
+controller_runtime_reconcile_total{controller="endpoint",result="error"} 2
+rest_client_requests_total{code="200",host="10.0.0.1:443",method="GET",url="a,b{c}"} 3e2
+controller_runtime_reconcile_time_seconds_bucket{controller="endpoint",le="+Inf"} 9
+not_a_number NaN-ish
+"""
+
+
+def test_parse_exposition():
+    assert parse_exposition(EXPOSITION) == [
+        ("process_cpu_seconds_total", {}, 12.5),
+        ("controller_runtime_reconcile_total", {"controller": "endpoint", "result": "success"}, 7.0),
+        ("controller_runtime_reconcile_total", {"controller": "endpoint", "result": "error"}, 2.0),
+        ("rest_client_requests_total",
+         {"code": "200", "host": "10.0.0.1:443", "method": "GET", "url": "a,b{c}"}, 300.0),
+        ("controller_runtime_reconcile_time_seconds_bucket",
+         {"controller": "endpoint", "le": "+Inf"}, 9.0),
+    ]
+
+
+@pytest.mark.parametrize("quantile, expected", [
+    (0.5, 0.075),
+    (0.9, 0.5),
+    (0.25, 0.05),
+    (1.0, 1.0),
+])
+def test_histogram_quantile_interpolates_within_buckets(quantile, expected):
+    buckets = {0.05: 25, 0.1: 75, 0.5: 90, 1.0: 100, INF: 100}
+
+    assert _histogram_quantile(quantile, buckets) == pytest.approx(expected)
+
+
+def test_histogram_quantile_in_the_infinite_bucket_is_the_highest_bound():
+    assert _histogram_quantile(0.99, {0.1: 50, 1.0: 90, INF: 100}) == 1.0
+
+
+def test_histogram_quantile_of_empty_histograms():
+    assert _histogram_quantile(0.99, {}) is None
+    assert _histogram_quantile(0.99, {0.1: 0, INF: 0}) is None
+
+
+def test_compute_deltas_reports_increases_and_peaks():
+    start = MetricsSnapshot(100.0, {"cpu_seconds": 10.0, "memory_bytes": 100.0,
+                                    "reconcile_seconds_sum": 1.0, "reconcile_seconds_count": 10.0},
+                            {0.1: 10.0, 1.0: 10.0, INF: 10.0})
+    peak = MetricsSnapshot(110.0, {"memory_bytes": 300.0, "workqueue_depth": 4.0})
+    end = MetricsSnapshot(130.0, {"cpu_seconds": 12.0, "memory_bytes": 200.0,
+                                  "reconcile_seconds_sum": 4.0, "reconcile_seconds_count": 20.0},
+                          {0.1: 10.0, 1.0: 20.0, INF: 20.0})
+
+    deltas = compute_deltas(start, end, [peak])
+
+    assert deltas["duration_seconds"] == 30.0
+    assert deltas["cpu_seconds"] == 2.0
+    assert deltas["memory_bytes"] == 100.0
+    assert deltas["memory_peak_bytes"] == 300.0
+    assert deltas["workqueue_depth_peak"] == 4.0
+    assert deltas["reconcile_seconds_mean"] == pytest.approx(0.3)
+    assert deltas["reconcile_seconds_p99"] == pytest.approx(0.991)
+
+
+def test_percentiles_use_the_nearest_rank():
+    assert percentiles([float(value) for value in range(100, 0, -1)]) == {
+        "count": 100, "p50": 50.0, "p90": 90.0, "p99": 99.0, "max": 100.0}
+    assert percentiles([float(value) for value in range(1, 201)]) == {
+        "count": 200, "p50": 100.0, "p90": 180.0, "p99": 198.0, "max": 200.0}
+    assert percentiles([3.0, 1.0, 2.0]) == {
+        "count": 3, "p50": 2.0, "p90": 3.0, "p99": 3.0, "max": 3.0}
+    assert percentiles([]) == {"count": 0, "p50": None, "p90": None, "p99": None, "max": None}
+
+
+class _CountingSource:
+    def __init__(self):
+        self.timestamp = 0.0
+
+    def snapshot(self):
+        self.timestamp += 1
+        return MetricsSnapshot(self.timestamp, {"memory_bytes": self.timestamp})
+
+
+def test_collector_only_keeps_samples_of_open_windows():
+    collector = ControllerMetricsCollector(_CountingSource())
+    collector.snapshot()
+    assert collector.samples == []
+
+    outer = collector.open_window()
+    collector.snapshot()
+    inner = collector.open_window()
+    collector.snapshot()
+    end, samples = collector.close_window(inner)
+
+    assert [s.timestamp for s in samples] == [5.0]
+    assert end.timestamp == 6.0
+    # Still needed by the outer window
+    assert [s.timestamp for s in collector.samples] == [2.0, 3.0, 4.0, 5.0]
+
+    end, samples = collector.close_window(outer)
+    assert [s.timestamp for s in samples] == [3.0, 4.0, 5.0]
+    assert collector.samples == []
@@ -0,0 +1,95 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Unit tests for the grouping of test modules sharing pooled fixtures.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from common import pool
+
+
+@pytest.fixture
+def pooled(monkeypatch):
+    monkeypatch.setattr(pool, "POOLED_FIXTURES", {"xgboost_model", "endpoint_config"})
+
+
+def _item(nodeid, *fixturenames):
+    return SimpleNamespace(nodeid=nodeid, fixturenames=list(fixturenames))
+
+
+def test_modules_sharing_a_pooled_fixture_are_grouped(pooled):
+    items = [
+        _item("tests/test_model.py::test_a", "sagemaker_client"),
+        _item("tests/test_endpoint_config.py::test_a", "xgboost_model"),
+        _item("tests/test_endpoint.py::test_a", "xgboost_model", "endpoint_config"),
+        # Only shares a fixture with a module that shares one with the others
+        _item("tests/test_update_endpoint.py::test_a", "endpoint_config"),
+        _item("tests/test_endpoint_config.py::test_b", "sagemaker_client"),
+    ]
+    nodeids = {item.nodeid for item in items}
+
+    groups = pool.assign_pool_groups(items)
+
+    assert {item.nodeid for item in items} == nodeids
+    assert set(groups) == nodeids - {"tests/test_model.py::test_a"}
+    assert set(groups.values()) == {"endpoint_config+xgboost_model"}
+
+
+def test_groups_run_contiguously(pooled):
+    items = [
+        _item("tests/test_endpoint_config.py::test_a", "xgboost_model"),
+        _item("tests/test_model.py::test_a"),
+        _item("tests/test_endpoint.py::test_a", "xgboost_model"),
+        _item("tests/test_model.py::test_b"),
+        _item("tests/test_endpoint_config.py::test_b"),
+    ]
+
+    pool.assign_pool_groups(items)
+
+    assert [item.nodeid for item in items] == [
+        "tests/test_endpoint_config.py::test_a",
+        "tests/test_endpoint.py::test_a",
+        "tests/test_endpoint_config.py::test_b",
+        "tests/test_model.py::test_a",
+        "tests/test_model.py::test_b",
+    ]
+
+
+def test_unrelated_pooled_fixtures_form_separate_groups(pooled):
+    items = [
+        _item("tests/test_a.py::test_a", "xgboost_model"),
+        _item("tests/test_b.py::test_b", "endpoint_config"),
+    ]
+
+    groups = pool.assign_pool_groups(items)
+
+    assert groups == {
+        "tests/test_a.py::test_a": "xgboost_model",
+        "tests/test_b.py::test_b": "endpoint_config",
+    }
+
+
+def test_pool_groups_written_by_workers_are_merged(tmp_path):
+    pool.write_pool_groups(str(tmp_path), "gw0", {"tests/test_a.py::test_a": "xgboost_model"})
+    pool.write_pool_groups(str(tmp_path), "gw1", {"tests/test_b.py::test_b": "xgboost_model"})
+
+    groups = pool.read_pool_groups(str(tmp_path))
+
+    assert groups == {
+        "tests/test_a.py::test_a": "xgboost_model",
+        "tests/test_b.py::test_b": "xgboost_model",
+    }
+    assert pool._scope_of("tests/test_a.py::test_a", groups) == "pool:xgboost_model"
+    assert pool._scope_of("tests/test_c.py::test_c", groups) == "tests/test_c.py"
@@ -0,0 +1,66 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Unit tests for the handoff of pre-warmed resources between processes.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from common import k8s, prewarm
+
+REFERENCE = k8s.CustomResourceReference(
+    "sagemaker.services.k8s.aws", "v1alpha1", "trainingjobs", "xgboost-trainingjob",
+    namespace="ack-e2e-prewarm")
+
+
+@pytest.fixture
+def handoff(tmp_path, monkeypatch):
+    """A handoff directory to which the master pre-warmed `xgboost_trainingjob`."""
+    monkeypatch.setattr(prewarm, "_prewarmed", {"xgboost_trainingjob": REFERENCE})
+    monkeypatch.setattr(prewarm, "_pending", {})
+    monkeypatch.setattr(prewarm, "_handoff_directory", None)
+    monkeypatch.setattr(prewarm, "_handoff_imported", False)
+    monkeypatch.setattr(k8s, "get_resource_exists", lambda reference: True)
+    prewarm.write_references(str(tmp_path))
+    return str(tmp_path)
+
+
+def _start_worker(directory):
+    # A new process, which has yet to import the references
+    prewarm._prewarmed.clear()
+    prewarm.receive_references(directory)
+
+
+def test_only_one_worker_claims_each_resource(handoff):
+    _start_worker(handoff)
+    assert prewarm.claim("xgboost_trainingjob") == REFERENCE
+    assert prewarm.claim("xgboost_trainingjob") is None
+
+    _start_worker(handoff)
+    assert prewarm.claim("xgboost_trainingjob") is None
+
+
+def test_unknown_resources_are_not_claimed(handoff):
+    _start_worker(handoff)
+    assert prewarm.claim("kmeans_processing_job") is None
+    assert prewarm.claim("xgboost_trainingjob") == REFERENCE
+
+
+def test_used_declarations(monkeypatch):
+    monkeypatch.setattr(prewarm, "PREWARM_DECLARATIONS",
+                        {"xgboost_trainingjob": None, "kmeans_processing_job": None})
+    items = [SimpleNamespace(fixturenames=["k8s_namespace", "xgboost_trainingjob"]),
+             SimpleNamespace(fixturenames=["k8s_namespace"])]
+
+    assert prewarm.used_declarations(items) == {"xgboost_trainingjob"}
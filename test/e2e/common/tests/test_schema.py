@@ -0,0 +1,162 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Unit tests for the validation of custom resources against their schema.
+"""
+
+import pytest
+
+from common import schema
+from common.schema import SchemaValidationError, Validator
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "apiVersion": {"type": "string"},
+        "kind": {"type": "string"},
+        "metadata": {"type": "object"},
+        "spec": {
+            "type": "object",
+            "required": ["endpointName"],
+            "properties": {
+                "endpointName": {"type": "string", "maxLength": 63},
+                "kmsKeyID": {"type": "string", "nullable": True},
+                "instanceCount": {"type": "integer", "minimum": 1},
+                "port": {"x-kubernetes-int-or-string": True},
+                "mode": {"type": "string", "enum": ["Single", "Multi"]},
+                "tags": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "required": ["key"],
+                        "properties": {"key": {"type": "string"}, "value": {"type": "string"}},
+                    },
+                },
+                "template": {
+                    "type": "object",
+                    "x-kubernetes-embedded-resource": True,
+                    "properties": {"data": {"type": "string"}},
+                },
+                "extra": {"type": "object", "x-kubernetes-preserve-unknown-fields": True},
+            },
+        },
+    },
+}
+
+VALIDATOR = Validator("Endpoint", SCHEMA)
+
+
+def _endpoint(**spec):
+    return {"apiVersion": "sagemaker.services.k8s.aws/v1alpha1", "kind": "Endpoint",
+            "metadata": {"name": "endpoint"}, "spec": {"endpointName": "endpoint", **spec}}
+
+
+def test_valid_resource():
+    assert VALIDATOR.errors(_endpoint(instanceCount=2, mode="Multi",
+                                      tags=[{"key": "a", "value": "1"}])) == []
+
+
+def test_full_validation_requires_required_fields_and_partial_does_not():
+    body = {"spec": {"instanceCount": 2}}
+
+    assert VALIDATOR.errors(body) == ["Endpoint.spec.endpointName: required field is missing"]
+    assert VALIDATOR.errors(body, partial=True) == []
+
+
+def test_nulls_are_only_allowed_when_nullable_or_partial():
+    assert VALIDATOR.errors(_endpoint(kmsKeyID=None)) == []
+    assert VALIDATOR.errors(_endpoint(instanceCount=None)) == [
+        "Endpoint.spec.instanceCount: expected integer, got NoneType"]
+    assert VALIDATOR.errors({"spec": {"instanceCount": None}}, partial=True) == []
+
+
+def test_list_items_are_validated_in_full_in_partial_patches():
+    assert VALIDATOR.errors({"spec": {"tags": [{"value": "1"}]}}, partial=True) == [
+        "Endpoint.spec.tags[0].key: required field is missing"]
+
+
+def test_int_or_string():
+    assert VALIDATOR.errors(_endpoint(port=8080)) == []
+    assert VALIDATOR.errors(_endpoint(port="http")) == []
+    assert VALIDATOR.errors(_endpoint(port=True)) == [
+        "Endpoint.spec.port: expected an integer or a string, got bool"]
+
+
+def test_embedded_resource_metadata_is_not_validated():
+    template = {"apiVersion": "v1", "kind": "ConfigMap",
+                "metadata": {"name": "config"}, "data": "value"}
+
+    assert VALIDATOR.errors(_endpoint(template=template)) == []
+
+
+def test_unknown_fields():
+    assert VALIDATOR.errors(_endpoint(endpointConfig="typo")) == [
+        "Endpoint.spec.endpointConfig: unknown field"]
+    assert VALIDATOR.errors(_endpoint(extra={"anything": {"goes": 1}})) == []
+
+
+def test_values_out_of_bounds():
+    errors = VALIDATOR.errors(_endpoint(endpointName="e" * 64, instanceCount=0, mode="None"))
+
+    assert errors == [
+        "Endpoint.spec.endpointName: must have at most 63 characters",
+        "Endpoint.spec.instanceCount: 0 is less than the allowed 1",
+        "Endpoint.spec.mode: 'None' is not one of ['Single', 'Multi']",
+    ]
+
+
+def test_validate_raises_with_every_error():
+    with pytest.raises(SchemaValidationError) as excinfo:
+        VALIDATOR.validate({"spec": {"instanceCount": "two"}})
+
+    assert excinfo.value.kind == "Endpoint"
+    assert excinfo.value.errors == [
+        "Endpoint.spec.endpointName: required field is missing",
+        "Endpoint.spec.instanceCount: expected integer, got str",
+    ]
+
+
+def test_schemas_are_fetched_again_after_a_failure(monkeypatch):
+    responses = [ConnectionError("connection reset"), ("Endpoint", SCHEMA), ("Endpoint", SCHEMA)]
+    fetches = []
+
+    def fetch_schema(api_client, group, version, plural):
+        fetches.append(plural)
+        response = responses[len(fetches) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(schema, "_fetch_schema", fetch_schema)
+    monkeypatch.setattr(schema, "_validators", {})
+
+    assert schema.get_validator(None, "sagemaker.services.k8s.aws", "v1alpha1", "endpoints") is None
+    validator = schema.get_validator(None, "sagemaker.services.k8s.aws", "v1alpha1", "endpoints")
+    assert validator is not None and validator.kind == "Endpoint"
+    assert schema.get_validator(None, "sagemaker.services.k8s.aws", "v1alpha1", "endpoints") \
+        is validator
+    assert fetches == ["endpoints", "endpoints"]
+
+
+def test_kinds_without_schema_are_not_fetched_again(monkeypatch):
+    fetches = []
+
+    def fetch_schema(api_client, group, version, plural):
+        fetches.append(plural)
+        return "Model", None
+
+    monkeypatch.setattr(schema, "_fetch_schema", fetch_schema)
+    monkeypatch.setattr(schema, "_validators", {})
+
+    for _ in range(2):
+        assert schema.get_validator(None, "sagemaker.services.k8s.aws", "v1alpha1", "models") is None
+    assert fetches == ["models"]
@@ -0,0 +1,116 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Unit tests for the status predicates waited on by `k8s.wait_for`.
+"""
+
+import threading
+
+from collections import OrderedDict
+
+from common import status
+from common.status import PredicateMatch
+
+
+def _resource(endpoint_status=None, **conditions):
+    resource_status = {"conditions": [
+        {"type": condition_type, "status": condition_status, "message": f"{condition_type} message"}
+        for condition_type, condition_status in conditions.items()]}
+    if endpoint_status is not None:
+        resource_status["endpointStatus"] = endpoint_status
+    return {"metadata": {"name": "endpoint"}, "status": resource_status}
+
+
+SYNCED = _resource("InService", **{status.ACK_RESOURCE_SYNCED: "True"})
+TERMINAL = _resource("Failed", **{status.ACK_RESOURCE_SYNCED: "False", status.ACK_TERMINAL: "True"})
+NOT_CONSUMED = {"metadata": {"name": "endpoint"}}
+
+
+def test_condition_matches_with_its_message():
+    assert status.synced(SYNCED) == PredicateMatch(
+        "synced", f"{status.ACK_RESOURCE_SYNCED} message")
+    assert status.synced(TERMINAL) is None
+    assert status.condition(status.ACK_RESOURCE_SYNCED, False)(TERMINAL) == PredicateMatch(
+        f"{status.ACK_RESOURCE_SYNCED}=False", f"{status.ACK_RESOURCE_SYNCED} message")
+    assert status.condition(status.ACK_TERMINAL, False)(SYNCED) is None
+
+
+def test_or_gives_the_first_match():
+    failed = status.terminal | status.status_in(["Failed"])
+
+    assert failed(TERMINAL) == PredicateMatch("terminal", f"{status.ACK_TERMINAL} message")
+    assert (status.status_in(["Failed"]) | status.terminal)(TERMINAL) == \
+        PredicateMatch("status.endpointStatus=Failed")
+    assert failed(SYNCED) is None
+    assert failed.name == "(terminal | status in ['Failed'])"
+
+
+def test_and_joins_both_matches():
+    ready = status.synced & status.field_in("status.endpointStatus", ["InService"])
+
+    assert ready(SYNCED) == PredicateMatch(
+        "synced & status.endpointStatus=InService", f"{status.ACK_RESOURCE_SYNCED} message")
+    assert ready(TERMINAL) is None
+    assert (status.synced & status.status_in(["Failed"]))(SYNCED) is None
+
+
+def test_invert_holds_when_the_predicate_does_not():
+    not_terminal = ~status.terminal
+
+    assert not_terminal(SYNCED) == PredicateMatch("~terminal")
+    assert not_terminal(TERMINAL) is None
+    assert (~status.consumed)(NOT_CONSUMED) == PredicateMatch("~consumed")
+
+
+def test_consumed_and_condition_exists():
+    assert status.consumed(SYNCED) == PredicateMatch("consumed")
+    assert status.consumed(NOT_CONSUMED) is None
+    assert status.condition_exists(status.ACK_TERMINAL)(TERMINAL) is not None
+    assert status.condition_exists(status.ACK_TERMINAL)(SYNCED) is None
+
+
+def test_status_in_searches_every_status_field():
+    training_job = {"status": {"trainingJobStatus": "Completed", "secondaryStatus": "Stopped"}}
+
+    assert status.status_in(["Completed"])(training_job) == \
+        PredicateMatch("status.trainingJobStatus=Completed")
+    assert status.status_in(["Stopped"], path="status.secondaryStatus")(training_job) == \
+        PredicateMatch("status.secondaryStatus=Stopped")
+    assert status.status_in(["Failed"])(training_job) is None
+
+
+def test_field_in_does_not_match_unhashable_values():
+    resource = {"status": {"endpointStatus": {"state": "InService"}, "tags": ["a"]}}
+
+    assert status.field_in("status.endpointStatus", ["InService"])(resource) is None
+    assert status.field_in("status.tags", ["a"])(resource) is None
+
+
+def test_views_are_shared_between_threads(monkeypatch):
+    # Small enough for the threads to keep evicting each other's views
+    monkeypatch.setattr(status, "VIEW_CACHE_SIZE", 16)
+    monkeypatch.setattr(status, "_views", OrderedDict())
+    resources = [{"metadata": {"uid": f"uid-{index % 100}", "resourceVersion": "1"},
+                  "status": {}} for index in range(2000)]
+
+    def read_views():
+        for resource in resources:
+            status.view(resource)
+
+    threads = [threading.Thread(target=read_views) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(status._views) == 16
+    assert status.view(resources[0]) is status.view(resources[100])
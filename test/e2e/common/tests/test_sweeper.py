@@ -0,0 +1,94 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Unit tests for the sweeper of leaked AWS resources.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from common.sweeper import SweepKind, bootstrapped_names, sweep
+
+NOW = datetime.now(timezone.utc)
+OLD = NOW - timedelta(hours=48)
+NEW = NOW - timedelta(hours=1)
+
+
+def _kind(name, resources, prefixes):
+    deleted = []
+    return SweepKind(name, lambda: resources, deleted.append, prefixes), deleted
+
+
+def test_sweep_only_matches_prefixes_of_each_kind():
+    buckets, deleted_buckets = _kind("DataBucket", [
+        ("ack-data-bucket-old", OLD),
+        ("soak-xgboost-model-old", OLD),
+    ], ["ack-data-bucket-"])
+    models, deleted_models = _kind("Model", [
+        ("soak-xgboost-model-old", OLD),
+        ("ack-data-bucket-old", OLD),
+    ], ["soak-"])
+
+    report = sweep([buckets, models], timedelta(hours=24), dry_run=False)
+
+    assert deleted_buckets == ["ack-data-bucket-old"]
+    assert deleted_models == ["soak-xgboost-model-old"]
+    assert not report.failed
+
+
+def test_sweep_skips_recent_and_protected_resources():
+    roles, deleted = _kind("ExecutionRole", [
+        ("ack-sagemaker-execution-role-old", OLD),
+        ("ack-sagemaker-execution-role-live", OLD),
+        ("ack-sagemaker-execution-role-new", NEW),
+        # Naive creation times are taken to be UTC
+        ("ack-sagemaker-execution-role-naive", OLD.replace(tzinfo=None)),
+    ], ["ack-sagemaker-execution-role-"])
+    protected = bootstrapped_names({
+        "DataBucketName": "ack-data-bucket-live",
+        "ExecutionRoleARN": "arn:aws:iam::123456789012:role/ack-sagemaker-execution-role-live",
+    })
+
+    sweep([roles], timedelta(hours=24), dry_run=False, protected=protected)
+
+    assert sorted(deleted) == ["ack-sagemaker-execution-role-naive",
+                               "ack-sagemaker-execution-role-old"]
+
+
+def test_sweep_is_a_dry_run_by_default():
+    models, deleted = _kind("Model", [("xgboost-model-old", OLD)], ["xgboost-model-"])
+
+    report = sweep([models], timedelta(hours=24))
+
+    assert deleted == []
+    assert [resource.name for resource in report.resources] == ["xgboost-model-old"]
+    assert "would delete" in report.summary()
+
+
+def test_sweep_prefixes_restrict_those_of_each_kind():
+    models, deleted = _kind("Model", [
+        ("xgboost-model-old", OLD),
+        ("shared-xgboost-model-old", OLD),
+        ("other-old", OLD),
+    ], ["xgboost-model-", "shared-xgboost-model-"])
+
+    sweep([models], timedelta(hours=24), dry_run=False, prefixes=["shared-", "other-"])
+
+    assert deleted == ["shared-xgboost-model-old"]
+
+
+def test_bootstrapped_names_include_arn_resource_names():
+    names = bootstrapped_names({
+        "ExecutionRoleARN": "arn:aws:iam::123456789012:role/my-role",
+        "Count": 3,
+    })
+
+    assert names == {"arn:aws:iam::123456789012:role/my-role", "my-role"}
@@ -0,0 +1,320 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Traces the operations of the harness as OpenTelemetry spans.
+
+Spans are nested through a context variable, so every span started while
+another is current becomes its child. The spans of each test, including its
+fixtures, the `common.k8s` calls and the boto3 calls they make, share the
+trace of the test. Spans started on other threads, such as those of the
+background reaper, start traces of their own.
+
+Finished spans are written by `FileSpanExporter` as OTLP/JSON export
+requests, one per line, which the OpenTelemetry collector's `otlpjsonfile`
+receiver can ingest. Tracing is disabled, and costs next to nothing, until an
+exporter is configured.
+"""
+
+import os
+import json
+import inspect
+import threading
+import contextvars
+
+from time import time_ns
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+import boto3
+
+# Span kinds and status codes of the OTLP protocol
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("ack_e2e_span", default=None)
+_exporter: Optional["FileSpanExporter"] = None
+
+# Converts arguments of a given type into span attributes
+_attribute_extractors: Dict[type, Callable[[Any], Dict[str, Any]]] = {}
+
+
+def _attribute_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    """An operation of the harness, timed from its start to its end."""
+
+    def __init__(self, name: str, kind: int = SPAN_KIND_INTERNAL,
+                 attributes: Optional[Dict[str, Any]] = None):
+        parent = _current_span.get()
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent is not None else None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status_code = 0
+        self.status_message: Optional[str] = None
+        self.start_time = time_ns()
+        self.end_time: Optional[int] = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, exception: BaseException):
+        self.status_code = STATUS_ERROR
+        self.status_message = str(exception)
+        self.attributes["exception.type"] = type(exception).__name__
+
+    def activate(self) -> "Span":
+        """Makes this span the parent of the spans started from now on, until
+        it ends.
+        """
+        self._token = _current_span.set(self)
+        return self
+
+    def end(self):
+        if self.end_time is not None:
+            return
+        self.end_time = time_ns()
+        if self._token is not None:
+            _current_span.reset(self._token)
+            self._token = None
+        if _exporter is not None:
+            _exporter.export(self)
+
+    def __enter__(self) -> "Span":
+        return self.activate()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_value is not None:
+            self.set_error(exc_value)
+        elif self.status_code == 0:
+            self.status_code = STATUS_OK
+        self.end()
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time),
+            "endTimeUnixNano": str(self.end_time),
+            "attributes": [{"key": key, "value": _attribute_value(value)}
+                           for key, value in self.attributes.items()],
+            "status": {"code": self.status_code},
+        }
+        if self.parent_span_id is not None:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message is not None:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class _NoopSpan:
+    """Stands in for spans while tracing is disabled."""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_error(self, exception: BaseException):
+        pass
+
+    def activate(self) -> "_NoopSpan":
+        return self
+
+    def end(self):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class FileSpanExporter:
+    """Appends finished spans to a file as OTLP/JSON export requests."""
+
+    def __init__(self, path: str, resource_attributes: Optional[Dict[str, Any]] = None,
+                 scope: str = "ack-e2e"):
+        self.path = path
+        self.resource_attributes = {"service.name": "ack-e2e", **(resource_attributes or {})}
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._spans: List[Span] = []
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def export(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    def flush(self):
+        """Writes the spans finished since the last flush as one request."""
+        with self._lock:
+            spans, self._spans = self._spans, []
+        if not spans:
+            return
+
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": key, "value": _attribute_value(value)}
+                for key, value in self.resource_attributes.items()]},
+            "scopeSpans": [{
+                "scope": {"name": self.scope},
+                "spans": [span.to_otlp() for span in spans],
+            }],
+        }]}
+        with open(self.path, "a") as stream:
+            stream.write(json.dumps(request, separators=(",", ":")) + "\n")
+
+
+def configure(exporter: Optional[FileSpanExporter]):
+    """Enables tracing to the given exporter, or disables it when None."""
+    global _exporter
+    if _exporter is not None:
+        _exporter.flush()
+    _exporter = exporter
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def flush():
+    if _exporter is not None:
+        _exporter.flush()
+
+
+def current_span():
+    """Gets the span of the operation in progress, to add attributes to."""
+    span = _current_span.get()
+    return span if span is not None and _exporter is not None else _NOOP_SPAN
+
+
+def span(name: str, kind: int = SPAN_KIND_INTERNAL,
+         attributes: Optional[Dict[str, Any]] = None):
+    """Starts a span, to be used as a context manager or ended explicitly."""
+    if _exporter is None:
+        return _NOOP_SPAN
+    return Span(name, kind, attributes)
+
+
+def register_attributes(cls: type, extractor: Callable[[Any], Dict[str, Any]]):
+    """Records the attributes returned by the extractor for every argument of
+    the given type passed to a traced function.
+    """
+    _attribute_extractors[cls] = extractor
+
+
+def _argument_attributes(signature: inspect.Signature, args, kwargs) -> Dict[str, Any]:
+    attributes = {}
+    try:
+        bound = signature.bind(*args, **kwargs)
+    except TypeError:
+        return attributes
+    for name, value in bound.arguments.items():
+        extractor = _attribute_extractors.get(type(value))
+        if extractor is not None:
+            attributes.update(extractor(value))
+        elif isinstance(value, (str, int, float, bool)):
+            attributes[f"ack.arg.{name}"] = value
+    return attributes
+
+
+def traced(func: Callable = None, *, name: Optional[str] = None,
+           kind: int = SPAN_KIND_INTERNAL):
+    """Decorates a function to run in a span of its own.
+
+    Scalar arguments, and those of a type with registered attributes, are
+    recorded as attributes of the span, as is a scalar return value.
+    """
+    def decorate(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _exporter is None:
+                return func(*args, **kwargs)
+
+            with Span(span_name, kind, _argument_attributes(signature, args, kwargs)) as span:
+                result = func(*args, **kwargs)
+                if isinstance(result, (str, int, float, bool)):
+                    span.set_attribute("ack.result", result)
+                return result
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+def _boto3_before_parameter_build(params, model, context, **kwargs):
+    if _exporter is None:
+        return
+    context["tracing_span"] = Span(
+        f"{model.service_model.service_name}.{model.name}", SPAN_KIND_CLIENT, {
+            "rpc.system": "aws-api",
+            "rpc.service": model.service_model.service_name,
+            "rpc.method": model.name,
+        })
+
+
+def _boto3_after_call(http_response, parsed, context, **kwargs):
+    span = context.pop("tracing_span", None)
+    if span is None:
+        return
+    span.set_attribute("http.status_code", http_response.status_code)
+    retries = parsed.get("ResponseMetadata", {}).get("RetryAttempts")
+    span.set_attribute("aws.retries", retries)
+    error = parsed.get("Error", {}).get("Code")
+    if error is not None:
+        span.status_code = STATUS_ERROR
+        span.status_message = error
+    else:
+        span.status_code = STATUS_OK
+    span.end()
+
+
+def _boto3_after_call_error(exception, context, **kwargs):
+    span = context.pop("tracing_span", None)
+    if span is not None:
+        span.set_error(exception)
+        span.end()
+
+
+def instrument_boto3():
+    """Traces every call of the boto3 clients created from the default
+    session from now on. Calling it again, e.g. for every run of the harness
+    daemon, registers nothing more.
+    """
+    events = boto3._get_default_session().events
+    events.register("before-parameter-build", _boto3_before_parameter_build,
+                    unique_id="ack-e2e-tracing-before-parameter-build")
+    events.register("after-call", _boto3_after_call,
+                    unique_id="ack-e2e-tracing-after-call")
+    events.register("after-call-error", _boto3_after_call_error,
+                    unique_id="ack-e2e-tracing-after-call-error")
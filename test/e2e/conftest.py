@@ -12,13 +12,83 @@
 # permissions and limitations under the License.
 
 import os
+import shutil
+import logging
+import contextlib
 import pytest
 
-from common import k8s
+from typing import List
+
+from common import api_calls, cassette, k8s, metrics, pool, prewarm, profiling, schema, tracing
+from common.resources import random_suffix_name
 
 
 def pytest_addoption(parser):
-    pass
+    parser.addoption(
+        "--controller-metrics-url", default=None,
+        help="Prometheus server (e.g. http://localhost:9090) or, with "
+             "--controller-metrics-source=exposition, a /metrics endpoint to "
+             "collect controller resource usage from during each test")
+    parser.addoption(
+        "--controller-metrics-source", default="prometheus",
+        choices=("prometheus", "exposition"),
+        help="Whether --controller-metrics-url is a Prometheus server or a "
+             "Prometheus text exposition endpoint")
+    parser.addoption(
+        "--controller-metrics-selector", default=metrics.DEFAULT_PROMETHEUS_SELECTOR,
+        help="PromQL label selector matching the controller's series")
+    parser.addoption(
+        "--controller-metrics-interval", type=float, default=15,
+        help="Seconds between background samples of the controller metrics")
+    parser.addoption(
+        "--k8s-namespace", default=None,
+        help="Existing namespace to create every test resource in, instead of "
+             "a new namespace per worker. The resources created by each worker "
+             "are deleted by label at the end of the session")
+    parser.addoption(
+        "--reaper-timeout", type=float, default=900,
+        help="Seconds to wait at the end of the session for resources handed to "
+             "the background reaper to be deleted")
+    parser.addoption(
+        "--prewarm", action="store_true", default=False,
+        help="Create long-lead resources declared with common.prewarm.prewarmed "
+             "in the background when the session starts")
+    parser.addoption(
+        "--record", default=None, metavar="DIR",
+        help="Record every Kubernetes and AWS interaction to cassettes in DIR")
+    parser.addoption(
+        "--replay", default=None, metavar="DIR",
+        help="Answer every Kubernetes and AWS request from the cassettes in DIR "
+             "instead of a cluster and an AWS account")
+    parser.addoption(
+        "--replay-speed", type=float, default=0,
+        help="Factor by which to speed up the recorded latencies and the waits "
+             "between polls when replaying, 0 skipping them altogether")
+    parser.addoption(
+        "--profile-harness", default=None, metavar="DIR",
+        help="Profile the harness while each test and its fixtures run, writing "
+             "a profile per test and one merging them per worker to DIR")
+    parser.addoption(
+        "--profile-harness-profiler", default="sample", choices=profiling.PROFILERS,
+        help="Whether to sample stacks into flame graph folded stack files, or "
+             "to trace every call with cProfile into pstats files")
+    parser.addoption(
+        "--trace-harness", default=None, metavar="DIR",
+        help="Trace each test, its fixtures and the Kubernetes and AWS calls they "
+             "make, writing the spans of each worker to DIR as OTLP/JSON lines")
+    parser.addoption(
+        "--kube-contexts", default=os.environ.get("ACK_E2E_KUBE_CONTEXTS"),
+        metavar="CONTEXT,...",
+        help="Comma-separated kubeconfig contexts of clusters, each running the "
+             "controller under test, to shard the xdist workers across")
+    parser.addoption(
+        "--api-report", type=int, default=10, metavar="N",
+        help="Report the N tests and fixtures that made the most Kubernetes and "
+             "AWS API requests at the end of the session, 0 disabling the report")
+    parser.addoption(
+        "--skip-schema-validation", action="store_true", default=False,
+        help="Send custom resources without first validating them against the "
+             "schema of their CustomResourceDefinition")
 
 
 def pytest_configure(config):
@@ -28,8 +98,405 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "service(arg): mark test associated with a given service"
     )
+    config.addinivalue_line(
+        "markers", "controller_budget(**limits): fail the test if the controller "
+        "exceeds any of the given resource usage limits (e.g. cpu_seconds, "
+        "memory_peak_bytes, workqueue_depth_peak) while it runs"
+    )
+    config.addinivalue_line(
+        "markers", "api_budget(**limits): fail the test if it makes more API "
+        "requests than any of the given limits (e.g. k8s, k8s_get, aws, "
+        "aws_sagemaker, aws_describe_endpoint), not counting its fixtures"
+    )
+
+    # Share the run ID labelling every created resource with the workers
+    os.environ.setdefault("ACK_E2E_RUN_ID", k8s.RUN_ID)
+
+    kube_contexts = _kube_contexts(config)
+    if kube_contexts:
+        k8s.configure_k8s_api_client(context=_worker_kube_context(kube_contexts))
+        logging.info(f"Using the cluster of kubeconfig context {k8s.get_k8s_context()}")
+
+    record, replay = config.getoption("--record"), config.getoption("--replay")
+    if record is not None and replay is not None:
+        raise pytest.UsageError("--record and --replay are mutually exclusive")
+    if record is not None or replay is not None:
+        session_cassette = cassette.Cassette(
+            replay or record, replay is not None, k8s.WORKER_ID, k8s.RUN_ID,
+            speed=config.getoption("--replay-speed"))
+        session_cassette.scrub(k8s.RUN_ID, "$RUN_ID")
+        for label in (f"{k8s.WORKER_ID_LABEL}={k8s.WORKER_ID}",
+                      f'"{k8s.WORKER_ID_LABEL}":"{k8s.WORKER_ID}"'):
+            session_cassette.scrub(label, label.replace(k8s.WORKER_ID, "$WORKER_ID"))
+        session_cassette.install()
+        session_cassette.reseed("session")
+        config._ack_cassette = session_cassette
+
+    profile_directory = config.getoption("--profile-harness")
+    if profile_directory is not None:
+        config._ack_profiler = profiling.HarnessProfiler(
+            profile_directory, config.getoption("--profile-harness-profiler"), k8s.WORKER_ID)
+
+    trace_directory = config.getoption("--trace-harness")
+    if trace_directory is not None:
+        tracing.configure(tracing.FileSpanExporter(
+            os.path.join(trace_directory, f"{k8s.WORKER_ID}.jsonl"),
+            {"ack.run_id": k8s.RUN_ID, "ack.worker_id": k8s.WORKER_ID,
+             "ack.kube_context": k8s.get_k8s_context() or "default"}))
+        tracing.instrument_boto3()
+
+    api_calls.instrument_boto3()
+
+    if config.getoption("--skip-schema-validation"):
+        schema.configure(enabled=False)
+
+    # Workers receive the references of the resources pre-warmed by the master,
+    # unless the master pre-warmed them in another cluster
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is not None and "ack_prewarm_dir" in workerinput and \
+            workerinput.get("ack_prewarm_context") == k8s.get_k8s_context():
+        prewarm.receive_references(workerinput["ack_prewarm_dir"])
+
+
+def _kube_contexts(config) -> List[str]:
+    option = config.getoption("--kube-contexts")
+    if not option:
+        return []
+    contexts = [context.strip() for context in option.split(",") if context.strip()]
+    if not hasattr(config, "workerinput"):
+        unknown = set(contexts) - set(k8s.list_k8s_contexts())
+        if unknown:
+            raise pytest.UsageError(
+                f"--kube-contexts: no such kubeconfig contexts: {', '.join(sorted(unknown))}")
+    return contexts
+
+
+# Shard the workers across the clusters round-robin (gw0 and gw2 share the
+# first of two clusters, gw1 and gw3 the second). The controlling process, which
+# only pre-warms resources, uses the first cluster.
+def _worker_kube_context(contexts: List[str]) -> str:
+    if k8s.WORKER_ID.startswith("gw"):
+        return contexts[int(k8s.WORKER_ID[2:]) % len(contexts)]
+    return contexts[0]
+
+
+def _start_prewarmer(config, names):
+    prewarmer = prewarm.Prewarmer(random_suffix_name("ack-e2e-prewarm", 32))
+    config._ack_prewarmer = prewarmer
+    prewarmer.start(names)
+
+
+# Start provisioning the long-lead resources used by the collected tests before
+# any of them runs. Workers hand the names of the resources they use to the
+# master before it learns that they have finished collecting.
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_finish(session):
+    config = session.config
+    if not config.getoption("--prewarm"):
+        return
+
+    used = prewarm.used_declarations(session.items)
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is None:
+        _start_prewarmer(config, used)
+    elif "ack_prewarm_dir" in workerinput:
+        prewarm.write_used(workerinput["ack_prewarm_dir"], k8s.WORKER_ID, used)
+
+
+# Every worker collects the same tests, so the master pre-warms as soon as the
+# first has finished, before any test is scheduled
+def pytest_xdist_node_collection_finished(node, ids):
+    config = node.config
+    if not config.getoption("--prewarm") or hasattr(config, "_ack_prewarmer"):
+        return
+
+    directory = prewarm.handoff_directory(config)
+    _start_prewarmer(config, prewarm.read_used(directory))
+    prewarm.write_references(directory)
+
+
+def pytest_sessionfinish(session):
+    prewarmer = getattr(session.config, "_ack_prewarmer", None)
+    if prewarmer is not None:
+        prewarmer.stop()
+
+    # Send the API request counts of each worker to the master's report
+    workeroutput = getattr(session.config, "workeroutput", None)
+    if workeroutput is not None:
+        workeroutput["ack_api_calls"] = api_calls.export_counts()
+
+
+def pytest_testnodedown(node, error):
+    api_calls.import_counts(getattr(node, "workeroutput", {}).get("ack_api_calls", []))
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    limit = config.getoption("--api-report")
+    lines = api_calls.heaviest_callers(limit) if limit > 0 else []
+    if lines:
+        terminalreporter.write_sep("=", "API requests by caller")
+        for line in lines:
+            terminalreporter.write_line(line)
+
+
+def pytest_unconfigure(config):
+    session_cassette = getattr(config, "_ack_cassette", None)
+    if session_cassette is not None:
+        session_cassette.save()
+        session_cassette.uninstall()
+
+    profiler = getattr(config, "_ack_profiler", None)
+    if profiler is not None:
+        profiler.save()
+
+    tracing.configure(None)
+
+    # Directories through which the master and the workers exchanged data
+    for directory in (getattr(config, "_ack_pool_groups_dir", None),
+                      getattr(config, "_ack_prewarm_dir", None)):
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+# Profile and trace each test together with the setup and teardown of its
+# fixtures
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    profiler = getattr(item.config, "_ack_profiler", None)
+    if profiler is not None:
+        profiler.start(item.nodeid)
+
+    with tracing.span(f"test {item.name}", attributes={"code.nodeid": item.nodeid}), \
+            api_calls.attribute_to(item.nodeid):
+        yield
+
+    if profiler is not None:
+        profiler.stop()
+    tracing.flush()
+
+
+def _trace_phase(phase: str):
+    with tracing.span(phase) as span:
+        outcome = yield
+        if outcome.excinfo is not None:
+            span.set_error(outcome.excinfo[1])
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item):
+    # Generate the same random names for each test when recording and replaying
+    session_cassette = getattr(item.config, "_ack_cassette", None)
+    if session_cassette is not None:
+        session_cassette.reseed(item.nodeid)
+
+    yield from _trace_phase("setup")
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    yield from _trace_phase("call")
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    yield from _trace_phase("teardown")
+
+
+# Trace the setup of each fixture and count the API requests it makes, and do
+# the same for its teardown by wrapping the finalizers it registers between
+# two of our own
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    caller = f"fixture {fixturedef.argname}"
+    attributes = {"ack.fixture": fixturedef.argname, "ack.fixture.scope": fixturedef.scope}
+    teardowns = []
+
+    def start_teardown():
+        teardown = contextlib.ExitStack()
+        teardown.enter_context(tracing.span(
+            f"fixture teardown {fixturedef.argname}", attributes=attributes))
+        teardown.enter_context(api_calls.attribute_to(caller))
+        teardowns.append(teardown)
+
+    def end_teardown():
+        if teardowns:
+            teardowns.pop().close()
+
+    # Finalizers run in the reverse order they were added
+    fixturedef.addfinalizer(end_teardown)
+    with tracing.span(f"fixture setup {fixturedef.argname}", attributes=attributes) as span, \
+            api_calls.attribute_to(caller):
+        outcome = yield
+        if outcome.excinfo is not None:
+            span.set_error(outcome.excinfo[1])
+    fixturedef.addfinalizer(start_teardown)
+
+
+def pytest_configure_node(node):
+    if node.config.getoption("--prewarm"):
+        node.workerinput["ack_prewarm_dir"] = prewarm.handoff_directory(node.config)
+        node.workerinput["ack_prewarm_context"] = k8s.get_k8s_context()
+    if node.config.getvalue("dist") == "loadfile":
+        node.workerinput["ack_pool_groups_dir"] = pool.pool_groups_directory(node.config)
+
+
+def pytest_collection_modifyitems(config, items):
+    pool_groups = pool.assign_pool_groups(items)
+    # Hand the pool groups to the master, which schedules the tests
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is not None and "ack_pool_groups_dir" in workerinput:
+        pool.write_pool_groups(workerinput["ack_pool_groups_dir"], k8s.WORKER_ID, pool_groups)
+
+
+def pytest_xdist_make_scheduler(config, log):
+    # Keep every module sharing a pooled prerequisite on the same worker
+    if config.getvalue("dist") == "loadfile":
+        return pool.PoolGroupScheduling(config, log)
+
 
 # Provide a k8s client to interact with the integration test cluster
 @pytest.fixture(scope='class')
 def k8s_client():
     return k8s._get_k8s_api_client()
+
+
+# Isolate each xdist worker in its own namespace, so that resources created by
+# concurrent workers can never contend for the same name. Deleting the
+# namespace at the end of the session tears down every resource created within
+# it in a single operation. When the namespace is shared, only the resources
+# labelled as created by this worker are torn down. Either way, the deletions
+# handed to the background reaper by fixtures are drained first.
+@pytest.fixture(scope="session")
+def k8s_namespace(request, worker_id):
+    reaper_timeout = request.config.getoption("--reaper-timeout")
+    shared_namespace = request.config.getoption("--k8s-namespace")
+    if shared_namespace is not None:
+        yield shared_namespace
+        k8s.drain_reaper(reaper_timeout)
+        if k8s.delete_run_resources(shared_namespace):
+            logging.info(f"Deleted resources labelled {k8s.run_label_selector()} "
+                         f"from {shared_namespace}")
+        return
+
+    namespace = random_suffix_name(f"ack-e2e-{worker_id}", 32)
+    session_cassette = getattr(request.config, "_ack_cassette", None)
+    if session_cassette is not None:
+        session_cassette.scrub(namespace, "$NAMESPACE")
+    k8s.create_k8s_namespace(namespace)
+    logging.info(f"Created test namespace {namespace}")
+
+    yield namespace
+
+    k8s.drain_reaper(reaper_timeout)
+    k8s.delete_k8s_namespace(namespace)
+    if k8s.wait_k8s_namespace_deleted(namespace):
+        logging.info(f"Deleted test namespace {namespace}")
+
+
+# Samples the controller's resource usage for the whole session, if a metrics
+# endpoint has been configured
+@pytest.fixture(scope="session")
+def controller_metrics_collector(request):
+    url = request.config.getoption("--controller-metrics-url")
+    if url is None:
+        yield
+        return
+
+    if request.config.getoption("--controller-metrics-source") == "exposition":
+        source = metrics.ExpositionSource(url)
+    else:
+        source = metrics.PrometheusSource(
+            url, request.config.getoption("--controller-metrics-selector"))
+
+    collector = metrics.ControllerMetricsCollector(
+        source, request.config.getoption("--controller-metrics-interval"))
+    collector.start()
+    yield collector
+    collector.stop()
+
+
+# Snapshots the controller's metrics as each test starts, for
+# pytest_runtest_makereport to compare with those as it ends
+@pytest.fixture(autouse=True)
+def controller_metrics(request, controller_metrics_collector):
+    if controller_metrics_collector is None:
+        yield
+        return
+
+    try:
+        start = controller_metrics_collector.open_window()
+    except Exception as e:
+        logging.warning(f"Not measuring the controller during {request.node.nodeid}: "
+                        f"unable to read its metrics ({e})")
+        start = None
+    request.node._ack_controller_metrics = (controller_metrics_collector, start)
+    yield
+
+    # Close the window of a test that never ran, e.g. as a later fixture failed
+    _, start = request.node.__dict__.pop("_ack_controller_metrics", (None, None))
+    if start is not None:
+        with contextlib.suppress(Exception):
+            controller_metrics_collector.close_window(start)
+
+
+def _exceeded(limits: dict, usage: dict) -> List[str]:
+    return [f"{key}={usage.get(key)} (budget {limit})"
+            for key, limit in limits.items() if usage.get(key, 0) > limit]
+
+
+def _controller_budget_failures(item, report) -> List[str]:
+    collector, start = item.__dict__.pop("_ack_controller_metrics", (None, None))
+    marker = item.get_closest_marker("controller_budget")
+    if collector is None:
+        return []
+    if start is None:
+        return ["Controller budget could not be checked: its metrics are unavailable"] \
+            if marker is not None else []
+
+    try:
+        end, samples = collector.close_window(start)
+    except Exception as e:
+        logging.warning(f"Not measuring the controller during {item.nodeid}: "
+                        f"unable to read its metrics ({e})")
+        return [f"Controller budget could not be checked: {e}"] if marker is not None else []
+
+    deltas = metrics.compute_deltas(start, end, samples)
+    item.user_properties.append(("controller_metrics", deltas))
+    report.user_properties.append(("controller_metrics", deltas))
+    report.sections.append((
+        "controller metrics",
+        "\n".join(f"{key}: {value:.3f}" for key, value in sorted(deltas.items()))))
+
+    exceeded = _exceeded(marker.kwargs, deltas) if marker is not None else []
+    return [f"Controller exceeded its budget: {', '.join(exceeded)}"] if exceeded else []
+
+
+def _api_budget_failures(item, report) -> List[str]:
+    # Only the requests of the test itself, as fixtures are counted separately
+    calls = api_calls.caller_counts(item.nodeid)
+    item.user_properties.append(("api_calls", calls))
+    report.user_properties.append(("api_calls", calls))
+    if calls:
+        report.sections.append((
+            "api calls", "\n".join(f"{call}: {count}" for call, count in sorted(calls.items()))))
+
+    marker = item.get_closest_marker("api_budget")
+    exceeded = _exceeded(marker.kwargs, api_calls.budget_counts(item.nodeid)) \
+        if marker is not None else []
+    return [f"Test exceeded its API request budget: {', '.join(exceeded)}"] if exceeded else []
+
+
+# Attach the controller's resource usage and the API requests made while each
+# test ran to its report, and fail the test, rather than error in its
+# teardown, if either exceeds a declared budget
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    if call.when != "call":
+        return
+
+    report = outcome.get_result()
+    failures = _controller_budget_failures(item, report) + _api_budget_failures(item, report)
+    if failures and report.passed:
+        report.outcome = "failed"
+        report.longrepr = "\n".join(failures)
@@ -0,0 +1,54 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Starts a warm harness daemon, submits test runs to it or stops it.
+"""
+
+import sys
+import logging
+import argparse
+
+from common.daemon import DEFAULT_SOCKET_PATH, HarnessDaemon, stop, submit
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog=f"{__file__}")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH,
+                        help="Unix socket the daemon listens on")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run the daemon in the foreground")
+    serve_parser.add_argument("--k8s-namespace", default=None,
+                              help="existing namespace to run every test in, instead "
+                                   "of one created for the lifetime of the daemon")
+    run_parser = commands.add_parser("run", help="run pytest with the given arguments "
+                                                 "in the daemon")
+    run_parser.add_argument("pytest_args", nargs=argparse.REMAINDER)
+    commands.add_parser("stop", help="stop the daemon")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        logging.getLogger().setLevel(logging.INFO)
+        daemon = HarnessDaemon(args.socket, args.k8s_namespace)
+        daemon.warm()
+        daemon.serve_forever()
+        sys.exit(0)
+
+    try:
+        if args.command == "run":
+            pytest_args = args.pytest_args
+            if pytest_args[:1] == ["--"]:
+                pytest_args = pytest_args[1:]
+            sys.exit(submit(pytest_args, args.socket))
+        sys.exit(stop(args.socket))
+    except ConnectionError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
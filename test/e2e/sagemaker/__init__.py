@@ -20,6 +20,8 @@ CRD_VERSION = "v1alpha1"
 CONFIG_RESOURCE_PLURAL = 'endpointconfigs'
 MODEL_RESOURCE_PLURAL = 'models'
 ENDPOINT_RESOURCE_PLURAL = 'endpoints'
+TRAINING_JOB_RESOURCE_PLURAL = 'trainingjobs'
+PROCESSING_JOB_RESOURCE_PLURAL = 'processingjobs'
 
 # PyTest marker for the current service
 service_marker = pytest.mark.service(arg=SERVICE_NAME)
@@ -0,0 +1,139 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Fixtures for prerequisite resources shared by the SageMaker test modules,
+and for the long-lead jobs that may be pre-warmed at the start of the session.
+"""
+
+import logging
+import pytest
+
+from sagemaker import (
+    SERVICE_NAME,
+    CRD_GROUP,
+    CRD_VERSION,
+    MODEL_RESOURCE_PLURAL,
+    TRAINING_JOB_RESOURCE_PLURAL,
+    PROCESSING_JOB_RESOURCE_PLURAL,
+)
+from sagemaker.replacement_values import REPLACEMENT_VALUES
+from common.pool import pooled_fixture
+from common.prewarm import claim, prewarmed
+from common.resources import load_resource_file, random_suffix_name
+from common import k8s
+
+
+# An xgboost Model used, but never modified, by the EndpointConfig and
+# Endpoint tests
+@pooled_fixture
+def shared_xgboost_model(k8s_namespace):
+    resource_name = random_suffix_name("shared-xgboost-model", 32)
+
+    replacements = REPLACEMENT_VALUES.copy()
+    replacements["MODEL_NAME"] = resource_name
+
+    model = load_resource_file(
+        SERVICE_NAME, "xgboost_model", additional_replacements=replacements
+    )
+    logging.debug(model)
+
+    reference = k8s.CustomResourceReference(
+        CRD_GROUP,
+        CRD_VERSION,
+        MODEL_RESOURCE_PLURAL,
+        resource_name,
+        namespace=k8s_namespace,
+    )
+    resource = k8s.create_custom_resource(reference, model)
+    resource = k8s.wait_resource_consumed_by_controller(reference)
+    assert resource is not None
+
+    yield (reference, resource)
+
+    # Delete the model in the background once every module using it is done
+    k8s.reap(reference)
+
+
+@prewarmed("xgboost_trainingjob")
+def _xgboost_trainingjob(namespace):
+    resource_name = random_suffix_name("xgboost-trainingjob", 32)
+
+    replacements = REPLACEMENT_VALUES.copy()
+    replacements["TRAINING_JOB_NAME"] = resource_name
+
+    trainingjob = load_resource_file(
+        SERVICE_NAME, "xgboost_trainingjob", additional_replacements=replacements
+    )
+    logging.debug(trainingjob)
+
+    reference = k8s.CustomResourceReference(
+        CRD_GROUP,
+        CRD_VERSION,
+        TRAINING_JOB_RESOURCE_PLURAL,
+        resource_name,
+        namespace=namespace,
+    )
+    return (reference, trainingjob)
+
+
+@pytest.fixture(scope="module")
+def xgboost_trainingjob(k8s_namespace):
+    reference = claim("xgboost_trainingjob")
+    if reference is None:
+        reference, trainingjob = _xgboost_trainingjob(k8s_namespace)
+        k8s.create_custom_resource(reference, trainingjob)
+    resource = k8s.wait_resource_consumed_by_controller(reference)
+
+    assert resource is not None
+
+    yield (reference, resource)
+
+    # Delete the k8s resource in the background if not already deleted by tests
+    k8s.reap(reference)
+
+
+@prewarmed("kmeans_processing_job")
+def _kmeans_processing_job(namespace):
+    resource_name = random_suffix_name("kmeans-processingjob", 32)
+
+    replacements = REPLACEMENT_VALUES.copy()
+    replacements["PROCESSING_JOB_NAME"] = resource_name
+
+    processing_job = load_resource_file(
+        SERVICE_NAME, "kmeans_processingjob", additional_replacements=replacements
+    )
+    logging.debug(processing_job)
+
+    reference = k8s.CustomResourceReference(
+        CRD_GROUP,
+        CRD_VERSION,
+        PROCESSING_JOB_RESOURCE_PLURAL,
+        resource_name,
+        namespace=namespace,
+    )
+    return (reference, processing_job)
+
+
+@pytest.fixture(scope="module")
+def kmeans_processing_job(k8s_namespace):
+    reference = claim("kmeans_processing_job")
+    if reference is None:
+        reference, processing_job = _kmeans_processing_job(k8s_namespace)
+        k8s.create_custom_resource(reference, processing_job)
+    resource = k8s.wait_resource_consumed_by_controller(reference)
+
+    assert resource is not None
+
+    yield (reference, resource)
+
+    # Delete the k8s resource in the background if not already deleted by tests
+    k8s.reap(reference)
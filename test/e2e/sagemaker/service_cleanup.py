@@ -23,10 +23,13 @@ from sagemaker.bootstrap_resources import TestBootstrapResources
 IAM_ROLE_ARN_REGEX = r'^arn:aws:iam::\d{12}:(?:root|user|role\/([A-Za-z0-9-]+))$'
 
 def delete_execution_role(role_arn: str):
+    role_name = re.match(IAM_ROLE_ARN_REGEX, role_arn).group(1)
+    delete_role(role_name)
+
+def delete_role(role_name: str):
     region = get_aws_region()
     iam = boto3.client("iam", region_name=region)
 
-    role_name = re.match(IAM_ROLE_ARN_REGEX, role_arn).group(1)
     managedPolicy = iam.list_attached_role_policies(RoleName=role_name)
     for each in managedPolicy['AttachedPolicies']:
         iam.detach_role_policy(RoleName=role_name, PolicyArn=each['PolicyArn'])
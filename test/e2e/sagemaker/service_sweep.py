@@ -0,0 +1,90 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Declares the AWS resources created by the SageMaker bootstrapping process
+and tests, so that those leaked by previous runs can be swept.
+"""
+
+import boto3
+
+from common.aws import get_aws_region
+from common.sweeper import SweepKind
+from sagemaker.service_cleanup import delete_data_bucket, delete_role
+
+# Prefixes given to `random_suffix_name` by the bootstrapping process, the
+# fixtures and the soak and load generator modes, for each kind of resource
+DATA_BUCKET_PREFIXES = ["ack-data-bucket-"]
+EXECUTION_ROLE_PREFIXES = ["ack-sagemaker-execution-role-"]
+MODEL_PREFIXES = ["xgboost-model-", "shared-xgboost-model-", "soak-", "load-"]
+ENDPOINT_CONFIG_PREFIXES = ["single-variant-config-", "soak-", "load-"]
+ENDPOINT_PREFIXES = ["single-variant-endpoint-", "2-single-variant-endpoint-", "soak-", "load-"]
+TRAINING_JOB_PREFIXES = ["xgboost-trainingjob-", "soak-", "load-"]
+PROCESSING_JOB_PREFIXES = ["kmeans-processingjob-", "soak-", "load-"]
+
+
+def _paginate(client, operation: str, result_key: str, name_key: str,
+              time_key: str, **kwargs):
+    for page in client.get_paginator(operation).paginate(**kwargs):
+        for item in page[result_key]:
+            yield item[name_key], item[time_key]
+
+
+def sweep_kinds():
+    region = get_aws_region()
+    sagemaker = boto3.client("sagemaker", region_name=region)
+    s3 = boto3.client("s3", region_name=region)
+    iam = boto3.client("iam", region_name=region)
+
+    def list_buckets():
+        # ListBuckets returns every bucket of the account in a single page
+        for bucket in s3.list_buckets()["Buckets"]:
+            yield bucket["Name"], bucket["CreationDate"]
+
+    return [
+        SweepKind(
+            "Endpoint",
+            lambda: _paginate(sagemaker, "list_endpoints", "Endpoints",
+                              "EndpointName", "CreationTime"),
+            lambda name: sagemaker.delete_endpoint(EndpointName=name),
+            ENDPOINT_PREFIXES),
+        SweepKind(
+            "EndpointConfig",
+            lambda: _paginate(sagemaker, "list_endpoint_configs", "EndpointConfigs",
+                              "EndpointConfigName", "CreationTime"),
+            lambda name: sagemaker.delete_endpoint_config(EndpointConfigName=name),
+            ENDPOINT_CONFIG_PREFIXES),
+        SweepKind(
+            "Model",
+            lambda: _paginate(sagemaker, "list_models", "Models",
+                              "ModelName", "CreationTime"),
+            lambda name: sagemaker.delete_model(ModelName=name),
+            MODEL_PREFIXES),
+        # Jobs cannot be deleted, but those still running are stopped
+        SweepKind(
+            "TrainingJob",
+            lambda: _paginate(sagemaker, "list_training_jobs", "TrainingJobSummaries",
+                              "TrainingJobName", "CreationTime", StatusEquals="InProgress"),
+            lambda name: sagemaker.stop_training_job(TrainingJobName=name),
+            TRAINING_JOB_PREFIXES),
+        SweepKind(
+            "ProcessingJob",
+            lambda: _paginate(sagemaker, "list_processing_jobs", "ProcessingJobSummaries",
+                              "ProcessingJobName", "CreationTime", StatusEquals="InProgress"),
+            lambda name: sagemaker.stop_processing_job(ProcessingJobName=name),
+            PROCESSING_JOB_PREFIXES),
+        SweepKind("DataBucket", list_buckets, delete_data_bucket, DATA_BUCKET_PREFIXES),
+        SweepKind(
+            "ExecutionRole",
+            lambda: _paginate(iam, "list_roles", "Roles", "RoleName", "CreateDate"),
+            delete_role,
+            EXECUTION_ROLE_PREFIXES),
+    ]
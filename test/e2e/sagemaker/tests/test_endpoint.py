@@ -16,7 +16,7 @@
 import boto3
 import pytest
 import logging
-import time
+from time import time
 from typing import Dict
 
 from sagemaker import (
@@ -25,12 +25,15 @@ from sagemaker import (
     CRD_GROUP,
     CRD_VERSION,
     CONFIG_RESOURCE_PLURAL,
-    MODEL_RESOURCE_PLURAL,
     ENDPOINT_RESOURCE_PLURAL,
 )
 from sagemaker.replacement_values import REPLACEMENT_VALUES
 from common.resources import load_resource_file, random_suffix_name
-from common import k8s
+from common import clock, drift, k8s, status
+
+ENDPOINT_STATUS = status.StatusPath("status.endpointStatus")
+# Endpoint spec fields the controller pushes to SageMaker
+ENDPOINT_FIELDS = [drift.FieldMapping("spec.endpointConfigName", "EndpointConfigName")]
 
 
 @pytest.fixture(scope="module")
@@ -39,20 +42,15 @@ def sagemaker_client():
 
 
 @pytest.fixture(scope="module")
-def single_variant_xgboost_endpoint():
+def single_variant_xgboost_endpoint(k8s_namespace, shared_xgboost_model):
     endpoint_resource_name = random_suffix_name("single-variant-endpoint", 32)
     config1_resource_name = endpoint_resource_name + "-config"
-    model_resource_name = config1_resource_name + "-model"
+    (model_reference, _) = shared_xgboost_model
 
     replacements = REPLACEMENT_VALUES.copy()
     replacements["ENDPOINT_NAME"] = endpoint_resource_name
     replacements["CONFIG_NAME"] = config1_resource_name
-    replacements["MODEL_NAME"] = model_resource_name
-
-    model = load_resource_file(
-        SERVICE_NAME, "xgboost_model", additional_replacements=replacements
-    )
-    logging.debug(model)
+    replacements["MODEL_NAME"] = model_reference.name
 
     config = load_resource_file(
         SERVICE_NAME,
@@ -67,23 +65,12 @@ def single_variant_xgboost_endpoint():
     logging.debug(endpoint_spec)
 
     # Create the k8s resources
-    model_reference = k8s.CustomResourceReference(
-        CRD_GROUP,
-        CRD_VERSION,
-        MODEL_RESOURCE_PLURAL,
-        model_resource_name,
-        namespace="default",
-    )
-    model_resource = k8s.create_custom_resource(model_reference, model)
-    model_resource = k8s.wait_resource_consumed_by_controller(model_reference)
-    assert model_resource is not None
-
     config1_reference = k8s.CustomResourceReference(
         CRD_GROUP,
         CRD_VERSION,
         CONFIG_RESOURCE_PLURAL,
         config1_resource_name,
-        namespace="default",
+        namespace=k8s_namespace,
     )
     config1_resource = k8s.create_custom_resource(config1_reference, config)
     config1_resource = k8s.wait_resource_consumed_by_controller(config1_reference)
@@ -99,7 +86,7 @@ def single_variant_xgboost_endpoint():
         CRD_VERSION,
         CONFIG_RESOURCE_PLURAL,
         config2_resource_name,
-        namespace="default",
+        namespace=k8s_namespace,
     )
     config2_resource = k8s.create_custom_resource(config2_reference, config)
     config2_resource = k8s.wait_resource_consumed_by_controller(config2_reference)
@@ -110,7 +97,7 @@ def single_variant_xgboost_endpoint():
         CRD_VERSION,
         ENDPOINT_RESOURCE_PLURAL,
         endpoint_resource_name,
-        namespace="default",
+        namespace=k8s_namespace,
     )
     endpoint_resource = k8s.create_custom_resource(endpoint_reference, endpoint_spec)
     endpoint_resource = k8s.wait_resource_consumed_by_controller(endpoint_reference)
@@ -118,12 +105,8 @@ def single_variant_xgboost_endpoint():
 
     yield (endpoint_reference, endpoint_resource, endpoint_spec, config2_resource_name)
 
-    # Delete the k8s resource if not already deleted by tests
-    for cr in (model_reference, config1_reference, config2_reference, endpoint_reference):
-        try:
-            k8s.delete_custom_resource(cr)
-        except:
-            pass
+    # Delete the k8s resources in the background if not already deleted by tests
+    k8s.reap(endpoint_reference, config1_reference, config2_reference)
 
 
 @service_marker
@@ -132,6 +115,7 @@ class TestEndpoint:
     status_creating: str = "Creating"
     status_inservice: str = "InService"
     status_udpating: str = "Updating"
+    status_failed: str = "Failed"
 
     def _get_resource_endpoint_arn(self, resource: Dict):
         assert (
@@ -155,20 +139,17 @@ class TestEndpoint:
         expected_status: str,
         wait_periods: int = 18,
     ):
-        resource_status = None
-        for _ in range(wait_periods):
-            time.sleep(30)
-            resource = k8s.get_resource(reference)
-            assert "endpointStatus" in resource["status"]
-            resource_status = resource["status"]["endpointStatus"]
-            if resource_status == expected_status:
-                break
-        else:
-            logging.error(
-                f"Wait for endpoint resource status: {expected_status} timed out. Actual status: {resource_status}"
-            )
-
-        return resource_status
+        # Stop waiting as soon as the endpoint can no longer reach the status
+        outcome = k8s.wait_for(
+            reference,
+            until=status.field_in("status.endpointStatus", {expected_status}),
+            abort_on=status.terminal
+            | status.field_in("status.endpointStatus", {self.status_failed}),
+            wait_periods=wait_periods,
+            period_length=30,
+        )
+        assert outcome.resource is not None
+        return ENDPOINT_STATUS(outcome.resource)
 
     def _wait_sagemaker_endpoint_status(
         self,
@@ -179,7 +160,7 @@ class TestEndpoint:
     ):
         actual_status = None
         for _ in range(wait_periods):
-            time.sleep(30)
+            clock.sleep(30)
             actual_status = sagemaker_client.describe_endpoint(
                 EndpointName=endpoint_name
             )["EndpointStatus"]
@@ -229,7 +210,9 @@ class TestEndpoint:
             sagemaker_client, endpoint_name, reference, self.status_inservice
         )
 
-    def test_update_endpoint(self, sagemaker_client, single_variant_xgboost_endpoint):
+    def test_update_endpoint(
+        self, request, sagemaker_client, single_variant_xgboost_endpoint
+    ):
         (
             reference,
             resource,
@@ -237,13 +220,24 @@ class TestEndpoint:
             config2_resource_name,
         ) = single_variant_xgboost_endpoint
         endpoint_spec["spec"]["endpointConfigName"] = config2_resource_name
-        resource = k8s.patch_custom_resource(reference, endpoint_spec)
+        updated = time()
+        resource = k8s.patch_custom_resource_minimal(reference, endpoint_spec)
         resource = k8s.wait_resource_consumed_by_controller(reference)
         assert resource is not None
 
         self._assert_endpoint_status_in_sync(
             sagemaker_client, reference.name, reference, self.status_udpating
         )
+
+        # Time how long the new endpoint config takes to reach SageMaker
+        detector = drift.DriftDetector(
+            reference,
+            lambda: sagemaker_client.describe_endpoint(EndpointName=reference.name),
+            ENDPOINT_FIELDS,
+        )
+        report = detector.wait_converged(updated, wait_periods=108)
+        request.node.user_properties.append(("convergence", report.as_dict()))
+        assert report.converged
         self._assert_endpoint_status_in_sync(
             sagemaker_client, reference.name, reference, self.status_inservice
         )
@@ -24,7 +24,6 @@ from sagemaker import (
     CRD_GROUP,
     CRD_VERSION,
     CONFIG_RESOURCE_PLURAL,
-    MODEL_RESOURCE_PLURAL,
 )
 from sagemaker.replacement_values import REPLACEMENT_VALUES
 from common.resources import load_resource_file, random_suffix_name
@@ -37,18 +36,13 @@ def sagemaker_client():
 
 
 @pytest.fixture(scope="module")
-def single_variant_config():
+def single_variant_config(k8s_namespace, shared_xgboost_model):
     config_resource_name = random_suffix_name("single-variant-config", 32)
-    model_resource_name = config_resource_name + "-model"
+    (model_reference, _) = shared_xgboost_model
 
     replacements = REPLACEMENT_VALUES.copy()
     replacements["CONFIG_NAME"] = config_resource_name
-    replacements["MODEL_NAME"] = model_resource_name
-
-    model = load_resource_file(
-        SERVICE_NAME, "xgboost_model", additional_replacements=replacements
-    )
-    logging.debug(model)
+    replacements["MODEL_NAME"] = model_reference.name
 
     config = load_resource_file(
         SERVICE_NAME,
@@ -57,24 +51,13 @@ def single_variant_config():
     )
     logging.debug(config)
 
-    # Create the k8s resources
-    model_reference = k8s.CustomResourceReference(
-        CRD_GROUP,
-        CRD_VERSION,
-        MODEL_RESOURCE_PLURAL,
-        model_resource_name,
-        namespace="default",
-    )
-    model_resource = k8s.create_custom_resource(model_reference, model)
-    model_resource = k8s.wait_resource_consumed_by_controller(model_reference)
-    assert model_resource is not None
-
+    # Create the k8s resource
     config_reference = k8s.CustomResourceReference(
         CRD_GROUP,
         CRD_VERSION,
         CONFIG_RESOURCE_PLURAL,
         config_resource_name,
-        namespace="default",
+        namespace=k8s_namespace,
     )
     config_resource = k8s.create_custom_resource(config_reference, config)
     config_resource = k8s.wait_resource_consumed_by_controller(config_reference)
@@ -82,12 +65,8 @@ def single_variant_config():
 
     yield (config_reference, config_resource)
 
-    # Delete the k8s resource if not already deleted by tests
-    try:
-        k8s.delete_custom_resource(model_reference)
-        k8s.delete_custom_resource(config_reference)
-    except:
-        pass
+    # Delete the k8s resource in the background if not already deleted by tests
+    k8s.reap(config_reference)
 
 
 @service_marker
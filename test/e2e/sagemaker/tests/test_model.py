@@ -32,7 +32,7 @@ def sagemaker_client():
 
 
 @pytest.fixture(scope="module")
-def xgboost_model():
+def xgboost_model(k8s_namespace):
     resource_name = random_suffix_name("xgboost-model", 32)
 
     replacements = REPLACEMENT_VALUES.copy()
@@ -45,7 +45,7 @@ def xgboost_model():
 
     # Create the k8s resource
     reference = k8s.CustomResourceReference(
-        CRD_GROUP, CRD_VERSION, RESOURCE_PLURAL, resource_name, namespace="default"
+        CRD_GROUP, CRD_VERSION, RESOURCE_PLURAL, resource_name, namespace=k8s_namespace
     )
     resource = k8s.create_custom_resource(reference, model)
     resource = k8s.wait_resource_consumed_by_controller(reference)
@@ -54,11 +54,8 @@ def xgboost_model():
 
     yield (reference, resource)
 
-    # Delete the k8s resource if not already deleted by tests
-    try:
-        k8s.delete_custom_resource(reference)
-    except:
-        pass
+    # Delete the k8s resource in the background if not already deleted by tests
+    k8s.reap(reference)
 
 
 @service_marker
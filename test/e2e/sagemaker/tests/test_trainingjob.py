@@ -19,49 +19,15 @@ import logging
 from typing import Dict
 import time
 
-from sagemaker import SERVICE_NAME, service_marker, CRD_GROUP, CRD_VERSION
-from sagemaker.replacement_values import REPLACEMENT_VALUES
-from common.resources import load_resource_file, random_suffix_name
+from sagemaker import service_marker
 from common import k8s
 
-RESOURCE_PLURAL = "trainingjobs"
-
 
 @pytest.fixture(scope="module")
 def sagemaker_client():
     return boto3.client("sagemaker")
 
 
-@pytest.fixture(scope="module")
-def xgboost_trainingjob():
-    resource_name = random_suffix_name("xgboost-trainingjob", 32)
-
-    replacements = REPLACEMENT_VALUES.copy()
-    replacements["TRAINING_JOB_NAME"] = resource_name
-
-    trainingjob = load_resource_file(
-        SERVICE_NAME, "xgboost_trainingjob", additional_replacements=replacements
-    )
-    logging.debug(trainingjob)
-
-    # Create the k8s resource
-    reference = k8s.CustomResourceReference(
-        CRD_GROUP, CRD_VERSION, RESOURCE_PLURAL, resource_name, namespace="default"
-    )
-    resource = k8s.create_custom_resource(reference, trainingjob)
-    resource = k8s.wait_resource_consumed_by_controller(reference)
-
-    assert resource is not None
-
-    yield (reference, resource)
-
-    # Delete the k8s resource if not already deleted by tests
-    try:
-        k8s.delete_custom_resource(reference)
-    except:
-        pass
-
-
 @service_marker
 @pytest.mark.canary
 class TestTrainingJob:
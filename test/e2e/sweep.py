@@ -0,0 +1,59 @@
+# Copyright Amazon.com Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You may
+# not use this file except in compliance with the License. A copy of the
+# License is located at
+#
+#	 http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is distributed
+# on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either
+# express or implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""Sweeps the AWS resources leaked by previous test runs of the selected
+service.
+"""
+
+import sys
+import logging
+import argparse
+
+from datetime import timedelta
+from importlib import import_module
+
+from common.resources import root_test_path, read_bootstrap_config
+from common.sweeper import bootstrapped_names, sweep
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog=f"{__file__}")
+    parser.add_argument("service", help="service whose leaked resources to sweep")
+    parser.add_argument("--older-than", type=float, default=24,
+                        help="only sweep resources created at least this many hours ago")
+    parser.add_argument("--prefix", action="append", default=None,
+                        help="only sweep resources with this name prefix, among "
+                             "those used by the service's tests for each kind")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="number of concurrent list and delete calls")
+    parser.add_argument("--delete", action="store_true",
+                        help="delete the leaked resources, rather than only "
+                             "reporting the resources that would be deleted")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO)
+
+    # Never sweep the resources the current bootstrap still uses
+    protected = set()
+    if (root_test_path / args.service / "bootstrap.yaml").exists():
+        protected = bootstrapped_names(read_bootstrap_config(args.service))
+
+    service_sweep = import_module(f"{args.service}.service_sweep")
+    report = sweep(
+        service_sweep.sweep_kinds(),
+        timedelta(hours=args.older_than),
+        dry_run=not args.delete,
+        max_workers=args.workers,
+        prefixes=args.prefix,
+        protected=protected,
+    )
+    print(report.summary())
+    sys.exit(1 if report.failed or report.list_errors else 0)